@@ -0,0 +1,72 @@
+"""Benchmark parsing received bytes in place against decoding them first.
+
+The text path decodes the whole response and splits it into frames. The
+bytes path finds the frames by offset in the received buffer and decodes
+each on its own, as ASCII when it can. Large getfile and gethistory
+responses are parsed with ASCII file names and with GBK encoded Chinese
+file names.
+
+    PYTHONPATH=src python benchmarks/bench_bytes_parser.py [entries]
+"""
+import sys
+import time
+import tracemalloc
+
+from uart_wifi.communication import _do_handle
+from uart_wifi.protocol import ENCODING, parse_buffer
+
+ITERATIONS = 200
+
+
+def payloads(entries: int) -> dict:
+    """Received getfile and gethistory responses, as bytes."""
+    ascii_names = ",".join(
+        f"Model number {i}.pwmb/{i}.pwmb" for i in range(entries)
+    )
+    gbk_names = ",".join(f"模型 {i}.pwmb/{i}.pwmb" for i in range(entries))
+    history = ",".join(str(i) for i in range(entries))
+    return {
+        "getfile ascii": f"getfile,{ascii_names},end".encode(ENCODING),
+        "getfile gbk": f"getfile,{gbk_names},end".encode(ENCODING),
+        "gethistory": f"gethistory,{history},end".encode(ENCODING),
+    }
+
+
+def text_path(data: bytes) -> list:
+    """Decode the whole response, then parse the text."""
+    return _do_handle(data.decode(ENCODING))
+
+
+def measure(parse, data: bytes) -> tuple:
+    """Parse data repeatedly.
+    :returns: microseconds per parse, and the peak bytes allocated by one.
+    """
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        parse(data)
+    elapsed = (time.perf_counter() - start) / ITERATIONS
+    tracemalloc.start()
+    parse(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed * 1e6, peak
+
+
+def main() -> None:
+    """Run the benchmark and print a summary table."""
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(
+        f"{'payload':<15} {'path':<6} {'KiB':>7} {'us/parse':>10} "
+        f"{'peak KiB':>9}"
+    )
+    for name, data in payloads(entries).items():
+        for path, parse in (("text", text_path), ("bytes", parse_buffer)):
+            micros, peak = measure(parse, data)
+            print(
+                f"{name:<15} {path:<6} {len(data) / 1024:>7.1f} "
+                f"{micros:>10.1f} {peak / 1024:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
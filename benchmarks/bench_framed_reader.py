@@ -0,0 +1,99 @@
+"""Benchmark the framed reader against the legacy one-byte reader.
+
+Responses are produced by AnycubicSimulator.send_response over a socket
+pair so the simulator's accept loop does not skew the timings.
+
+    PYTHONPATH=src python benchmarks/bench_framed_reader.py
+"""
+import select
+import socket
+import statistics
+import threading
+import time
+
+from uart_wifi.communication import FrameReader, current_milli_time
+from uart_wifi.simulate_printer import AnycubicSimulator
+
+FILE_COUNT = 2000
+ROUNDS = 20
+
+
+class CountingSocket:
+    """Socket proxy which counts receive calls."""
+
+    def __init__(self, sock: socket.socket) -> None:
+        self.sock = sock
+        self.calls = 0
+
+    def fileno(self) -> int:
+        """Allow the proxy to be used with select."""
+        return self.sock.fileno()
+
+    def recv(self, size: int) -> bytes:
+        """Counted recv."""
+        self.calls += 1
+        return self.sock.recv(size)
+
+    def recv_into(self, buffer, size: int = 0) -> int:
+        """Counted recv_into."""
+        self.calls += 1
+        return self.sock.recv_into(buffer, size)
+
+
+def legacy_read(sock, end_time: int) -> str:
+    """The reader as it was before FrameReader: one byte per recv."""
+    text_received = ""
+    while True:
+        if end_time > current_milli_time():
+            readable, [], [] = select.select([sock], [], [], 10)
+            for read_port in readable:
+                text_received += str(read_port.recv(1).decode())
+        if end_time < current_milli_time() or text_received.endswith(",end"):
+            break
+    return text_received
+
+
+def framed_read(sock, end_time: int) -> str:
+    """The FrameReader path."""
+    return FrameReader(sock).read_frame(end_time).decode()
+
+
+def run(reader, simulator: AnycubicSimulator, command: str) -> tuple:
+    """Time one response and count the receive calls it needed."""
+    server, client = socket.socketpair()
+    counting = CountingSocket(client)
+    thread = threading.Thread(
+        target=simulator.send_response, args=(server, command)
+    )
+    start = time.perf_counter()
+    thread.start()
+    text = reader(counting, current_milli_time() + 10000)
+    elapsed = time.perf_counter() - start
+    thread.join()
+    server.close()
+    client.close()
+    assert text.endswith(",end"), text[-20:]
+    return elapsed, counting.calls, len(text)
+
+
+def main() -> None:
+    """Run the benchmark and print a summary table."""
+    simulator = AnycubicSimulator("127.0.0.1", 0, quiet=True)
+    files = ",".join(f"Widget {i}.pwmb/{i}.pwmb" for i in range(FILE_COUNT))
+    simulator.getfile = lambda: "getfile," + files + ",end"
+    print(
+        f"{'reader':<8} {'command':<10} {'bytes':>8} {'recv':>8} "
+        f"{'median ms':>10}"
+    )
+    for command in ("getstatus,", "getfile,"):
+        for name, reader in (("legacy", legacy_read), ("framed", framed_read)):
+            results = [run(reader, simulator, command) for _ in range(ROUNDS)]
+            median = statistics.median(result[0] for result in results)
+            print(
+                f"{name:<8} {command:<10} {results[0][2]:>8} "
+                f"{results[0][1]:>8} {median * 1000:>10.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
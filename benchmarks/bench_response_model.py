@@ -0,0 +1,96 @@
+"""Benchmark memory and construction time of status records.
+
+Compares the __slots__ MonoXStatus with the dict-backed, string-typed
+model it replaced.
+
+    PYTHONPATH=src python benchmarks/bench_response_model.py [count]
+"""
+import sys
+import time
+import tracemalloc
+
+from uart_wifi.response import MonoXStatus
+
+
+# pylint: disable=too-many-instance-attributes,too-few-public-methods
+class LegacyStatus:
+    """The status model before __slots__: every field a string."""
+
+    def __init__(self, message) -> None:
+        self.status = message[1]
+        if len(message) > 2:
+            self.file = message[2]
+        if len(message) > 3:
+            self.total_layers = message[3]
+        if len(message) > 4:
+            self.percent_complete = message[4]
+        if len(message) > 5:
+            self.current_layer = message[5]
+        if len(message) > 6:
+            if str(message[6]).isnumeric():
+                self.seconds_elapse = int(message[6]) * 60
+            else:
+                self.seconds_elapse = message[6]
+        if len(message) > 7:
+            self.seconds_remaining = message[7]
+        if len(message) > 8:
+            self.total_volume = message[8]
+        if len(message) > 9:
+            self.mode = message[9]
+        if len(message) > 10:
+            self.unknown1 = message[10]
+        if len(message) > 11:
+            self.layer_height = message[11]
+        if len(message) > 12:
+            self.unknown2 = message[12]
+
+
+def messages(count: int) -> list:
+    """Distinct field lists, as split from received frames."""
+    result = []
+    for index in range(count):
+        message = "getstatus,print,Widget.pwmb/46.pwmb,2338,{},{},51744,"
+        message += "6844,~178mL,UV,39.38,0.05,0"
+        result.append(message.format(index % 100, index % 2338).split(","))
+    return result
+
+
+def measure(record_type: type, count: int) -> tuple:
+    """Build count records.
+    :returns: seconds taken to construct the records, and bytes retained
+        by them once the received field lists are dropped."""
+    source = messages(count)
+    start = time.perf_counter()
+    records = [record_type(message) for message in source]
+    elapsed = time.perf_counter() - start
+    del records, source
+    tracemalloc.start()
+    source = messages(count)
+    records = [record_type(message) for message in source]
+    del source
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    return elapsed, retained
+
+
+def main() -> None:
+    """Run the benchmark and print a summary table."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(
+        f"{'model':<12} {'records':>9} {'seconds':>9} {'MiB':>9} "
+        f"{'bytes/record':>13}"
+    )
+    for name, record_type in (
+        ("legacy", LegacyStatus),
+        ("slots", MonoXStatus),
+    ):
+        elapsed, allocated = measure(record_type, count)
+        print(
+            f"{name:<12} {count:>9} {elapsed:>9.3f} "
+            f"{allocated / 2 ** 20:>9.1f} {allocated / count:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
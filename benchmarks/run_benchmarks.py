@@ -0,0 +1,216 @@
+"""Benchmark suite for the client and parser hot paths.
+
+Runs against the built-in simulator and writes the results as JSON so they
+can be kept per release and compared.
+
+    PYTHONPATH=src python benchmarks/run_benchmarks.py [-o results.json]
+        [-b baseline.json] [-q] [name ...]
+
+-o  where to write the results. Defaults to benchmark-results.json.
+-b  compare with an earlier results file and exit with 1 if any benchmark
+    is more than 20% slower.
+-q  a quick run with fewer iterations, for smoke testing.
+name  only run the named benchmarks.
+"""
+import getopt
+import json
+import platform
+import sys
+import threading
+import time
+from typing import Callable, Dict, List
+
+from uart_wifi import preview
+from uart_wifi.communication import _do_handle, _do_request
+from uart_wifi.fleet import FleetPoller
+from uart_wifi.protocol import decode_preview, parse_buffer
+from uart_wifi.simulate_fleet import SimulatedFleet
+from uart_wifi.simulate_printer import AnycubicSimulator, SimulatorServer
+
+REGRESSION_THRESHOLD = 0.2
+STATUS = (
+    "getstatus,print,Widget.pwmb/46.pwmb,2338,88,2062,51744,6844,"
+    "~178mL,UV,39.38,0.05,0,end"
+)
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """The sample below which the fraction of samples fall."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def throughput(function: Callable, iterations: int, units: int = 1) -> dict:
+    """Time repeated calls of a function.
+    :units: the number of items each call handles.
+    """
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    elapsed = time.perf_counter() - start
+    return {
+        "iterations": iterations,
+        "seconds": elapsed,
+        "per_second": iterations * units / elapsed,
+    }
+
+
+def bench_parse_status(scale: int) -> dict:
+    """_do_handle on full status frames, 100 per message."""
+    message = STATUS * 100
+    return throughput(lambda: _do_handle(message), 100 * scale, 100)
+
+
+def bench_parse_getfile(scale: int) -> dict:
+    """_do_handle on a getfile frame listing 500 files."""
+    names = ",".join(f"Model number {i}.pwmb/{i}.pwmb" for i in range(500))
+    message = "getfile," + names + ",end"
+    return throughput(lambda: _do_handle(message), 20 * scale, 500)
+
+
+def bench_parse_getfile_bytes(scale: int) -> dict:
+    """parse_buffer on a received getfile frame listing 500 files."""
+    names = ",".join(f"Model number {i}.pwmb/{i}.pwmb" for i in range(500))
+    message = ("getfile," + names + ",end").encode()
+    return throughput(lambda: parse_buffer(message), 20 * scale, 500)
+
+
+def bench_parse_gethistory(scale: int) -> dict:
+    """_do_handle on a gethistory frame listing 500 entries."""
+    entries = ",".join(
+        f"{i}/Model {i}.pwmb/{1660000000 + i}/3600/~20.5mL/800"
+        for i in range(500)
+    )
+    message = "gethistory," + entries + ",end"
+    return throughput(lambda: _do_handle(message), 20 * scale, 500)
+
+
+def bench_preview_decode(scale: int) -> dict:
+    """decode_preview on a full getPreview2 frame."""
+    frame = bytearray(AnycubicSimulator("127.0.0.1", 0).getpreview2())
+    result = throughput(lambda: decode_preview(frame), 5 * scale)
+    result["numpy"] = preview._numpy() is not None
+    return result
+
+
+def bench_request_latency(scale: int) -> dict:
+    """_do_request round trips to a simulator on a selectors loop."""
+    server = SimulatorServer()
+    address = (
+        "127.0.0.1",
+        server.add_printer(AnycubicSimulator("127.0.0.1", 0, quiet=True)),
+    )
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    samples = []
+    try:
+        for _ in range(50 * scale):
+            start = time.perf_counter()
+            _do_request(None, address, b"getstatus,", 10)
+            samples.append(time.perf_counter() - start)
+    finally:
+        server.stop()
+        thread.join()
+    return {
+        "iterations": len(samples),
+        "seconds": sum(samples),
+        "per_second": len(samples) / sum(samples),
+        "p50": percentile(samples, 0.5),
+        "p90": percentile(samples, 0.9),
+        "p99": percentile(samples, 0.99),
+        "max": max(samples),
+    }
+
+
+def bench_fleet_poll(scale: int) -> dict:
+    """FleetPoller over a simulated fleet, three commands per printer."""
+    fleet = SimulatedFleet(count=20 * scale, seed=1)
+    fleet.start()
+    try:
+        poller = FleetPoller(fleet.addresses)
+        start = time.perf_counter()
+        results = poller.poll_all()
+        elapsed = time.perf_counter() - start
+    finally:
+        fleet.stop()
+    return {
+        "printers": len(results),
+        "failed": sum(not result.ok for result in results),
+        "seconds": elapsed,
+        "per_second": len(results) / elapsed,
+    }
+
+
+BENCHMARKS: Dict[str, Callable[[int], dict]] = {
+    "parse_status": bench_parse_status,
+    "parse_getfile": bench_parse_getfile,
+    "parse_getfile_bytes": bench_parse_getfile_bytes,
+    "parse_gethistory": bench_parse_gethistory,
+    "preview_decode": bench_preview_decode,
+    "request_latency": bench_request_latency,
+    "fleet_poll": bench_fleet_poll,
+}
+
+
+def run(names: List[str], scale: int) -> dict:
+    """Run benchmarks and collect their results with the environment."""
+    results = {}
+    for name in names:
+        results[name] = BENCHMARKS[name](scale)
+        print(f"{name}: {results[name]['per_second']:.1f}/s")
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "scale": scale,
+        "results": results,
+    }
+
+
+def regressions(current: dict, baseline: dict) -> List[str]:
+    """Benchmarks which got slower than the baseline by the threshold."""
+    slower = []
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        ratio = result["per_second"] / before["per_second"]
+        if ratio < 1 - REGRESSION_THRESHOLD:
+            slower.append(f"{name}: {ratio:.0%} of baseline")
+    return slower
+
+
+def main() -> int:
+    """Run the suite from the command line."""
+    opts, names = getopt.gnu_getopt(sys.argv[1:], "o:b:q")
+    output = "benchmark-results.json"
+    baseline = None
+    scale = 10
+    for opt, arg in opts:
+        if opt == "-o":
+            output = arg
+        elif opt == "-b":
+            baseline = arg
+        elif opt == "-q":
+            scale = 1
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        print("Unknown benchmarks: " + ", ".join(unknown))
+        print("Available: " + ", ".join(BENCHMARKS))
+        return 2
+    current = run(names or list(BENCHMARKS), scale)
+    with open(output, "w", encoding="utf-8") as results_file:
+        json.dump(current, results_file, indent=2)
+    print(f"results written to {output}")
+    if baseline is None:
+        return 0
+    with open(baseline, encoding="utf-8") as baseline_file:
+        slower = regressions(current, json.load(baseline_file))
+    for line in slower:
+        print("regression: " + line)
+    return 1 if slower else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,6 @@
-"""Main executable. Imports the monox script and causes execution."""
-from uart_wifi.scripts import monox
+"""Main executable. Runs the monox command line."""
+import sys
 
-print(f'this should be executed from "{monox.__file__}".')
+from uart_wifi.scripts.monox import main
+
+sys.exit(main())
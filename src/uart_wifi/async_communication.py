@@ -0,0 +1,249 @@
+"""Asyncio communications with MonoX devices.
+Provides a non-blocking counterpart to UartWifi so many printers can be
+polled from a single event loop.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Iterable, Optional, Union
+
+from uart_wifi.deadline import (
+    CONNECT_TIMEOUT,
+    MAX_REQUEST_TIME,
+    Deadline,
+    RequestTimeouts,
+    as_timeout,
+)
+from uart_wifi.errors import ConnectionException
+
+from .communication import (
+    ENCODING,
+    END,
+    CircuitBreaker,
+    RetryPolicy,
+    _do_handle,
+    _process_received,
+)
+from .protocol import header_end, lookup
+from .response import MonoXResponseType
+
+READ_SIZE = 4096
+_LOGGER = logging.getLogger(__name__)
+
+
+class AsyncUartWifi:
+    """Asyncio Mono X Class"""
+
+    max_request_time = MAX_REQUEST_TIME
+    retry_policy = None
+    circuit_breaker = None
+    executor = None
+
+    def __init__(self, ip_address: str, port: int) -> None:
+        """Create an asyncio communications class.
+        :ip_address: The IP to initiate communications with.
+        :port: The port to use.
+        """
+        self.server_address = (ip_address, port)
+        self.raw = False
+        self.timeouts = RequestTimeouts(total=self.max_request_time)
+
+    def set_maximum_request_time(self, max_request_time: int) -> None:
+        """Set the maximum time to wait for a response.
+        :max_request_time: The maximum time to wait for a response.
+        """
+        self.max_request_time = max_request_time
+        self.timeouts = self.timeouts.copy(total=max_request_time)
+
+    def set_timeouts(
+        self,
+        connect: float = CONNECT_TIMEOUT,
+        first_byte: float = None,
+        idle: float = None,
+        total: float = None,
+    ) -> None:
+        """Set the time limits of each request, in seconds.
+        See UartWifi.set_timeouts.
+        """
+        if total is None:
+            total = self.max_request_time
+        self.max_request_time = total
+        self.timeouts = RequestTimeouts(connect, first_byte, idle, total)
+
+    def set_raw(self, raw: bool = True) -> None:
+        """Set raw mode.
+        :raw: Set to true if we are outputting raw data instead of processed
+            classes.
+        """
+        self.raw = raw
+
+    def set_retry_policy(self, retry_policy: Optional[RetryPolicy]) -> None:
+        """Retry failed connections. See UartWifi.set_retry_policy."""
+        self.retry_policy = retry_policy
+
+    def set_circuit_breaker(self, circuit_breaker: CircuitBreaker) -> None:
+        """Fail fast while the printer is known to be offline.
+        See UartWifi.set_circuit_breaker.
+        """
+        self.circuit_breaker = circuit_breaker
+
+    def set_executor(self, executor: Executor = None) -> None:
+        """Parse responses on an executor instead of the event loop.
+        See UartWifi.set_executor.
+        """
+        self.executor = executor
+
+    async def send_request(
+        self, message_to_be_sent: str, timeout: float = None
+    ) -> Union[str, Iterable[MonoXResponseType]]:
+        """sends the Mono X request without blocking the event loop.
+        :message_to_be_sent: The properly-formatted uart-wifi message as it is
+        to be sent.
+        :timeout: Optional per-request override of the maximum request time.
+        :returns: an object from Response class.
+        """
+        timeouts = self.timeouts
+        if timeout is not None:
+            timeouts = timeouts.copy(total=timeout)
+        request = bytes(message_to_be_sent, "utf-8")
+        verbs = [message_to_be_sent.strip().split(",", 1)[0]]
+        attempt = 0
+        while True:
+            breaker = self.circuit_breaker
+            if breaker is not None:
+                breaker.before_request(self.server_address)
+            try:
+                received = await _async_do_request(
+                    self.server_address, request, timeouts
+                )
+                if breaker is not None:
+                    if received.rstrip().endswith(END.encode()):
+                        breaker.record_success(self.server_address)
+                    else:
+                        breaker.record_failure(self.server_address)
+                break
+            except ConnectionException:
+                if breaker is not None:
+                    breaker.record_failure(self.server_address)
+                attempt += 1
+                policy = self.retry_policy
+                if policy is None or not policy.should_retry(verbs, attempt):
+                    raise
+                await asyncio.sleep(policy.delay(attempt))
+            finally:
+                if breaker is not None:
+                    breaker.end_trial(self.server_address)
+        if isinstance(received, bytearray):
+            # A binary preview, returned as UartWifi.send_request does.
+            call = (_process_received, received, self.raw)
+        elif self.raw:
+            return received.decode(ENCODING, "replace")
+        else:
+            call = (_do_handle, received)
+        if self.executor is not None:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, *call
+            )
+        return call[0](*call[1:])
+
+
+async def _async_do_request(
+    socket_address: tuple, to_be_sent: bytes, timeouts: RequestTimeouts
+) -> bytes:
+    """Perform the request on the running event loop.
+
+    :param socket_address: the (ip_address, port) tuple to connect to.
+    :param to_be_sent: the request to send
+    :param timeouts: the time limits of the request.
+    :return: the bytes received, which may be partial on timeout. A binary
+        frame is returned in a bytearray."""
+    deadline = Deadline(timeouts)
+    _LOGGER.debug("connecting to %s", socket_address)
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(*socket_address),
+            as_timeout(deadline.connect_timeout()),
+        )
+    except (OSError, asyncio.TimeoutError) as exception:
+        raise ConnectionException(
+            "Could not connect to AnyCubic printer at " + socket_address[0]
+        ) from exception
+    received = bytearray()
+    try:
+        writer.write(to_be_sent)
+        await writer.drain()
+        deadline.request_sent()
+        sent_string = to_be_sent.decode()
+        if sent_string.endswith("shutdown"):
+            return b"shutdown,end"
+        command = lookup(sent_string)
+        if command is not None and command.binary:
+            return await _async_read_fixed(
+                reader, command.header_fields, command.payload_size, deadline
+            )
+        end = END.encode()
+        while not received.endswith(end):
+            remaining = deadline.remaining()
+            if remaining <= 0:
+                break
+            try:
+                chunk = await asyncio.wait_for(
+                    reader.read(READ_SIZE), as_timeout(remaining)
+                )
+            except asyncio.TimeoutError:
+                break
+            if not chunk:
+                break
+            deadline.byte_received()
+            received.extend(chunk)
+    except OSError as exception:
+        raise ConnectionException(
+            "Could not connect to AnyCubic printer at " + socket_address[0]
+        ) from exception
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass  # the printer reset a connection which is done with.
+    return bytes(received)
+
+
+async def _async_read_fixed(
+    reader: asyncio.StreamReader,
+    header_fields: int,
+    payload_size: int,
+    deadline: Deadline,
+) -> bytearray:
+    """Read a frame made of header_fields comma terminated text fields, a
+    binary payload of payload_size bytes and the terminator, as
+    FrameReader.read_fixed does. Binary data which happens to contain the
+    terminator is not cut short.
+    :returns: the bytes of the frame received, which may be partial on
+        timeout.
+    """
+    received = bytearray()
+    size = None
+    while size is None or len(received) < size:
+        remaining = deadline.remaining()
+        if remaining <= 0:
+            break
+        wanted = READ_SIZE if size is None else size - len(received)
+        try:
+            chunk = await asyncio.wait_for(
+                reader.read(wanted), as_timeout(remaining)
+            )
+        except asyncio.TimeoutError:
+            break
+        if not chunk:
+            break
+        deadline.byte_received()
+        received.extend(chunk)
+        if size is None:
+            end = header_end(received, header_fields)
+            if end != -1:
+                size = end + payload_size + len(END)
+    if size is not None:
+        del received[size:]
+    return received
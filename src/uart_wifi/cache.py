@@ -0,0 +1,222 @@
+"""Caching of file lists and previews, which only change when files are
+uploaded or deleted."""
+
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from .communication import UartWifi, request_serial
+from .preview import PREVIEW_HEIGHT, PREVIEW_WIDTH
+from .response import FileList, MonoXPreviewImage, MonoXResponseType
+
+DEFAULT_TTL = 300  # seconds
+DEFAULT_MAX_ENTRIES = 1024
+INVALIDATING_COMMANDS = ("delfile", "goprint")
+FILE_LIST = "getfile"
+
+
+class ResponseCache:
+    """A thread safe LRU cache whose entries also expire after a TTL."""
+
+    def __init__(
+        self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES
+    ) -> None:
+        """Create a ResponseCache.
+        :ttl: seconds an entry stays valid.
+        :max_entries: the number of entries kept before the least recently
+            used are dropped.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable):
+        """Get a cached value.
+        :key: the key the value was stored under.
+        :returns: the value, or None if missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[1] >= self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, value) -> None:
+        """Store a value.
+        :key: the key to store the value under.
+        :value: the value to store.
+        """
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, serial: str, name: str = None) -> None:
+        """Drop the entries of a printer.
+        :serial: the printer serial the entries are keyed by.
+        :name: only drop this entry when given.
+        """
+        with self._lock:
+            for key in list(self._entries):
+                if key[0] == serial and (name is None or key[1] == name):
+                    del self._entries[key]
+
+    def __len__(self) -> int:
+        """The number of entries, including expired ones not yet dropped."""
+        return len(self._entries)
+
+
+class DiskPreviewStore:
+    """Keeps decoded previews in the temporary directory so they survive a
+    restart. Pixels are stored as raw RGB888."""
+
+    def __init__(self, directory: str = None, ttl: float = DEFAULT_TTL):
+        """Create a DiskPreviewStore.
+        :directory: where to keep previews. Defaults to uart_wifi in the
+            temporary directory.
+        :ttl: seconds a stored preview stays valid.
+        """
+        if directory is None:
+            directory = os.path.join(tempfile.gettempdir(), "uart_wifi")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.ttl = ttl
+
+    def _path(self, serial: str, name: str, width: int, height: int) -> str:
+        """The file used for a preview."""
+        safe = re.sub(r"[^\w.-]", "_", f"{serial}-{name}")
+        return os.path.join(self.directory, f"{safe}-{width}x{height}.rgb")
+
+    def load(
+        self, serial: str, name: str, width: int, height: int
+    ) -> Optional[MonoXPreviewImage]:
+        """Load a stored preview.
+        :returns: the preview, or None if missing or expired.
+        """
+        path = self._path(serial, name, width, height)
+        try:
+            if time.time() - os.path.getmtime(path) >= self.ttl:
+                os.remove(path)
+                return None
+            with open(path, "rb") as stored:
+                rgb = stored.read()
+        except OSError:
+            return None
+        if len(rgb) != width * height * 3:
+            return None
+        return MonoXPreviewImage(
+            internal_name=name, width=width, height=height, rgb=rgb
+        )
+
+    def store(self, serial: str, image: MonoXPreviewImage) -> None:
+        """Store a preview."""
+        path = self._path(
+            serial, image.internal_name, image.width, image.height
+        )
+        with open(path + ".tmp", "wb") as stored:
+            stored.write(image.rgb)
+        os.replace(path + ".tmp", path)
+
+    def remove(self, serial: str, name: str, width: int, height: int):
+        """Remove a stored preview."""
+        try:
+            os.remove(self._path(serial, name, width, height))
+        except OSError:
+            pass
+
+
+class CachedUartWifi:
+    """Serves file lists and previews of a printer from a cache.
+    Entries are keyed by the printer serial and the internal file name, and
+    are dropped when this client deletes a file or starts a print.
+    """
+
+    def __init__(
+        self,
+        uart: UartWifi,
+        cache: ResponseCache = None,
+        disk_store: DiskPreviewStore = None,
+    ) -> None:
+        """Create a CachedUartWifi.
+        :uart: the client to fetch from on a miss.
+        :cache: the in-memory cache, which may be shared between printers.
+        :disk_store: an optional on-disk store for previews.
+        """
+        self.uart = uart
+        self.cache = cache if cache is not None else ResponseCache()
+        self.disk_store = disk_store
+        self._serial = None
+
+    @property
+    def serial(self) -> str:
+        """The serial of the printer, requested once from sysinfo."""
+        if self._serial is None:
+            self._serial = request_serial(self.uart)
+        return self._serial
+
+    def get_files(self) -> Optional[FileList]:
+        """The file list, from the cache when possible."""
+        key = (self.serial, FILE_LIST)
+        files = self.cache.get(key)
+        if files is None:
+            for response in self.uart.send_request("getfile,"):
+                if isinstance(response, FileList):
+                    files = response
+                    self.cache.put(key, files)
+        return files
+
+    def get_preview(self, internal_name: str) -> MonoXResponseType:
+        """The preview of a file, from the cache when possible.
+        :internal_name: the name the printer calls the file. eg "1.pwmb"
+        """
+        key = (self.serial, internal_name)
+        image = self.cache.get(key)
+        if image is not None:
+            return image
+        if self.disk_store is not None:
+            image = self.disk_store.load(
+                self.serial, internal_name, PREVIEW_WIDTH, PREVIEW_HEIGHT
+            )
+        if image is None:
+            image = self.uart.get_preview(internal_name)
+            if not isinstance(image, MonoXPreviewImage):
+                return image
+            if self.disk_store is not None:
+                self.disk_store.store(self.serial, image)
+        self.cache.put(key, image)
+        return image
+
+    def send_request(self, message_to_be_sent: str):
+        """Send a request, dropping cached entries the command invalidates.
+        :message_to_be_sent: the request as UartWifi.send_request takes it.
+        """
+        fields = message_to_be_sent.strip().split(",")
+        if fields[0] in INVALIDATING_COMMANDS:
+            self.invalidate(fields[1] if len(fields) > 1 else None)
+        return self.uart.send_request(message_to_be_sent)
+
+    def invalidate(self, internal_name: str = None) -> None:
+        """Drop the cached file list, and the preview of a file or all
+        previews of this printer.
+        :internal_name: the file whose preview to drop, or None for all.
+        """
+        serial = self.serial
+        if internal_name:
+            self.cache.invalidate(serial, FILE_LIST)
+            self.cache.invalidate(serial, internal_name)
+            if self.disk_store is not None:
+                self.disk_store.remove(
+                    serial, internal_name, PREVIEW_WIDTH, PREVIEW_HEIGHT
+                )
+        else:
+            self.cache.invalidate(serial)
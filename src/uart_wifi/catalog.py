@@ -0,0 +1,204 @@
+"""Incremental sync of the files on many printers.
+The last getfile listing of each printer is kept by serial. Each new
+listing is compared with it by internal name, so consumers receive the
+files added, removed and renamed instead of scanning the whole list, and
+the internal name to send with goprint or delfile is a dictionary lookup.
+"""
+
+import threading
+from typing import Callable, Dict, List, Optional
+
+from .communication import UartWifi, request_serial
+from .response import FileList, MonoXFileEntry
+
+ADDED = "added"
+REMOVED = "removed"
+RENAMED = "renamed"
+
+
+class FileEvent:
+    """A change to the files of a printer."""
+
+    __slots__ = ("kind", "internal", "external", "previous")
+
+    def __init__(
+        self,
+        kind: str,
+        internal: str,
+        external: str,
+        previous: str = None,
+    ) -> None:
+        """Create a FileEvent.
+        :kind: ADDED, REMOVED or RENAMED.
+        :internal: the name the printer calls the file. eg "1.pwmb"
+        :external: the name the user calls the file, after the change.
+            For a removed file, the name it had.
+        :previous: the name the user called a renamed file before.
+        """
+        self.kind = kind
+        self.internal = internal
+        self.external = external
+        self.previous = previous
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, FileEvent):
+            return NotImplemented
+        return all(
+            getattr(self, name) == getattr(other, name)
+            for name in self.__slots__
+        )
+
+    def __repr__(self) -> str:
+        if self.kind == RENAMED:
+            return (
+                f"FileEvent({self.kind}, {self.internal}, "
+                f"{self.previous} -> {self.external})"
+            )
+        return f"FileEvent({self.kind}, {self.internal}, {self.external})"
+
+
+class FileCatalog:
+    """The files last listed by one printer, by internal name and by the
+    name the user calls them. When two files share a user name the index
+    holds the first one listed.
+    """
+
+    def __init__(self) -> None:
+        """Create an empty FileCatalog."""
+        self._files: Dict[str, str] = {}
+        self._names: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._names or name in self._files
+
+    def update(self, file_list: FileList) -> List[FileEvent]:
+        """Replace the catalog with a new listing.
+        :file_list: the FileList from getfile.
+        :returns: the changes from the previous listing, removals first.
+            The first listing of a printer adds every file.
+        """
+        files = {entry.internal: entry.external for entry in file_list.files}
+        old = self._files
+        events = [
+            FileEvent(REMOVED, internal, external)
+            for internal, external in old.items()
+            if internal not in files
+        ]
+        for internal, external in files.items():
+            previous = old.get(internal)
+            if previous is None:
+                events.append(FileEvent(ADDED, internal, external))
+            elif previous != external:
+                events.append(FileEvent(RENAMED, internal, external, previous))
+        if events:
+            names: Dict[str, str] = {}
+            for internal, external in files.items():
+                names.setdefault(external, internal)
+            self._files, self._names = files, names
+        return events
+
+    def internal_name(self, name: str) -> Optional[str]:
+        """The internal name of a file.
+        :name: the name the user calls the file, or its internal name.
+        :returns: the internal name, or None if the file is not listed.
+        """
+        internal = self._names.get(name)
+        if internal is None and name in self._files:
+            return name
+        return internal
+
+    def external_name(self, internal: str) -> Optional[str]:
+        """The name the user calls a file, None if it is not listed."""
+        return self._files.get(internal)
+
+    def files(self) -> List[MonoXFileEntry]:
+        """The files, in the order the printer listed them."""
+        return [
+            MonoXFileEntry(internal, external)
+            for internal, external in self._files.items()
+        ]
+
+
+class CatalogSync:
+    """Keeps a FileCatalog per printer serial and tells listeners what
+    changed on each sync.
+    """
+
+    def __init__(self) -> None:
+        """Create a CatalogSync."""
+        self._catalogs: Dict[str, FileCatalog] = {}
+        self.listeners: List[Callable[[str, FileEvent], None]] = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener: Callable[[str, FileEvent], None]) -> None:
+        """Add a listener which is called with the serial and each
+        FileEvent of every change, after the catalog is updated.
+        """
+        self.listeners.append(listener)
+
+    def remove_listener(
+        self, listener: Callable[[str, FileEvent], None]
+    ) -> None:
+        """Remove a listener added with add_listener."""
+        self.listeners.remove(listener)
+
+    def update(self, serial: str, file_list: FileList) -> List[FileEvent]:
+        """Sync the catalog of a printer with a listing.
+        :serial: the serial of the printer, see MonoXSysInfo.
+        :file_list: the FileList from getfile.
+        :returns: the changes, see FileCatalog.update.
+        """
+        with self._lock:
+            catalog = self._catalogs.get(serial)
+            if catalog is None:
+                catalog = self._catalogs[serial] = FileCatalog()
+            events = catalog.update(file_list)
+        for event in events:
+            for listener in self.listeners:
+                listener(serial, event)
+        return events
+
+    def fetch(self, uart: UartWifi, serial: str = None) -> List[FileEvent]:
+        """Request the files of a printer and sync its catalog.
+        :uart: the printer to ask.
+        :serial: the serial of the printer. Requested from sysinfo when
+            not given.
+        :returns: the changes.
+        """
+        if serial is None:
+            serial = request_serial(uart)
+        for response in uart.send_request("getfile,"):
+            if isinstance(response, FileList):
+                return self.update(serial, response)
+        return []
+
+    def record_result(self, result) -> List[FileEvent]:
+        """Sync the catalog from a fleet.FleetResult polled with sysinfo
+        and getfile.
+        :returns: the changes, none if the result had no files or serial.
+        """
+        if result.sysinfo is None or result.files is None:
+            return []
+        return self.update(result.sysinfo.serial, result.files)
+
+    def catalog(self, serial: str) -> Optional[FileCatalog]:
+        """The catalog of a printer, None before its first sync."""
+        with self._lock:
+            return self._catalogs.get(serial)
+
+    def internal_name(self, serial: str, name: str) -> Optional[str]:
+        """The internal name to send with goprint or delfile.
+        :serial: the serial of the printer.
+        :name: the name the user calls the file, or its internal name.
+        :returns: the internal name, or None if the file is not listed.
+        """
+        catalog = self.catalog(serial)
+        return None if catalog is None else catalog.internal_name(name)
+
+    def serials(self) -> List[str]:
+        """The printers synced."""
+        with self._lock:
+            return list(self._catalogs)
@@ -5,44 +5,200 @@ See launch.json for auto-config.
 """
 
 import logging
-import os
 import select
-import sys
-from queue import Empty
+import threading
+from collections import defaultdict, deque
 
 from socket import AF_INET, SOCK_STREAM, socket
-import tempfile
 import time
-from typing import Iterable
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Union,
+)
 
-from uart_wifi.errors import ConnectionException
+from uart_wifi.deadline import (
+    CONNECT_TIMEOUT,
+    MAX_REQUEST_TIME,
+    Deadline,
+    RequestTimeouts,
+    as_timeout,
+)
+from uart_wifi.errors import CircuitOpenException, ConnectionException
 
-from .response import (
-    FileList,
-    InvalidResponse,
-    MonoXPreviewImage,
-    MonoXResponseType,
-    MonoXStatus,
-    MonoXSysInfo,
+from .protocol import (
+    COMMANDS,
+    ENCODING,
+    END,
+    END_BYTES,
+    IDEMPOTENT_COMMANDS,
+    decode_preview,
+    header_end,
+    lookup,
+    parse_buffer,
+    parse_frame,
 )
+from .response import InvalidResponse, MonoXResponseType, MonoXSysInfo
+
+if TYPE_CHECKING:
+    # Only imported when used, so a plain request stays quick to start.
+    from concurrent.futures import Executor, Future
+
+    from uart_wifi.instrumentation import RequestTrace
+    from uart_wifi.pool import ConnectionPool
 
 # Port to listen on
 
 HOST = "192.168.1.254"
 COMMAND = "getstatus"
-endRequired = ["goprint", "gostop", "gopause", "delfile"]
-END = ",end"
-ENCODING = "gbk"
+endRequired = [verb for verb, c in COMMANDS.items() if c.end_required]
+READ_SIZE = 4096
 _LOGGER = logging.getLogger(__name__)
 Any = object()
-MAX_REQUEST_TIME = 10  # seconds
 Response = Iterable[MonoXResponseType]
 
 
+class RetryPolicy:
+    """When and how long to wait before retrying a failed request.
+    Only requests made entirely of idempotent commands are retried, so a
+    print is never started or a file deleted twice.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        attempts: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 10,
+        jitter: float = 0.5,
+        idempotent: Iterable[str] = IDEMPOTENT_COMMANDS,
+    ) -> None:
+        """Create a RetryPolicy.
+        :attempts: the most attempts made for one request.
+        :backoff: seconds to wait before the first retry, doubled for each
+            further retry.
+        :max_backoff: the longest wait between attempts.
+        :jitter: the fraction of each wait which is random, so clients do
+            not retry in lockstep.
+        :idempotent: the command verbs which are safe to repeat.
+        """
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.idempotent = frozenset(idempotent)
+
+    def should_retry(self, verbs: Iterable[str], attempt: int) -> bool:
+        """Whether to retry after a failure.
+        :verbs: the command verbs of the request.
+        :attempt: the number of attempts made so far.
+        """
+        return attempt < self.attempts and all(
+            verb in self.idempotent for verb in verbs
+        )
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait after a failed attempt.
+        :attempt: the number of attempts made so far.
+        """
+        import random  # pylint: disable=import-outside-toplevel
+
+        delay = min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+        return delay * (1 - self.jitter * random.random())
+
+
+class CircuitBreaker:
+    """Fails fast for printers which are known to be offline.
+    After failure_threshold consecutive connection failures, or responses
+    which never completed, the circuit of a printer opens and requests fail
+    at once with CircuitOpenException.
+    Once reset_timeout has passed a single trial request is let through,
+    which closes the circuit on success or opens it again on failure.
+    One breaker may be shared by clients of many printers.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(
+        self, failure_threshold: int = 3, reset_timeout: float = 30
+    ) -> None:
+        """Create a CircuitBreaker.
+        :failure_threshold: consecutive failures which open the circuit.
+        :reset_timeout: seconds before an open circuit lets a trial through.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = {}
+        self._opened = {}
+        self._trial = set()
+        self._lock = threading.Lock()
+
+    def state(self, address: tuple) -> str:
+        """The state of the circuit of a printer."""
+        with self._lock:
+            if address in self._trial:
+                return self.HALF_OPEN
+            if address in self._opened:
+                return self.OPEN
+            return self.CLOSED
+
+    def before_request(self, address: tuple) -> None:
+        """Check a request may be sent.
+        :address: the (ip_address, port) of the printer.
+        :raises CircuitOpenException: if the printer is known to be offline.
+        """
+        with self._lock:
+            opened = self._opened.get(address)
+            if opened is None:
+                return
+            if (
+                address not in self._trial
+                and time.monotonic() - opened >= self.reset_timeout
+            ):
+                self._trial.add(address)
+                return
+        raise CircuitOpenException(
+            "AnyCubic printer at " + address[0] + " is offline"
+        )
+
+    def record_success(self, address: tuple) -> None:
+        """Close the circuit of a printer which answered."""
+        with self._lock:
+            self._failures.pop(address, None)
+            self._opened.pop(address, None)
+            self._trial.discard(address)
+
+    def end_trial(self, address: tuple) -> None:
+        """Let another trial through when the current one ended without
+        success or failure being recorded, eg. on an unexpected error."""
+        with self._lock:
+            self._trial.discard(address)
+
+    def record_failure(self, address: tuple) -> None:
+        """Count a connection failure, opening the circuit at the
+        threshold or when a trial request failed."""
+        with self._lock:
+            failures = self._failures.get(address, 0) + 1
+            self._failures[address] = failures
+            if address in self._trial or failures >= self.failure_threshold:
+                self._opened[address] = time.monotonic()
+                self._trial.discard(address)
+
+
 class UartWifi:
     """Mono X Class"""
 
     max_request_time = MAX_REQUEST_TIME
+    pool = None
+    retry_policy = None
+    circuit_breaker = None
+    executor = None
 
     def __init__(self, ip_address: str, port: int) -> None:
         """Create a communications UartWifi class.
@@ -51,13 +207,36 @@ class UartWifi:
         """
         self.server_address = (ip_address, port)
         self.raw = False
-        self.telnet_socket = socket(AF_INET, SOCK_STREAM)
+        self.timeouts = RequestTimeouts(total=self.max_request_time)
+        self.listeners: List[Callable[["RequestTrace"], None]] = []
 
     def set_maximum_request_time(self, max_request_time: int) -> None:
         """Set the maximum time to wait for a response.
         :max_request_time: The maximum time to wait for a response.
         """
         self.max_request_time = max_request_time
+        self.timeouts = self.timeouts.copy(total=max_request_time)
+
+    def set_timeouts(
+        self,
+        connect: float = CONNECT_TIMEOUT,
+        first_byte: float = None,
+        idle: float = None,
+        total: float = None,
+    ) -> None:
+        """Set the time limits of each request, in seconds.
+        :connect: The time allowed to establish the connection.
+        :first_byte: The time allowed between sending the request and the
+            first byte of the response. None waits for the total budget.
+        :idle: The longest gap between bytes once the response has started.
+            None waits for the total budget.
+        :total: The budget for the whole request. Defaults to the maximum
+            request time.
+        """
+        if total is None:
+            total = self.max_request_time
+        self.max_request_time = total
+        self.timeouts = RequestTimeouts(connect, first_byte, idle, total)
 
     def set_raw(self, raw: bool = True) -> None:
         """Set raw mode.
@@ -66,6 +245,55 @@ class UartWifi:
         """
         self.raw = raw
 
+    def set_keep_alive(
+        self, keep_alive: bool = True, pool: "ConnectionPool" = None
+    ) -> None:
+        """Set keep-alive mode, reusing connections between requests.
+        :keep_alive: Set to true to keep connections open in a pool.
+        :pool: The pool to use. Defaults to the pool shared by all UartWifi
+            instances.
+        """
+        # pylint: disable=import-outside-toplevel
+        from uart_wifi.pool import SHARED_POOL
+
+        self.pool = (pool or SHARED_POOL) if keep_alive else None
+
+    def set_retry_policy(self, retry_policy: Optional[RetryPolicy]) -> None:
+        """Retry failed connections to the printer.
+        :retry_policy: when and how long to wait before retrying, eg.
+            RetryPolicy(). None disables retries.
+        """
+        self.retry_policy = retry_policy
+
+    def set_circuit_breaker(self, circuit_breaker: CircuitBreaker) -> None:
+        """Fail fast while the printer is known to be offline.
+        :circuit_breaker: the breaker to use, which may be shared with the
+            clients of other printers. None disables it.
+        """
+        self.circuit_breaker = circuit_breaker
+
+    def set_executor(self, executor: "Executor" = None) -> None:
+        """Decode and parse the responses of submit_request and
+        submit_preview on an executor, so a ProcessPoolExecutor can use
+        every core for previews and large histories.
+        :executor: the executor to use, which may be shared with the
+            clients of other printers. None parses on the calling thread.
+        """
+        self.executor = executor
+
+    def add_listener(self, listener: Callable[["RequestTrace"], None]) -> None:
+        """Add a listener which is called with the RequestTrace of every
+        request made with send_request or get_preview.
+        :listener: the callable, eg. an instrumentation.MetricsAggregator.
+        """
+        self.listeners.append(listener)
+
+    def remove_listener(
+        self, listener: Callable[["RequestTrace"], None]
+    ) -> None:
+        """Remove a listener added with add_listener."""
+        self.listeners.remove(listener)
+
     def send_request(
         self, message_to_be_sent: str
     ) -> Iterable[MonoXResponseType]:
@@ -78,6 +306,102 @@ class UartWifi:
         return_value = self._send_request(message_to_be_sent)
         return return_value
 
+    def submit_request(self, message_to_be_sent: str) -> "Future":
+        """sends the Mono X request and parses the response on the executor,
+        see set_executor.
+        :message_to_be_sent: The properly-formatted uart-wifi message as it is
+        to be sent.
+        :returns: a Future of what send_request would return. Connection
+            failures are raised here, before the future is created.
+        """
+        request = bytes(message_to_be_sent, "utf-8")
+        received = self._traced_exchange(request, _unprocessed)
+        return self._offload(_process_received, received, self.raw)
+
+    def submit_preview(self, internal_name: str) -> "Future":
+        """Request the preview image of a file and decode it on the
+        executor, see set_executor.
+        :internal_name: the name the printer calls the file. eg "1.pwmb"
+        :returns: a Future of what get_preview would return.
+        """
+        command = COMMANDS["getPreview2"]
+        received = self._traced_exchange(
+            command.encode(internal_name), _unprocessed
+        )
+        return self._offload(command.parser, received)
+
+    def _offload(self, function: Callable, *args) -> "Future":
+        """Call a function on the executor, or now when there is none."""
+        if self.executor is not None:
+            return self.executor.submit(function, *args)
+        # pylint: disable=import-outside-toplevel
+        from concurrent.futures import Future
+
+        future = Future()
+        try:
+            future.set_result(function(*args))
+        except Exception as exception:  # pylint: disable=broad-except
+            future.set_exception(exception)
+        return future
+
+    def send_requests(
+        self, messages_to_be_sent: List[str]
+    ) -> List[Union[str, MonoXResponseType]]:
+        """sends several Mono X requests over one connection in a single
+        round trip and matches the response frames back to them.
+        :messages_to_be_sent: the uart-wifi messages, eg. ["getstatus",
+            "sysinfo", "getfile"]. getPreview2 can not be batched.
+        :returns: one response per message, in the order sent. A message
+            which got no response has InvalidResponse("no response"). In raw
+            mode each response is the text of its frame.
+        """
+        verbs = []
+        payload = ""
+        for message in messages_to_be_sent:
+            message = message.strip()
+            if not message.endswith(","):
+                message += ","
+            verb = message.split(",", 1)[0]
+            command = COMMANDS.get(verb)
+            if command is not None and command.binary:
+                raise ValueError(verb + " can not be batched")
+            verbs.append(verb)
+            payload += message
+        request = bytes(payload, "utf-8")
+        return self._traced_exchange(
+            request,
+            lambda received: self._match(verbs, received),
+            len(verbs),
+            verbs,
+        )
+
+    def _match(
+        self, verbs: List[str], received: bytes
+    ) -> List[Union[str, MonoXResponseType]]:
+        """Match the frames received to the requests by their verbs.
+        :verbs: the verb of each request, in the order sent.
+        :received: the bytes received.
+        """
+        frames = defaultdict(deque)
+        received = received.decode(ENCODING, "replace")
+        for frame in received.split(END)[:-1]:
+            frame = frame.lstrip()
+            frames[frame.split(",", 1)[0]].append(frame)
+        responses = []
+        for verb in verbs:
+            if not frames[verb]:
+                responses.append(InvalidResponse("no response"))
+                continue
+            frame = frames[verb].popleft()
+            if self.raw:
+                responses.append(frame + END)
+                continue
+            response = parse_frame(frame)
+            if response is None:
+                response = InvalidResponse("no response")
+            responses.append(response)
+        return responses
+
     def _send_request(self, message: str) -> Iterable[MonoXResponseType]:
         """sends the Mono X request.
         :message_to_be_sent: The properly-formatted uart-wifi message as it is
@@ -96,59 +420,264 @@ class UartWifi:
         :returns: an object from Response class.
         """
         request = bytes(message_to_be_sent, "utf-8")
-        received: str = _do_request(
-            self.telnet_socket,
+        return self._traced_exchange(request, self._process)
+
+    def _process(
+        self, received: Union[bytes, bytearray]
+    ) -> Iterable[MonoXResponseType]:
+        """Turn what was received into response objects, unless raw."""
+        return _process_received(received, self.raw)
+
+    def get_preview(self, internal_name: str) -> MonoXResponseType:
+        """Request the preview image of a file.
+        :internal_name: the name the printer calls the file. eg "1.pwmb"
+        :returns: the MonoXPreviewImage, or InvalidResponse if the preview
+            did not arrive complete.
+        """
+        command = COMMANDS["getPreview2"]
+        return self._traced_exchange(
+            command.encode(internal_name), command.parser
+        )
+
+    def _traced_exchange(
+        self,
+        request: bytes,
+        process: Callable,
+        frames: int = 1,
+        verbs: List[str] = None,
+    ):
+        """Exchange the request and process what was received, reporting
+        the timings to the listeners.
+        :request: the encoded request.
+        :process: turns the text or bytes received into the result.
+        :frames: the number of frames to wait for.
+        :verbs: the command verbs of the request, for the retry policy.
+        """
+        if verbs is None:
+            verbs = [request.split(b",", 1)[0].decode(errors="replace")]
+        if not self.listeners:
+            return process(
+                self._guarded_exchange(request, None, frames, verbs)
+            )
+        # pylint: disable=import-outside-toplevel
+        from uart_wifi.instrumentation import RequestTrace
+
+        trace = RequestTrace(self.server_address, request)
+        try:
+            result = process(
+                self._guarded_exchange(request, trace, frames, verbs)
+            )
+        except Exception as exception:
+            trace.finish(exception)
+            self._notify(trace)
+            raise
+        trace.finish()
+        self._notify(trace)
+        return result
+
+    def _notify(self, trace: "RequestTrace") -> None:
+        """Call every listener with a finished trace."""
+        for listener in self.listeners:
+            try:
+                listener(trace)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("request listener failed")
+
+    def _guarded_exchange(
+        self,
+        request: bytes,
+        trace: Optional["RequestTrace"],
+        frames: int,
+        verbs: List[str],
+    ) -> Union[bytes, bytearray]:
+        """Exchange the request, applying the circuit breaker and retry
+        policy.
+        :request: the encoded request.
+        :trace: records the timings of the request when given.
+        :frames: the number of frames to wait for.
+        :verbs: the command verbs of the request.
+        """
+        attempt = 0
+        while True:
+            breaker = self.circuit_breaker
+            if breaker is not None:
+                breaker.before_request(self.server_address)
+            try:
+                received = self._exchange(
+                    request, trace, frames, self._is_idempotent(verbs)
+                )
+                if breaker is not None:
+                    # A printer which accepts the connection but never
+                    # answers is as unusable as one which refuses it.
+                    if received.rstrip().endswith(END_BYTES):
+                        breaker.record_success(self.server_address)
+                    else:
+                        breaker.record_failure(self.server_address)
+                return received
+            except ConnectionException:
+                if breaker is not None:
+                    breaker.record_failure(self.server_address)
+                attempt += 1
+                policy = self.retry_policy
+                if policy is None or not policy.should_retry(verbs, attempt):
+                    raise
+                _count_retry(trace, request)
+                time.sleep(policy.delay(attempt))
+            finally:
+                if breaker is not None:
+                    breaker.end_trial(self.server_address)
+
+    def _is_idempotent(self, verbs: List[str]) -> bool:
+        """Whether a request is safe to repeat, by the idempotent commands
+        of the retry policy, or of the protocol when there is none."""
+        if self.retry_policy is None:
+            return all(verb in IDEMPOTENT_COMMANDS for verb in verbs)
+        return all(verb in self.retry_policy.idempotent for verb in verbs)
+
+    def _exchange(
+        self,
+        request: bytes,
+        trace: "RequestTrace" = None,
+        frames: int = 1,
+        idempotent: bool = False,
+    ) -> Union[bytes, bytearray]:
+        """Send the request over a new or pooled connection.
+        :request: the encoded request.
+        :trace: records the timings of the request when given.
+        :frames: the number of frames to wait for.
+        :idempotent: True when the request is safe to send again.
+        :returns: the bytes received, in a bytearray for a preview.
+        """
+        if self.pool is not None:
+            return _do_pooled_request(
+                self.pool,
+                self.server_address,
+                request,
+                self.max_request_time,
+                self.timeouts,
+                trace,
+                frames,
+                idempotent,
+            )
+        return _do_request(
+            None,
             self.server_address,
             request,
             self.max_request_time,
+            self.timeouts,
+            trace,
+            frames,
         )
-        if self.raw:
-            return received
-        processed = _do_handle(received)
-        return processed
+
+    def iter_request(
+        self, message_to_be_sent: str
+    ) -> Iterator[Union[str, MonoXResponseType]]:
+        """sends the Mono X request and yields each response as its frame
+        arrives, so processing can overlap with the network transfer.
+        :message_to_be_sent: The properly-formatted uart-wifi message as it is
+        to be sent.
+        :returns: objects from Response class, or the text of each frame in
+            raw mode.
+        """
+        request = bytes(message_to_be_sent, "utf-8")
+        deadline = Deadline(self.timeouts)
+        parser = ResponseParser()
+        try:
+            sock = _setup_socket(
+                self.server_address, deadline.connect_timeout()
+            )
+        except OSError as exception:
+            raise ConnectionException(
+                "Could not connect to AnyCubic printer at "
+                + self.server_address[0]
+            ) from exception
+        try:
+            sock.sendall(request)
+            deadline.request_sent()
+            for chunk in FrameReader(sock).read_chunks(deadline):
+                if self.raw:
+                    yield from parser.feed_frames(chunk)
+                else:
+                    yield from parser.feed(chunk)
+            if self.raw:
+                if parser.pending:
+                    yield parser.pending
+            else:
+                yield from parser.flush()
+        except OSError as exception:
+            raise ConnectionException(
+                "Could not connect to AnyCubic printer at "
+                + self.server_address[0]
+            ) from exception
+        finally:
+            sock.close()
+
+
+def request_serial(uart: UartWifi) -> str:
+    """Request the serial of a printer with sysinfo.
+    :uart: the client of the printer.
+    :returns: the serial, see MonoXSysInfo.
+    :raises LookupError: if the printer did not report a serial.
+    """
+    for response in uart.send_request("sysinfo,"):
+        if isinstance(response, MonoXSysInfo):
+            return response.serial
+    raise LookupError("printer did not report a serial")
+
+
+def _process_received(
+    received: Union[bytes, bytearray], raw: bool
+) -> Union[str, bytearray, Iterable[MonoXResponseType]]:
+    """Turn what was received into response objects, unless raw. A module
+    function so that it can be sent to a ProcessPoolExecutor.
+    :received: the bytes received, in a bytearray for a preview.
+    :raw: True to return the text received instead.
+    """
+    if isinstance(received, bytearray):
+        return received if raw else [decode_preview(received)]
+    if raw:
+        return received.decode(ENCODING, "replace")
+    return parse_buffer(received)
+
+
+def _unprocessed(received: Union[bytes, bytearray]):
+    """Return what was received as it is."""
+    return received
 
 
 def _do_request(
-    sock: socket,
+    sock: Optional[socket],
     socket_address: tuple,
     to_be_sent: bytes,
     max_request_time: int,
-) -> str:
+    timeouts: RequestTimeouts = None,
+    trace: "RequestTrace" = None,
+    frames: int = 1,
+) -> Union[bytes, bytearray]:
     """Perform the request
 
-    :param sock: the socket to use for the request
+    :param sock: unused, a new connection is opened for each request
     :param request: the request to send
-    :return: a MonoX object"""
-    text_received = ""
+    :param timeouts: the limits to apply, max_request_time is the total
+        budget when not provided
+    :param trace: records the timings of the request when given
+    :param frames: the number of frames to wait for
+    :return: the bytes received"""
+    received = b""
+    deadline = Deadline(timeouts or RequestTimeouts(total=max_request_time))
     try:
-        sock = _setup_socket(socket_address)
+        sock = _setup_socket(socket_address, deadline.connect_timeout())
+        if trace is not None:
+            trace.connected = time.monotonic()
         sock.sendall(to_be_sent)
+        deadline.request_sent()
         sent_string = to_be_sent.decode()
         if sent_string.endswith("shutdown"):
-            return "shutdown,end"
-        if sent_string.startswith("b'getPreview2"):
-            text_received = bytearray()
-            print(text_received)
-            end_time = current_milli_time() + (max_request_time * 1000)
-            while (
-                not str(text_received).endswith(END)
-                and current_milli_time() < end_time
-            ):
-                text_received.extend(sock.recv(1))
-        else:
-
-            read_list = [sock]
-            port_read_delay = current_milli_time()
-            end_time = current_milli_time() + (max_request_time * 1000)
-            text_received = handle_request(
-                sock,
-                text_received,
-                end_time,
-                read_list,
-                port_read_delay,
-                max_request_time,
-            )
-
+            return b"shutdown,end"
+        reader = FrameReader(sock)
+        received = _read_response(reader, sent_string, deadline, frames)
+        if trace is not None:
+            trace.response_read(deadline, len(reader.received))
     except (
         OSError,
         ConnectionRefusedError,
@@ -158,167 +687,338 @@ def _do_request(
             "Could not connect to AnyCubic printer at " + socket_address[0]
         ) from exception
     finally:
-        sock.close()
-    return text_received
+        if sock is not None:
+            sock.close()
+    return received
 
 
-def handle_request(
-    sock, text_received, end_time, read_list, port_read_delay, max_request_time
-) -> str:
-    """performs the request handling"""
+def _do_pooled_request(
+    pool: "ConnectionPool",
+    socket_address: tuple,
+    to_be_sent: bytes,
+    max_request_time: int,
+    timeouts: RequestTimeouts = None,
+    trace: "RequestTrace" = None,
+    frames: int = 1,
+    idempotent: bool = False,
+) -> Union[bytes, bytearray]:
+    """Perform the request over a pooled connection. When a reused
+    connection fails, or is closed without an answer, an idempotent request
+    is sent once more on a new connection. Any other failure raises, as
+    the printer may already have acted on the request.
+
+    :param pool: the pool to take the connection from
+    :param socket_address: the (ip_address, port) tuple
+    :param to_be_sent: the request to send
+    :param timeouts: the limits to apply, max_request_time is the total
+        budget when not provided
+    :param trace: records the timings of the request when given
+    :param frames: the number of frames to wait for
+    :param idempotent: True when the request is safe to send again
+    :return: the bytes received"""
+    sent_string = to_be_sent.decode()
+    deadline = Deadline(timeouts or RequestTimeouts(total=max_request_time))
+    reuse = True
     while True:
-        current_time = current_milli_time()
-        if end_time > current_time or port_read_delay > current_time:
-            readable, [], [] = select.select(
-                read_list, [], [], max_request_time
+        try:
+            sock, reused = pool.acquire(
+                socket_address, deadline.connect_timeout(), reuse
             )
-            for read_port in readable:
-                if read_port is sock:
-                    port_read_delay = current_milli_time() + 8000
-                    text_received += str(read_port.recv(1).decode())
-        if end_time < current_milli_time() or text_received.endswith(",end"):
-            break
-    return text_received
+        except OSError as exception:
+            raise ConnectionException(
+                "Could not connect to AnyCubic printer at " + socket_address[0]
+            ) from exception
+        if trace is not None:
+            trace.connected = time.monotonic()
+            trace.reused = reused
+        reader = FrameReader(sock)
+        try:
+            sock.settimeout(as_timeout(deadline.remaining()))
+            sock.sendall(to_be_sent)
+            deadline.request_sent()
+            if sent_string.endswith("shutdown"):
+                pool.discard(sock)
+                return b"shutdown,end"
+            received = _read_response(reader, sent_string, deadline, frames)
+            if reused and reader.closed and not reader.received:
+                raise ConnectionResetError(
+                    "closed the connection without answering"
+                )
+        except OSError as exception:
+            pool.discard(sock)
+            if reused and idempotent:
+                _count_retry(trace, to_be_sent)
+                reuse = False
+                continue
+            raise ConnectionException(
+                "Could not connect to AnyCubic printer at " + socket_address[0]
+            ) from exception
+        if trace is not None:
+            trace.response_read(deadline, len(reader.received))
+        if (
+            reader.closed
+            or not reader.received.endswith(END_BYTES)
+            or (frames > 1 and reader.received.count(END_BYTES) < frames)
+        ):
+            pool.discard(sock)
+        else:
+            pool.release(socket_address, sock)
+        return received
 
 
-def _setup_socket(socket_address):
-    """Setup the socket for communication
-    socket_address: the tupple consisting of (ip_address, port).
+def _count_retry(trace: Optional["RequestTrace"], to_be_sent: bytes) -> None:
+    """Count a retry on a new connection in the trace, if any."""
+    if trace is not None:
+        trace.retries += 1
+        trace.bytes_sent += len(to_be_sent)
+
+
+def _read_response(
+    reader, sent_string: str, deadline: Deadline, frames: int = 1
+):
+    """Read the response to a request which has been sent.
+    :reader: the FrameReader for the connection.
+    :sent_string: the request as sent.
+    :deadline: the time limits of the request.
+    :frames: the number of frames to wait for.
+    :returns: the bytes received, in a bytearray for a binary frame.
     """
-    _LOGGER.debug("connecting to %s", socket_address)
-    sock = socket(AF_INET, SOCK_STREAM)
-    sock.settimeout(2)
-    sock.connect(socket_address)
-    sock.settimeout(MAX_REQUEST_TIME)
-    return sock
+    command = lookup(sent_string)
+    if command is not None and command.binary:
+        return bytearray(
+            reader.read_fixed(
+                command.header_fields, command.payload_size, deadline
+            )
+        )
+    if frames > 1:
+        reader.read_frames(frames, deadline)
+        return bytes(reader.received)
+    return reader.read(deadline)
 
 
-def __do_preview2(received_message: bytearray()):
-    """Handles preview by writing to file.
-    :received_message: The message, as received from UART wifi
-    protocol, to be converted to an image.
+class FrameReader:
+    """Reads ,end terminated frames from a socket in bulk.
+    Data is received in large chunks into a reusable buffer and only the
+    tail of the accumulated bytes is checked for the terminator.
     """
 
-    filename = received_message.decode("utf_8").split(",", 3)[1]
-    file = tempfile.gettempdir() + os.path.sep + filename + ".bmp"
-    print(file)
+    def __init__(self, sock: socket, read_size: int = READ_SIZE) -> None:
+        """Create a FrameReader.
+        :sock: the connected socket to read from.
+        :read_size: the maximum number of bytes to take per recv.
+        """
+        self.sock = sock
+        self._chunk = bytearray(read_size)
+        self._view = memoryview(self._chunk)
+        self.received = bytearray()
+        self.closed = False
 
-    output_file = open(file=file, mode="rb")
+    def read_frame(self, end_time: int) -> bytes:
+        """Read until the received data ends with a frame terminator, the
+        peer closes the connection or end_time passes.
+        :end_time: the deadline in milliseconds, see current_milli_time.
+        :returns: all bytes received so far.
+        """
+        total = (end_time - current_milli_time()) / 1000
+        return self.read(Deadline(RequestTimeouts(total=total)))
 
-    width = 240
-    height = 168
+    def read(self, deadline: Deadline) -> bytes:
+        """Read until the received data ends with a frame terminator, the
+        peer closes the connection or a limit of the deadline is exceeded.
+        :deadline: the time limits of the request.
+        :returns: all bytes received so far.
+        """
+        for _ in self.read_chunks(deadline):
+            pass
+        return bytes(self.received)
 
-    file_size = os.path.getsize(file)
-    pos_in_image = 0
-    max_line_length = width * 2
-    slices = []
-    for row in range(0, height):
-        current_slice = bytearray()
-        for current_byte in range(0, max_line_length):
-            current_byte = (row * max_line_length) + current_byte
-            if file_size >= current_byte:
-                current_slice.append(output_file.read(2))
-            current_byte += 2
-            slices.append(current_slice)
+    def read_chunks(self, deadline: Deadline) -> Iterator[bytes]:
+        """Read as read() does, yielding each chunk as it arrives.
+        :deadline: the time limits of the request.
+        :returns: the chunks received.
+        """
+        while not self.received.endswith(END_BYTES):
+            if not self._wait(deadline):
+                break
+            count = self.sock.recv_into(self._view)
+            if count == 0:
+                self.closed = True
+                break
+            deadline.byte_received()
+            chunk = self._view[:count]
+            self.received += chunk
+            yield chunk
 
-    my_slice = [[]]
-    for byte in slices:
-        print(type(byte))
-        my_slice[pos_in_image] = byte[0]
-        pos_in_image += 1
-        if pos_in_image > (240 * 2):
-            pos_in_image = 0
-            current_slice = bytearray
-            my_slice.append(current_slice)
+    def read_frames(self, count: int, deadline: Deadline) -> List[str]:
+        """Read until count frames have been received, the peer closes the
+        connection or a limit of the deadline is exceeded.
+        :count: the number of frames to wait for.
+        :deadline: the time limits of the request.
+        :returns: the text of each complete frame.
+        """
+        parser = ResponseParser()
+        frames = parser.feed_frames(self.received)
+        while len(frames) < count and self._wait(deadline):
+            received = self.sock.recv_into(self._view)
+            if received == 0:
+                self.closed = True
+                break
+            deadline.byte_received()
+            chunk = self._view[:received]
+            self.received += chunk
+            frames += parser.feed_frames(chunk)
+        return frames
 
-    # image = Image.new("RGB", (width, height))
-    # file_format = "bmp"  # The file extension of the sourced data
-    print(len(my_slice))
+    def read_fixed(
+        self, header_fields: int, payload_size: int, deadline: Deadline
+    ) -> bytes:
+        """Read a frame made of header_fields comma terminated text fields,
+        a binary payload of payload_size bytes and the terminator. The
+        payload is received straight into a preallocated buffer, so binary
+        data which happens to contain the terminator is not cut short.
+        :header_fields: the number of text fields before the payload.
+        :payload_size: the length of the binary payload.
+        :deadline: the time limits of the request.
+        :returns: all bytes of the frame received.
+        """
+        end = header_end(self.received, header_fields)
+        while end == -1:
+            if not self._wait(deadline):
+                return bytes(self.received)
+            count = self.sock.recv_into(self._view)
+            if count == 0:
+                self.closed = True
+                return bytes(self.received)
+            deadline.byte_received()
+            self.received += self._view[:count]
+            end = header_end(self.received, header_fields)
+        frame = bytearray(end + payload_size + len(END_BYTES))
+        filled = min(len(self.received), len(frame))
+        frame[:filled] = self.received[:filled]
+        frame_view = memoryview(frame)
+        while filled < len(frame):
+            if not self._wait(deadline):
+                break
+            count = self.sock.recv_into(frame_view[filled:])
+            if count == 0:
+                self.closed = True
+                break
+            deadline.byte_received()
+            filled += count
+        del frame[filled:]
+        self.received = frame
+        return bytes(frame)
 
-    print(my_slice)
+    def _wait(self, deadline: Deadline) -> bool:
+        """Wait for the socket to become readable within the deadline."""
+        remaining = deadline.remaining()
+        if remaining <= 0:
+            return False
+        readable, [], [] = select.select(
+            [self.sock], [], [], as_timeout(remaining)
+        )
+        return bool(readable)
 
-    # bytes(byte_array)
-    # image.write(output_file,file_format)
 
-    # output_file.close()
+def handle_request(
+    sock, text_received, end_time, read_list, port_read_delay, max_request_time
+) -> str:
+    """performs the request handling"""
+    # pylint: disable=unused-argument
+    reader = FrameReader(sock)
+    return text_received + reader.read_frame(end_time).decode(
+        ENCODING, "replace"
+    )
 
-    return MonoXPreviewImage("")
+
+def _setup_socket(socket_address, connect_timeout=CONNECT_TIMEOUT):
+    """Setup the socket for communication
+    socket_address: the tupple consisting of (ip_address, port).
+    connect_timeout: seconds allowed for the connection to be established.
+    """
+    _LOGGER.debug("connecting to %s", socket_address)
+    sock = socket(AF_INET, SOCK_STREAM)
+    sock.settimeout(as_timeout(connect_timeout))
+    sock.connect(socket_address)
+    sock.settimeout(MAX_REQUEST_TIME)
+    return sock
 
 
 def _do_handle(message: str) -> Iterable[MonoXResponseType]:
-    """Perform handling of the message received by the request"""
+    """Perform handling of the message received by the request
+    :message: the text received, or the bytes, see parse_buffer."""
     if message is None:
         return "no response"
+    if not isinstance(message, str):
+        return parse_buffer(message)
 
     lines = message.split(",end")
     recognized_response: Iterable = list()
     for line in lines:
-        fields: list(str) = line.split(",")
-        message_type = fields[0]
-        if len(fields) is Empty or len(fields) < 2:
-            continue
-        if message_type == "getstatus":
-            recognized_response.append(__do_status(fields))
-        elif message_type == "getfile":
-            recognized_response.append(__do_files(fields))
-        elif message_type == "sysinfo":
-            recognized_response.append(__do_sys_info(fields))
-        elif message_type == "gethistory":
-            recognized_response.append(__do_get_history(fields))
-        elif message_type == "doPreview2":
-            recognized_response.append(__do_preview2(fields))
-        # goprint,49.pwmb,end
-        elif message_type in [
-            "goprint",
-            "gostop",
-            "gopause",
-            "getmode",
-            "getwifi",
-        ]:
-            recognized_response.append(InvalidResponse(fields[1]))
-        else:
-            print("unrecognized command: " + message_type, file=sys.stderr)
-            print(line, file=sys.stderr)
-            if recognized_response is not None:
-                recognized_response.append(InvalidResponse(fields[1]))
+        response = parse_frame(line)
+        if response is not None:
+            recognized_response.append(response)
 
     return recognized_response
 
 
-def __do_get_history(fields: Iterable):
-    """Handles history processing."""
-    items = []
-    for field in fields:
-        if field in fields[0] or fields[-1]:
-            continue
-        items.append(field)
-    return items
-
-
-def __do_sys_info(fields: Iterable):
-    """Handles system info processing."""
-    sys_info = MonoXSysInfo()
-    if len(fields) > 2:
-        sys_info.model = fields[1]
-    if len(fields) > 3:
-        sys_info.firmware = fields[2]
-    if len(fields) > 4:
-        sys_info.serial = fields[3]
-    if len(fields) > 5:
-        sys_info.wifi = fields[4]
-    return sys_info
-
-
-def __do_files(fields: Iterable):
-    """Handles file processing."""
-    files = FileList(fields)
-    return files
-
-
-def __do_status(fields: Iterable):
-    """Handles status processing."""
-    status = MonoXStatus(fields)
-    return status
+class ResponseParser:
+    """Incremental parser. Bytes are pushed in as they arrive and response
+    objects are produced as soon as each ,end terminated frame completes.
+    """
+
+    def __init__(self) -> None:
+        """Create an empty ResponseParser."""
+        self._buffer = bytearray()
+        self._scanned = 0
+
+    def feed_frames(self, data: bytes) -> List[str]:
+        """Add received bytes. Only the new bytes are scanned for the
+        terminator.
+        :data: the bytes received.
+        :returns: the text of each frame completed by the data.
+        """
+        self._buffer += data
+        frames = []
+        start = 0
+        position = max(self._scanned - len(END_BYTES) + 1, 0)
+        while True:
+            position = self._buffer.find(END_BYTES, position)
+            if position == -1:
+                break
+            frames.append(
+                self._buffer[start:position].decode(ENCODING, "replace")
+            )
+            start = position = position + len(END_BYTES)
+        del self._buffer[:start]
+        self._scanned = len(self._buffer)
+        return frames
+
+    def feed(self, data: bytes) -> List[MonoXResponseType]:
+        """Add received bytes.
+        :data: the bytes received.
+        :returns: the response objects completed by the data.
+        """
+        responses = []
+        for frame in self.feed_frames(data):
+            response = parse_frame(frame)
+            if response is not None:
+                responses.append(response)
+        return responses
+
+    @property
+    def pending(self) -> str:
+        """The text received after the last complete frame."""
+        return self._buffer.decode(ENCODING, "replace")
+
+    def flush(self) -> List[MonoXResponseType]:
+        """Handle an unterminated remainder the way _do_handle would.
+        :returns: the response object for the remainder, if any.
+        """
+        response = parse_frame(self.pending)
+        self._buffer.clear()
+        self._scanned = 0
+        return [] if response is None else [response]
 
 
 def current_milli_time():
@@ -0,0 +1,272 @@
+"""A long running daemon which owns the printer connections.
+Each printer is polled once per interval and the latest parsed responses
+are served from memory as JSON over HTTP, on TCP or a Unix socket, so the
+load on the printers does not grow with the number of consumers.
+
+    GET /printers                       every printer
+    GET /printers/<key>                 one printer, by ip:port or serial
+    GET /printers/<key>/<part>          status, sysinfo, files or errors
+"""
+
+import json
+import logging
+import os
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Dict, Iterable, List, Optional, Union
+
+from .communication import CircuitBreaker
+from .fleet import DEFAULT_COMMANDS, MAX_WORKERS, FleetPoller, FleetResult
+
+_LOGGER = logging.getLogger(__name__)
+
+POLL_INTERVAL = 10  # seconds
+LISTEN_ADDRESS = ("127.0.0.1", 6080)
+PARTS = ("status", "sysinfo", "files", "errors")
+
+
+def _key(address: tuple) -> str:
+    """The name of a printer in the API, eg. 192.168.1.254:6000."""
+    return f"{address[0]}:{address[1]}"
+
+
+class PrinterDaemon:
+    """Polls a set of printers on a schedule and keeps the latest responses
+    of each as a snapshot. A printer which stops answering keeps its last
+    known responses, marked offline.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        targets: Iterable[tuple],
+        commands: Iterable[str] = DEFAULT_COMMANDS,
+        interval: float = POLL_INTERVAL,
+        max_workers: int = MAX_WORKERS,
+        circuit_breaker: CircuitBreaker = None,
+    ) -> None:
+        """Create a PrinterDaemon.
+        :targets: (ip_address, port) tuples to poll.
+        :commands: the requests to send to each printer every poll.
+        :interval: seconds from the start of one poll to the next.
+        :max_workers: the maximum number of printers polled at once.
+        :circuit_breaker: skips printers known to be offline. Defaults to a
+            new CircuitBreaker.
+        """
+        if circuit_breaker is None:
+            circuit_breaker = CircuitBreaker()
+        self.poller = FleetPoller(
+            targets,
+            commands,
+            max_workers=max_workers,
+            circuit_breaker=circuit_breaker,
+        )
+        self.interval = interval
+        self._snapshots: Dict[str, dict] = {
+            _key(target): {
+                "address": _key(target),
+                "online": False,
+                "polled_at": None,
+                "elapsed": None,
+                "status": None,
+                "sysinfo": None,
+                "files": None,
+                "errors": {},
+            }
+            for target in self.poller.targets
+        }
+        self._serials: Dict[str, str] = {}
+        self._encoded: Dict[tuple, bytes] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll_once(self) -> None:
+        """Poll every printer once and update the snapshots as each printer
+        answers. If the poll fails, the printers not yet updated are marked
+        offline and the exception is raised."""
+        pending = {_key(target) for target in self.poller.targets}
+        try:
+            for result in self.poller.poll():
+                self._store(result)
+                pending.discard(_key(result.address))
+        except Exception as exception:
+            self._mark_offline(pending, exception)
+            raise
+
+    def _mark_offline(self, keys: Iterable[str], error: Exception) -> None:
+        """Mark printers offline after a failed poll, keeping their last
+        known responses."""
+        with self._lock:
+            for key in keys:
+                snapshot = dict(self._snapshots[key])
+                snapshot["online"] = False
+                snapshot["polled_at"] = time.time()
+                snapshot["errors"] = {
+                    "poll": f"{type(error).__name__}: {error}"
+                }
+                self._snapshots[key] = snapshot
+            self._encoded.clear()
+
+    def _store(self, result: FleetResult) -> None:
+        """Replace the snapshot of a printer with a poll result."""
+        key = _key(result.address)
+        with self._lock:
+            snapshot = dict(self._snapshots[key])
+            snapshot["online"] = result.ok
+            snapshot["polled_at"] = time.time()
+            snapshot["elapsed"] = result.elapsed
+            snapshot["errors"] = {
+                verb: f"{type(error).__name__}: {error}"
+                for verb, error in result.errors.items()
+            }
+            for part in ("status", "sysinfo", "files"):
+                response = getattr(result, part)
+                if response is not None:
+                    snapshot[part] = response.to_dict()
+            if result.sysinfo is not None:
+                self._serials[result.sysinfo.serial] = key
+            self._snapshots[key] = snapshot
+            self._encoded.clear()
+
+    def _resolve(self, name: str) -> Optional[str]:
+        """The key of a printer named by ip:port or serial."""
+        if name in self._snapshots:
+            return name
+        return self._serials.get(name)
+
+    def snapshot(self, name: str) -> Optional[dict]:
+        """The latest snapshot of one printer.
+        :name: the ip:port or the serial of the printer.
+        :returns: the snapshot, or None for an unknown printer.
+        """
+        with self._lock:
+            key = self._resolve(name)
+            return None if key is None else self._snapshots[key]
+
+    def snapshots(self) -> List[dict]:
+        """The latest snapshot of every printer."""
+        with self._lock:
+            return list(self._snapshots.values())
+
+    def encoded(self, name: str = None, part: str = None) -> Optional[bytes]:
+        """A snapshot, or a part of one, as JSON. The encoding is kept
+        until the next poll result arrives, so repeated reads only cost a
+        lookup.
+        :name: the ip:port or serial of a printer, None for all of them.
+        :part: one of PARTS, None for the whole snapshot.
+        :returns: the JSON, or None for an unknown printer or part.
+        """
+        if part is not None and part not in PARTS:
+            return None
+        with self._lock:
+            key = None if name is None else self._resolve(name)
+            if name is not None and key is None:
+                return None
+            body = self._encoded.get((key, part))
+            if body is None:
+                if key is None:
+                    value = list(self._snapshots.values())
+                elif part is None:
+                    value = self._snapshots[key]
+                else:
+                    value = self._snapshots[key][part]
+                body = json.dumps(value).encode("utf-8")
+                self._encoded[(key, part)] = body
+            return body
+
+    def run(self) -> None:
+        """Poll on the interval until stop() is called."""
+        self._stop.clear()
+        while not self._stop.is_set():
+            start = time.monotonic()
+            try:
+                self.poll_once()
+            except Exception:  # pylint: disable=broad-except
+                # Keep polling, the printers are marked offline meanwhile.
+                _LOGGER.exception("polling the printers failed")
+            self._stop.wait(self.interval - (time.monotonic() - start))
+
+    def start(self) -> None:
+        """Poll from a background thread."""
+        self._thread = threading.Thread(target=self.run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop polling and wait for the background thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def serve(
+        self, address: Union[tuple, str] = LISTEN_ADDRESS
+    ) -> socketserver.BaseServer:
+        """Create the HTTP server for the API. Call serve_forever on it to
+        answer requests and shutdown to stop.
+        :address: a (host, port) tuple to listen on TCP, or the path of a
+            Unix socket.
+        :returns: the server, bound and listening.
+        :raises ValueError: for a Unix socket where they are not supported.
+        """
+        if isinstance(address, str):
+            if not hasattr(socketserver, "UnixStreamServer"):
+                raise ValueError(
+                    "Unix sockets are not supported here, listen on TCP"
+                )
+            if os.path.exists(address):
+                os.remove(address)
+            server = _UnixServer(address, _ApiHandler)
+        else:
+            server = _TcpServer(tuple(address), _ApiHandler)
+        server.printers = self
+        return server
+
+
+class _TcpServer(socketserver.ThreadingMixIn, HTTPServer):
+    """Answers API requests on TCP, a thread per connection."""
+
+    daemon_threads = True
+    printers: PrinterDaemon
+
+
+if hasattr(socketserver, "UnixStreamServer"):
+
+    class _UnixServer(
+        socketserver.ThreadingMixIn, socketserver.UnixStreamServer
+    ):
+        """Answers API requests on a Unix socket, a thread per
+        connection."""
+
+        daemon_threads = True
+        printers: PrinterDaemon
+
+
+class _ApiHandler(BaseHTTPRequestHandler):
+    """Serves snapshots from the PrinterDaemon of the server."""
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Answer a request for one of the API paths."""
+        path = [part for part in self.path.split("?")[0].split("/") if part]
+        body = None
+        if path and path[0] == "printers" and len(path) <= 3:
+            body = self.server.printers.encoded(*path[1:])
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        """The client, which has no address on a Unix socket."""
+        return str(self.client_address[0]) if self.client_address else "-"
+
+    def log_message(self, format, *args) -> None:  # pylint: disable=W0622
+        """Log requests at debug level instead of to stderr."""
+        _LOGGER.debug(format, *args)
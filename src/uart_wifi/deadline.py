@@ -0,0 +1,97 @@
+"""Time limits for requests to MonoX devices."""
+
+import time
+
+CONNECT_TIMEOUT = 2  # seconds
+MAX_REQUEST_TIME = 10  # seconds
+
+
+def as_timeout(seconds: float):
+    """Convert remaining seconds to a socket or select timeout, where None
+    blocks without limit."""
+    if seconds == float("inf"):
+        return None
+    return max(seconds, 0.001)
+
+
+class RequestTimeouts:
+    """Time limits applied to each request, in seconds. A limit of None is
+    not enforced.
+    """
+
+    def __init__(
+        self,
+        connect: float = CONNECT_TIMEOUT,
+        first_byte: float = None,
+        idle: float = None,
+        total: float = MAX_REQUEST_TIME,
+    ) -> None:
+        """Create RequestTimeouts.
+        :connect: the time allowed to establish the connection.
+        :first_byte: the time from sending the request to the first byte of
+            the response.
+        :idle: the longest gap between bytes once the response has started.
+        :total: the budget for the whole request, connecting included.
+        """
+        self.connect = connect
+        self.first_byte = first_byte
+        self.idle = idle
+        self.total = total
+
+    def copy(self, **changes) -> "RequestTimeouts":
+        """Copy these timeouts, replacing the given limits."""
+        values = dict(vars(self))
+        values.update(changes)
+        return RequestTimeouts(**values)
+
+
+class Deadline:
+    """Tracks the remaining time of one request against RequestTimeouts."""
+
+    def __init__(self, timeouts: RequestTimeouts) -> None:
+        """Start the clock for a request.
+        :timeouts: the limits to enforce.
+        """
+        self.timeouts = timeouts
+        self.started = time.monotonic()
+        self.sent = self.started
+        self.first_byte = None
+        self.last_byte = None
+
+    def connect_timeout(self) -> float:
+        """The time allowed for connecting, bounded by the total budget."""
+        connect = self.timeouts.connect
+        if connect is None:
+            return self._total_remaining(time.monotonic())
+        return min(connect, self._total_remaining(time.monotonic()))
+
+    def request_sent(self) -> None:
+        """Start waiting for the first byte."""
+        self.sent = time.monotonic()
+
+    def byte_received(self) -> None:
+        """Record activity on the connection."""
+        self.last_byte = time.monotonic()
+        if self.first_byte is None:
+            self.first_byte = self.last_byte
+
+    def remaining(self) -> float:
+        """Seconds left before the first exceeded limit. Zero or less means
+        the request should stop waiting."""
+        now = time.monotonic()
+        remaining = self._total_remaining(now)
+        if self.last_byte is None:
+            if self.timeouts.first_byte is not None:
+                first_byte_end = self.sent + self.timeouts.first_byte
+                remaining = min(remaining, first_byte_end - now)
+        elif self.timeouts.idle is not None:
+            remaining = min(
+                remaining, self.last_byte + self.timeouts.idle - now
+            )
+        return remaining
+
+    def _total_remaining(self, now: float) -> float:
+        """Seconds left of the total budget."""
+        if self.timeouts.total is None:
+            return float("inf")
+        return self.started + self.timeouts.total - now
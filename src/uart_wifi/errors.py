@@ -7,3 +7,7 @@ class AnycubicException(Exception):
 
 class ConnectionException(AnycubicException):
     """Problem when connecting"""
+
+
+class CircuitOpenException(ConnectionException):
+    """The printer is known to be offline, the request was not sent"""
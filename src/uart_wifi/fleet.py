@@ -0,0 +1,238 @@
+"""Concurrent polling of many MonoX devices."""
+
+import asyncio
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed
+from typing import (
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from uart_wifi.errors import AnycubicException, ConnectionException
+
+from .async_communication import AsyncUartWifi
+from .communication import MAX_REQUEST_TIME, CircuitBreaker, UartWifi
+from .response import (
+    FileList,
+    MonoXResponseType,
+    MonoXStatus,
+    MonoXSysInfo,
+    PrintHistory,
+)
+
+DEFAULT_COMMANDS = ("getstatus,", "sysinfo,", "getfile,")
+MAX_WORKERS = 16
+
+
+class FleetResult:
+    """The outcome of polling one printer."""
+
+    def __init__(self, address: tuple) -> None:
+        """Create a FleetResult.
+        :address: the (ip_address, port) tuple which was polled.
+        """
+        self.address = address
+        self.responses: Dict[str, Iterable[MonoXResponseType]] = {}
+        self.errors: Dict[str, Exception] = {}
+        self.elapsed = 0.0
+
+    @property
+    def ok(self) -> bool:  # pylint: disable=invalid-name
+        """True when every command was answered."""
+        return not self.errors
+
+    def _first(self, command: str, response_type: type):
+        """Find the first response of a type for a command verb."""
+        for response in self.responses.get(command, []):
+            if isinstance(response, response_type):
+                return response
+        return None
+
+    @property
+    def status(self) -> Optional[MonoXStatus]:
+        """The MonoXStatus from getstatus, if any."""
+        return self._first("getstatus", MonoXStatus)
+
+    @property
+    def sysinfo(self) -> Optional[MonoXSysInfo]:
+        """The MonoXSysInfo from sysinfo, if any."""
+        return self._first("sysinfo", MonoXSysInfo)
+
+    @property
+    def files(self) -> Optional[FileList]:
+        """The FileList from getfile, if any."""
+        return self._first("getfile", FileList)
+
+    @property
+    def history(self) -> Optional[PrintHistory]:
+        """The PrintHistory from gethistory, if any."""
+        return self._first("gethistory", PrintHistory)
+
+
+class FleetPoller:
+    """Polls a set of printers concurrently with bounded parallelism.
+    Results are produced as each printer finishes so one slow or offline
+    printer does not hold up the rest.
+    """
+
+    def __init__(
+        self,
+        targets: Iterable[tuple],
+        commands: Iterable[str] = DEFAULT_COMMANDS,
+        max_workers: int = MAX_WORKERS,
+        max_request_time: int = MAX_REQUEST_TIME,
+        circuit_breaker: CircuitBreaker = None,
+        executor: Executor = None,
+    ) -> None:
+        """Create a FleetPoller.
+        :targets: (ip_address, port) tuples to poll.
+        :commands: the requests to send to each printer, in order.
+        :max_workers: the maximum number of printers polled at once.
+        :max_request_time: the maximum time to wait for each response.
+        :circuit_breaker: skips printers known to be offline, so they do
+            not cost a timeout on every poll.
+        :executor: parses responses and decodes previews, eg. a
+            ProcessPoolExecutor so parsing does not hold up the network I/O
+            of other printers. None parses on the polling threads.
+        """
+        self.targets = [tuple(target) for target in targets]
+        self.commands = list(commands)
+        self.max_workers = max_workers
+        self.max_request_time = max_request_time
+        self.circuit_breaker = circuit_breaker
+        self.executor = executor
+
+    def poll(
+        self, callback: Callable[[FleetResult], None] = None
+    ) -> Iterator[FleetResult]:
+        """Poll every printer on a thread pool.
+        :callback: optionally called with each result as it arrives.
+        :returns: an iterator of FleetResult in order of completion.
+        """
+        workers = max(1, min(self.max_workers, len(self.targets)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self._poll_printer, target): target
+                for target in self.targets
+            }
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as exception:  # pylint: disable=broad-except
+                    result = self._failed(futures[future], exception)
+                if callback is not None:
+                    callback(result)
+                yield result
+
+    def poll_all(self) -> List[FleetResult]:
+        """Poll every printer and wait for all results."""
+        return list(self.poll())
+
+    def fetch_previews(
+        self, previews: Iterable[Tuple[tuple, str]]
+    ) -> Iterator[Tuple[tuple, str, Union[MonoXResponseType, Exception]]]:
+        """Fetch many preview images, downloading on a thread pool and
+        decoding on the executor.
+        :previews: (target, internal name) pairs, eg.
+            ((192.168.1.254, 6000), "1.pwmb").
+        :returns: an iterator of (target, internal name, preview) in order
+            of completion. The preview is a MonoXPreviewImage, an
+            InvalidResponse if it was incomplete or the exception raised.
+        """
+        previews = [(tuple(target), name) for target, name in previews]
+        workers = max(1, min(self.max_workers, len(previews)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(self._fetch_preview, target, name): (target, name)
+                for target, name in previews
+            }
+            for future in as_completed(futures):
+                target, name = futures[future]
+                try:
+                    preview = future.result()
+                except (AnycubicException, OSError) as exception:
+                    preview = exception
+                yield target, name, preview
+
+    def _fetch_preview(self, target: tuple, name: str) -> MonoXResponseType:
+        """Download one preview and wait for it to be decoded."""
+        return self._client(target).submit_preview(name).result()
+
+    def _client(self, target: tuple) -> UartWifi:
+        """A client for one printer with the settings of the poller."""
+        uart = UartWifi(*target)
+        uart.set_maximum_request_time(self.max_request_time)
+        uart.set_circuit_breaker(self.circuit_breaker)
+        uart.set_executor(self.executor)
+        return uart
+
+    async def async_poll(self) -> AsyncIterator[FleetResult]:
+        """Poll every printer from the running event loop.
+        :returns: an async iterator of FleetResult in order of completion.
+        """
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def bounded(target: tuple) -> FleetResult:
+            async with semaphore:
+                return await self._async_poll_printer(target)
+
+        for next_result in asyncio.as_completed(
+            [bounded(target) for target in self.targets]
+        ):
+            yield await next_result
+
+    def _failed(self, target: tuple, exception: Exception) -> FleetResult:
+        """The result of a printer whose poll raised, with the exception
+        recorded for every command."""
+        result = FleetResult(target)
+        for command in self.commands:
+            result.errors[command.split(",")[0]] = exception
+        return result
+
+    def _poll_printer(self, target: tuple) -> FleetResult:
+        """Send every command to one printer."""
+        result = FleetResult(target)
+        start = time.monotonic()
+        uart = self._client(target)
+        for command in self.commands:
+            verb = command.split(",")[0]
+            try:
+                result.responses[verb] = uart.submit_request(command).result()
+            except ConnectionException as exception:
+                result.errors[verb] = exception
+                break  # the printer is unreachable, skip the rest.
+            except Exception as exception:  # pylint: disable=broad-except
+                # A response which could not be parsed must not stop the
+                # rest of the commands, or the rest of the fleet.
+                result.errors[verb] = exception
+        result.elapsed = time.monotonic() - start
+        return result
+
+    async def _async_poll_printer(self, target: tuple) -> FleetResult:
+        """Send every command to one printer without blocking the loop."""
+        result = FleetResult(target)
+        start = time.monotonic()
+        uart = AsyncUartWifi(*target)
+        uart.set_maximum_request_time(self.max_request_time)
+        uart.set_circuit_breaker(self.circuit_breaker)
+        uart.set_executor(self.executor)
+        for command in self.commands:
+            verb = command.split(",")[0]
+            try:
+                result.responses[verb] = await uart.send_request(command)
+            except ConnectionException as exception:
+                result.errors[verb] = exception
+                break  # the printer is unreachable, skip the rest.
+            except Exception as exception:  # pylint: disable=broad-except
+                # A response which could not be parsed must not stop the
+                # rest of the commands, or the rest of the fleet.
+                result.errors[verb] = exception
+        result.elapsed = time.monotonic() - start
+        return result
@@ -0,0 +1,173 @@
+"""An index of print history across printers.
+The gethistory entries of each printer are merged by serial into a sqlite
+database, so finished prints can be searched by file name, date, duration
+and resin volume without asking the printers again.
+"""
+
+import sqlite3
+import threading
+from typing import Iterable, List, Optional
+
+from .communication import UartWifi, request_serial
+from .response import HistoryEntry, PrintHistory
+
+COLUMNS = ("serial", "idx", "file", "started", "duration", "volume", "layers")
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    serial TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    file TEXT,
+    started REAL,
+    duration INTEGER,
+    volume REAL,
+    layers INTEGER
+);
+CREATE UNIQUE INDEX IF NOT EXISTS history_entry
+    ON history (serial, idx, IFNULL(started, -1));
+CREATE INDEX IF NOT EXISTS history_file ON history (file);
+CREATE INDEX IF NOT EXISTS history_started ON history (started);
+"""
+
+
+def _entries(responses: Iterable) -> Optional[PrintHistory]:
+    """The PrintHistory among the responses to gethistory, if any."""
+    for response in responses:
+        if isinstance(response, PrintHistory):
+            return response
+    return None
+
+
+class HistoryIndex:
+    """Print history of many printers in one sqlite database.
+    Entries are keyed by printer serial, entry number and start time, so
+    fetching the history again only adds the prints which are new, and
+    entries numbered again after the printer history was deleted are kept
+    apart from the old ones.
+    """
+
+    def __init__(self, path: str = ":memory:") -> None:
+        """Create a HistoryIndex.
+        :path: the database file, created when missing. Defaults to an
+            index held in memory.
+        """
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def merge(self, serial: str, history: PrintHistory) -> int:
+        """Add the entries of a printer history.
+        :serial: the serial of the printer, see MonoXSysInfo.
+        :history: the PrintHistory from gethistory.
+        :returns: the number of entries which were not indexed before.
+        """
+        rows = [
+            (
+                serial,
+                entry.index,
+                entry.file,
+                entry.started,
+                entry.duration,
+                entry.volume,
+                entry.layers,
+            )
+            for entry in history.entries
+            if entry.index is not None
+        ]
+        with self._lock, self._connection:
+            before = self._connection.total_changes
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO history VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            return self._connection.total_changes - before
+
+    def fetch(self, uart: UartWifi, serial: str = None) -> int:
+        """Request the history of a printer and merge it.
+        :uart: the printer to ask.
+        :serial: the serial of the printer. Requested from sysinfo when
+            not given.
+        :returns: the number of new entries.
+        """
+        if serial is None:
+            serial = request_serial(uart)
+        history = _entries(uart.send_request("gethistory,end"))
+        if history is None:
+            return 0
+        return self.merge(serial, history)
+
+    def record_result(self, result) -> int:
+        """Merge the history of a fleet.FleetResult polled with sysinfo and
+        gethistory.
+        :returns: the number of new entries.
+        """
+        if result.sysinfo is None or result.history is None:
+            return 0
+        return self.merge(result.sysinfo.serial, result.history)
+
+    # pylint: disable=too-many-arguments
+    def query(
+        self,
+        serial: str = None,
+        file: str = None,
+        since: float = None,
+        until: float = None,
+        min_duration: int = None,
+        max_duration: int = None,
+        min_volume: float = None,
+        max_volume: float = None,
+        limit: int = None,
+    ) -> List[HistoryEntry]:
+        """Find finished prints, newest first. Every condition given must
+        hold.
+        :serial: only prints of this printer.
+        :file: the file name, which may contain * and ? wildcards.
+        :since: prints started at or after, in seconds since the epoch.
+        :until: prints started before, in seconds since the epoch.
+        :min_duration: prints which took at least this many seconds.
+        :max_duration: prints which took at most this many seconds.
+        :min_volume: prints which used at least this many millilitres.
+        :max_volume: prints which used at most this many millilitres.
+        :limit: the most entries to return.
+        """
+        conditions = []
+        values = []
+        for condition, value in (
+            ("serial = ?", serial),
+            ("file GLOB ?", file),
+            ("started >= ?", since),
+            ("started < ?", until),
+            ("duration >= ?", min_duration),
+            ("duration <= ?", max_duration),
+            ("volume >= ?", min_volume),
+            ("volume <= ?", max_volume),
+        ):
+            if value is not None:
+                conditions.append(condition)
+                values.append(value)
+        sql = f"SELECT {', '.join(COLUMNS)} FROM history"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY started DESC, serial, idx DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            values.append(limit)
+        with self._lock:
+            rows = self._connection.execute(sql, values).fetchall()
+        return [
+            HistoryEntry(index, file_name, *fields, serial=printer)
+            for printer, index, file_name, *fields in rows
+        ]
+
+    def serials(self) -> List[str]:
+        """The printers with indexed history."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT DISTINCT serial FROM history ORDER BY serial"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,317 @@
+"""Per-request timings and an in-process aggregate of them.
+Listeners added with UartWifi.add_listener receive a RequestTrace after
+every request. MetricsAggregator is such a listener and exports what it
+has seen as Prometheus text or JSON.
+"""
+import json
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from .deadline import Deadline
+
+PHASES = ("connect", "ttfb", "transfer", "parse", "total")
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+# pylint: disable=too-many-instance-attributes
+class RequestTrace:
+    """The timings of one request, as time.monotonic() values.
+    A phase which was not reached is None.
+    """
+
+    __slots__ = (
+        "address",
+        "command",
+        "started",
+        "connected",
+        "sent",
+        "first_byte",
+        "received",
+        "finished",
+        "bytes_sent",
+        "bytes_received",
+        "retries",
+        "reused",
+        "error",
+    )
+
+    def __init__(self, address: tuple, request: bytes) -> None:
+        """Start tracing a request.
+        :address: the (ip_address, port) of the printer.
+        :request: the request as sent.
+        """
+        self.address = address
+        self.command = request.split(b",", 1)[0].decode(errors="replace")
+        self.started = time.monotonic()
+        self.connected = None
+        self.sent = None
+        self.first_byte = None
+        self.received = None
+        self.finished = None
+        self.bytes_sent = len(request)
+        self.bytes_received = 0
+        self.retries = 0
+        self.reused = False
+        self.error = None
+
+    def response_read(self, deadline: Deadline, received: int) -> None:
+        """Record the end of the transfer.
+        :deadline: the deadline of the request, which saw the first byte.
+        :received: the number of bytes received.
+        """
+        self.sent = deadline.sent
+        self.first_byte = deadline.first_byte
+        self.received = time.monotonic()
+        self.bytes_received = received
+
+    def finish(self, exception: BaseException = None) -> None:
+        """Record the end of the request.
+        :exception: what the request failed with. The underlying cause of a
+            ConnectionException is recorded, eg. ConnectionRefusedError.
+        """
+        self.finished = time.monotonic()
+        if exception is not None:
+            cause = exception.__cause__ or exception
+            self.error = type(cause).__name__
+
+    @staticmethod
+    def _span(start: Optional[float], end: Optional[float]):
+        """Seconds between two points, None if either was not reached."""
+        if start is None or end is None:
+            return None
+        return end - start
+
+    @property
+    def connect_time(self) -> Optional[float]:
+        """Seconds to connect, or to take a pooled connection."""
+        return self._span(self.started, self.connected)
+
+    @property
+    def ttfb(self) -> Optional[float]:
+        """Seconds from sending the request to the first byte received."""
+        return self._span(self.sent, self.first_byte)
+
+    @property
+    def transfer_time(self) -> Optional[float]:
+        """Seconds from the first byte to the end of the response."""
+        return self._span(self.first_byte, self.received)
+
+    @property
+    def parse_time(self) -> Optional[float]:
+        """Seconds spent turning the response into objects."""
+        return self._span(self.received, self.finished)
+
+    @property
+    def total_time(self) -> Optional[float]:
+        """Seconds for the whole request."""
+        return self._span(self.started, self.finished)
+
+    def phases(self) -> Dict[str, Optional[float]]:
+        """The duration of each of PHASES."""
+        return {
+            "connect": self.connect_time,
+            "ttfb": self.ttfb,
+            "transfer": self.transfer_time,
+            "parse": self.parse_time,
+            "total": self.total_time,
+        }
+
+
+class _Stats:
+    """Aggregated traces of one command to one printer."""
+
+    __slots__ = (
+        "count",
+        "errors",
+        "sums",
+        "counts",
+        "max_total",
+        "buckets",
+        "bytes_sent",
+        "bytes_received",
+        "retries",
+    )
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors: Dict[str, int] = {}
+        self.sums = dict.fromkeys(PHASES, 0.0)
+        self.counts = dict.fromkeys(PHASES, 0)
+        self.max_total = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.retries = 0
+
+    def add(self, trace: RequestTrace) -> None:
+        """Count a trace."""
+        self.count += 1
+        if trace.error is not None:
+            self.errors[trace.error] = self.errors.get(trace.error, 0) + 1
+        for phase, duration in trace.phases().items():
+            if duration is not None:
+                self.sums[phase] += duration
+                self.counts[phase] += 1
+        total = trace.total_time or 0.0
+        self.max_total = max(self.max_total, total)
+        self.buckets[bisect_left(BUCKETS, total)] += 1
+        self.bytes_sent += trace.bytes_sent
+        self.bytes_received += trace.bytes_received
+        self.retries += trace.retries
+
+    def to_dict(self) -> dict:
+        """The statistics, with the mean of each phase."""
+        return {
+            "count": self.count,
+            "errors": dict(self.errors),
+            "mean": {
+                phase: self.sums[phase] / self.counts[phase]
+                for phase in PHASES
+                if self.counts[phase]
+            },
+            "max_total": self.max_total,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "retries": self.retries,
+        }
+
+
+def _label(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsAggregator:
+    """A thread safe listener which aggregates traces per printer and
+    command."""
+
+    def __init__(self) -> None:
+        self._stats: Dict[Tuple[str, str], _Stats] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, trace: RequestTrace) -> None:
+        """Count a trace."""
+        printer = f"{trace.address[0]}:{trace.address[1]}"
+        with self._lock:
+            stats = self._stats.get((printer, trace.command))
+            if stats is None:
+                stats = self._stats[(printer, trace.command)] = _Stats()
+            stats.add(trace)
+
+    def reset(self) -> None:
+        """Forget everything counted."""
+        with self._lock:
+            self._stats.clear()
+
+    def slowest(self, count: int = 5) -> List[Tuple[str, float]]:
+        """The printers with the highest mean request time.
+        :count: the number of printers to list.
+        :returns: (printer, mean seconds) pairs, slowest first.
+        """
+        totals: Dict[str, List[float]] = {}
+        with self._lock:
+            for (printer, _), stats in self._stats.items():
+                total = totals.setdefault(printer, [0.0, 0])
+                total[0] += stats.sums["total"]
+                total[1] += stats.counts["total"]
+        means = [
+            (printer, seconds / requests)
+            for printer, (seconds, requests) in totals.items()
+            if requests
+        ]
+        return sorted(means, key=lambda mean: mean[1], reverse=True)[:count]
+
+    def to_dict(self) -> dict:
+        """The statistics of each printer and command."""
+        with self._lock:
+            return {
+                printer: {
+                    command: stats.to_dict()
+                    for (other, command), stats in self._stats.items()
+                    if other == printer
+                }
+                for printer, _ in self._stats
+            }
+
+    def to_json(self) -> str:
+        """The statistics as JSON."""
+        return json.dumps(self.to_dict(), indent=2, sort_keys=True)
+
+    def to_prometheus(self) -> str:
+        """The statistics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP uart_wifi_requests_total Requests sent to printers.",
+            "# TYPE uart_wifi_requests_total counter",
+        ]
+        errors = [
+            "# HELP uart_wifi_request_errors_total Failed requests.",
+            "# TYPE uart_wifi_request_errors_total counter",
+        ]
+        phases = [
+            "# HELP uart_wifi_request_phase_seconds Time spent per phase.",
+            "# TYPE uart_wifi_request_phase_seconds summary",
+        ]
+        durations = [
+            "# HELP uart_wifi_request_duration_seconds Request duration.",
+            "# TYPE uart_wifi_request_duration_seconds histogram",
+        ]
+        transfer = [
+            "# HELP uart_wifi_bytes_total Bytes sent and received.",
+            "# TYPE uart_wifi_bytes_total counter",
+        ]
+        retries = [
+            "# HELP uart_wifi_retries_total Requests retried on a new"
+            " connection.",
+            "# TYPE uart_wifi_retries_total counter",
+        ]
+        with self._lock:
+            for (printer, command), stats in sorted(self._stats.items()):
+                labels = (
+                    f'printer="{_label(printer)}",'
+                    f'command="{_label(command)}"'
+                )
+                lines.append(
+                    f"uart_wifi_requests_total{{{labels}}} {stats.count}"
+                )
+                for error, count in sorted(stats.errors.items()):
+                    errors.append(
+                        f"uart_wifi_request_errors_total{{{labels},"
+                        f'error="{_label(error)}"}} {count}'
+                    )
+                for phase in PHASES:
+                    name = "uart_wifi_request_phase_seconds"
+                    phase_labels = f'{labels},phase="{phase}"'
+                    phases.append(
+                        f"{name}_sum{{{phase_labels}}} {stats.sums[phase]}"
+                    )
+                    phases.append(
+                        f"{name}_count{{{phase_labels}}} {stats.counts[phase]}"
+                    )
+                cumulative = 0
+                name = "uart_wifi_request_duration_seconds"
+                for bound, count in zip(BUCKETS + ("+Inf",), stats.buckets):
+                    cumulative += count
+                    durations.append(
+                        f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+                    )
+                durations.append(
+                    f"{name}_sum{{{labels}}} {stats.sums['total']}"
+                )
+                durations.append(f"{name}_count{{{labels}}} {stats.count}")
+                transfer.append(
+                    f'uart_wifi_bytes_total{{{labels},direction="sent"}} '
+                    f"{stats.bytes_sent}"
+                )
+                transfer.append(
+                    f'uart_wifi_bytes_total{{{labels},direction="received"}} '
+                    f"{stats.bytes_received}"
+                )
+                retries.append(
+                    f"uart_wifi_retries_total{{{labels}}} {stats.retries}"
+                )
+        return (
+            "\n".join(lines + errors + phases + durations + transfer + retries)
+            + "\n"
+        )
@@ -0,0 +1,141 @@
+"""Keep-alive connection pooling for MonoX devices."""
+
+import logging
+import select
+import threading
+import time
+from socket import AF_INET, SOCK_STREAM, socket
+from typing import Dict, List, Tuple
+
+from uart_wifi.deadline import CONNECT_TIMEOUT
+
+MAX_IDLE_TIME = 30  # seconds
+MAX_IDLE_PER_PRINTER = 2
+_LOGGER = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """Idle connections per (ip, port), shared between UartWifi instances.
+    Connections are checked before being handed out again, and each
+    checkout first closes every connection idle for max_idle_time.
+    """
+
+    def __init__(
+        self,
+        max_idle_time: float = MAX_IDLE_TIME,
+        max_idle_per_printer: int = MAX_IDLE_PER_PRINTER,
+    ) -> None:
+        """Create a ConnectionPool.
+        :max_idle_time: seconds an unused connection is kept open.
+        :max_idle_per_printer: idle connections kept for each printer.
+        """
+        self.max_idle_time = max_idle_time
+        self.max_idle_per_printer = max_idle_per_printer
+        self._idle: Dict[tuple, List[Tuple[socket, float]]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(
+        self,
+        address: tuple,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        reuse: bool = True,
+    ) -> Tuple[socket, bool]:
+        """Get a connection to the printer.
+        :address: the (ip_address, port) tuple.
+        :connect_timeout: seconds to wait when a new connection is needed.
+        :reuse: False to always open a new connection.
+        :returns: the socket and whether it was reused from the pool.
+        """
+        with self._lock:
+            self._evict(time.monotonic())
+            idle = self._idle.get(address, []) if reuse else []
+            while idle:
+                sock, _ = idle.pop()
+                if _is_healthy(sock):
+                    return sock, True
+                sock.close()
+        return _connect(address, connect_timeout), False
+
+    def release(self, address: tuple, sock: socket) -> None:
+        """Return a connection after a complete exchange.
+        :address: the (ip_address, port) tuple the socket is connected to.
+        :sock: the socket to keep for later use.
+        """
+        with self._lock:
+            idle = self._idle.setdefault(address, [])
+            if len(idle) < self.max_idle_per_printer:
+                idle.append((sock, time.monotonic()))
+                return
+        sock.close()
+
+    @staticmethod
+    def discard(sock: socket) -> None:
+        """Close a connection which must not be reused.
+        :sock: the socket to close.
+        """
+        sock.close()
+
+    def evict_idle(self) -> int:
+        """Close connections which have been idle too long.
+        :returns: the number of connections closed.
+        """
+        with self._lock:
+            return self._evict(time.monotonic())
+
+    def _evict(self, now: float) -> int:
+        """Close connections idle since before max_idle_time, holding the
+        lock.
+        :returns: the number of connections closed.
+        """
+        evicted = 0
+        for idle in self._idle.values():
+            fresh = [e for e in idle if now - e[1] < self.max_idle_time]
+            for sock, last_used in idle:
+                if now - last_used >= self.max_idle_time:
+                    sock.close()
+                    evicted += 1
+            idle[:] = fresh
+        return evicted
+
+    def idle_count(self, address: tuple) -> int:
+        """Number of idle connections held for a printer.
+        :address: the (ip_address, port) tuple.
+        """
+        with self._lock:
+            return len(self._idle.get(address, []))
+
+    def close(self) -> None:
+        """Close every idle connection."""
+        with self._lock:
+            for idle in self._idle.values():
+                for sock, _ in idle:
+                    sock.close()
+            self._idle.clear()
+
+
+def _is_healthy(sock: socket) -> bool:
+    """An idle connection must have nothing to read. A readable idle socket
+    has been closed or reset by the printer, or holds stray data."""
+    try:
+        readable, [], [] = select.select([sock], [], [], 0)
+    except (OSError, ValueError):
+        return False
+    return not readable
+
+
+def _connect(socket_address: tuple, connect_timeout: float) -> socket:
+    """Open a new connection.
+    socket_address: the tupple consisting of (ip_address, port).
+    """
+    _LOGGER.debug("connecting to %s", socket_address)
+    sock = socket(AF_INET, SOCK_STREAM)
+    try:
+        sock.settimeout(connect_timeout)
+        sock.connect(socket_address)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+SHARED_POOL = ConnectionPool()
@@ -0,0 +1,117 @@
+"""Preview image decoding for getPreview2 responses.
+The printer sends a 240x168 RGB565 little-endian bitmap. Conversion to
+RGB888 is done in bulk with NumPy when it is installed, otherwise through
+a lookup table applied with array and map so no Python code runs per pixel.
+NumPy is only imported when the first preview is converted.
+"""
+import struct
+import sys
+from array import array
+
+_UNLOADED = object()
+numpy = _UNLOADED  # pylint: disable=invalid-name
+PREVIEW_WIDTH = 240
+PREVIEW_HEIGHT = 168
+PREVIEW_SIZE = PREVIEW_WIDTH * PREVIEW_HEIGHT * 2
+_WORD = "I" if array("I").itemsize == 4 else "L"
+_TABLE = None
+
+
+def _numpy():
+    """The numpy module, imported on first use, or None if missing."""
+    global numpy  # pylint: disable=global-statement,invalid-name
+    if numpy is _UNLOADED:
+        try:
+            import numpy as module  # pylint: disable=import-outside-toplevel
+        except ImportError:  # pragma: no cover - numpy is optional
+            module = None
+        numpy = module
+    return numpy
+
+
+def _rgbx_table() -> array:
+    """RGB565 value to R | G << 8 | B << 16, built on first use."""
+    global _TABLE  # pylint: disable=global-statement
+    if _TABLE is None:
+        red = [(value << 3) | (value >> 2) for value in range(32)]
+        green = [(value << 2) | (value >> 4) for value in range(64)]
+        _TABLE = array(
+            _WORD,
+            (
+                red[value >> 11]
+                | green[(value >> 5) & 0x3F] << 8
+                | red[value & 0x1F] << 16
+                for value in range(65536)
+            ),
+        )
+    return _TABLE
+
+
+def rgb565_to_rgb888(data: bytes) -> bytes:
+    """Convert little-endian RGB565 pixels to packed RGB888.
+    :data: two bytes per pixel.
+    :returns: three bytes per pixel.
+    """
+    if _numpy() is not None:
+        return _rgb565_to_rgb888_numpy(data)
+    pixels = array("H")
+    pixels.frombytes(memoryview(data)[: len(data) & ~1])
+    if sys.byteorder == "big":
+        pixels.byteswap()
+    rgbx = array(_WORD, map(_rgbx_table().__getitem__, pixels))
+    if sys.byteorder == "big":
+        rgbx.byteswap()
+    rgb = bytearray(rgbx.tobytes())
+    del rgb[3::4]
+    return bytes(rgb)
+
+
+def _rgb565_to_rgb888_numpy(data: bytes) -> bytes:
+    """NumPy implementation of rgb565_to_rgb888."""
+    pixels = numpy.frombuffer(data, dtype="<u2", count=len(data) // 2)
+    rgb = numpy.empty((pixels.size, 3), dtype=numpy.uint8)
+    red = (pixels >> 11) & 0x1F
+    green = (pixels >> 5) & 0x3F
+    blue = pixels & 0x1F
+    rgb[:, 0] = (red << 3) | (red >> 2)
+    rgb[:, 1] = (green << 2) | (green >> 4)
+    rgb[:, 2] = (blue << 3) | (blue >> 2)
+    return rgb.tobytes()
+
+
+def rgb888_to_bmp(rgb: bytes, width: int, height: int) -> bytes:
+    """Encode packed RGB888 pixels as a 24 bit BMP file.
+    :rgb: three bytes per pixel, top row first.
+    :width: the image width in pixels.
+    :height: the image height in pixels.
+    """
+    bgr = bytearray(rgb)
+    bgr[0::3], bgr[2::3] = rgb[2::3], rgb[0::3]
+    row_size = width * 3
+    padding = b"\0" * (-row_size % 4)
+    rows = [
+        bgr[row * row_size : (row + 1) * row_size] + padding
+        for row in range(height - 1, -1, -1)
+    ]
+    pixel_data = b"".join(rows)
+    header_size = 14 + 40
+    return (
+        struct.pack(
+            "<2sIHHI", b"BM", header_size + len(pixel_data), 0, 0, header_size
+        )
+        + struct.pack(
+            "<IiiHHIIiiII",
+            40,
+            width,
+            height,
+            1,
+            24,
+            0,
+            len(pixel_data),
+            2835,
+            2835,
+            0,
+            0,
+        )
+        + pixel_data
+    )
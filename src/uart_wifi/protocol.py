@@ -0,0 +1,236 @@
+"""The uart-wifi protocol. Each command verb is registered once in COMMANDS
+with how its request is encoded, how its response frame is parsed, whether
+it is safe to repeat and the shape of its response frame. The client and
+the simulator both dispatch on the verb through this table.
+
+Received bytes are parsed in place: frames are found by offset in the
+buffer and each is decoded on its own, as plain ASCII when it is, which is
+almost always and much faster, and as ENCODING otherwise.
+"""
+
+import logging
+from typing import Callable, Dict, List, Optional, Union
+
+from .preview import PREVIEW_SIZE, rgb565_to_rgb888
+from .response import (
+    FileList,
+    InvalidResponse,
+    MonoXPreviewImage,
+    MonoXResponseType,
+    MonoXStatus,
+    MonoXSysInfo,
+    PrintHistory,
+)
+
+END = ",end"
+END_BYTES = END.encode()
+ENCODING = "gbk"
+_LOGGER = logging.getLogger(__name__)
+
+
+class Command:
+    """How one command verb is sent and answered."""
+
+    __slots__ = (
+        "verb",
+        "parser",
+        "idempotent",
+        "end_required",
+        "header_fields",
+        "payload_size",
+    )
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        verb: str,
+        parser: Callable = None,
+        idempotent: bool = False,
+        end_required: bool = False,
+        header_fields: int = 0,
+        payload_size: int = 0,
+    ) -> None:
+        """Create a Command.
+        :verb: the first field of the request and of its response.
+        :parser: turns the fields of a response frame into a response
+            object, or the whole frame of a binary response. Defaults to
+            an InvalidResponse holding the second field, eg. OK.
+        :idempotent: True when the command is safe to repeat.
+        :end_required: True when the request must be terminated by end.
+        :header_fields: the text fields before a binary payload.
+        :payload_size: the length of a binary payload, 0 for text frames.
+        """
+        self.verb = verb
+        self.parser = parser if parser is not None else _message
+        self.idempotent = idempotent
+        self.end_required = end_required
+        self.header_fields = header_fields
+        self.payload_size = payload_size
+
+    @property
+    def binary(self) -> bool:
+        """True when the response carries a fixed size binary payload."""
+        return self.payload_size > 0
+
+    def encode(self, *arguments: str) -> bytes:
+        """The request for the command.
+        :arguments: the fields after the verb, eg. the internal file name.
+        """
+        fields = (self.verb,) + arguments
+        if self.end_required:
+            return (",".join(fields) + END).encode()
+        return (",".join(fields) + ",").encode()
+
+    def __repr__(self) -> str:
+        return f"Command({self.verb})"
+
+
+def register(command: Command) -> Command:
+    """Add or replace a command in COMMANDS.
+    :returns: the command.
+    """
+    COMMANDS[command.verb] = command
+    if command.idempotent:
+        IDEMPOTENT_COMMANDS.add(command.verb)
+    else:
+        IDEMPOTENT_COMMANDS.discard(command.verb)
+    return command
+
+
+def lookup(request: str) -> Optional[Command]:
+    """The registered command of a request, eg. "goprint,1.pwmb,end".
+    :returns: the command, or None for an unknown verb.
+    """
+    return COMMANDS.get(request.strip().split(",", 1)[0])
+
+
+def _frame_text(view: memoryview, start: int, end: int) -> str:
+    """The text of the frame between two offsets of a buffer."""
+    frame = view[start:end]
+    try:
+        return str(frame, "ascii")
+    except UnicodeDecodeError:
+        return str(frame, ENCODING, "replace")
+
+
+def parse_buffer(data: Union[bytes, bytearray]) -> List[MonoXResponseType]:
+    """Parse every frame of received bytes, as _do_handle does for text.
+    :data: the bytes received, eg. the buffer of a FrameReader. A remainder
+        after the last terminator is parsed as a frame.
+    :returns: the response objects, in order.
+    """
+    responses = []
+    start = 0
+    with memoryview(data) as view:
+        while True:
+            end = data.find(END_BYTES, start)
+            stop = len(data) if end == -1 else end
+            response = parse_frame(_frame_text(view, start, stop))
+            if response is not None:
+                responses.append(response)
+            if end == -1:
+                return responses
+            start = end + len(END_BYTES)
+
+
+def parse_frame(line: str) -> Optional[MonoXResponseType]:
+    """Parse a single text frame without its ,end terminator.
+    :returns: the response object, or None if the frame has no fields.
+    """
+    fields = line.split(",")
+    if len(fields) < 2:
+        return None
+    command = COMMANDS.get(fields[0])
+    if command is None:
+        _LOGGER.debug("unrecognized response: %s", fields[0])
+        return _message(fields)
+    if command.binary:
+        return _message(fields)
+    return command.parser(fields)
+
+
+def header_end(data: bytearray, header_fields: int) -> int:
+    """The offset just after the comma ending the last header field, or -1
+    if the header is not complete."""
+    position = -1
+    for _ in range(header_fields):
+        position = data.find(b",", position + 1)
+        if position == -1:
+            return -1
+    return position + 1
+
+
+def decode_preview(received_message: bytes) -> MonoXResponseType:
+    """Handles a getPreview2 frame.
+    :received_message: The frame, as received from UART wifi protocol:
+        getPreview2,<internal name>,<RGB565 pixels>,end
+    :returns: the MonoXPreviewImage, decoded in memory.
+    """
+    end = header_end(received_message, 2)
+    if end == -1:
+        return InvalidResponse("incomplete preview")
+    header = bytes(received_message[:end]).decode().split(",")
+    payload = memoryview(received_message)[end : end + PREVIEW_SIZE]
+    if len(payload) < PREVIEW_SIZE:
+        return InvalidResponse("incomplete preview")
+    return MonoXPreviewImage(
+        internal_name=header[1], rgb=rgb565_to_rgb888(payload)
+    )
+
+
+def _message(fields: list) -> MonoXResponseType:
+    """Handles a frame answering with a single message, eg. goprint,OK."""
+    return InvalidResponse(fields[1])
+
+
+def _sys_info(fields: list) -> MonoXSysInfo:
+    """Handles system info processing."""
+    sys_info = MonoXSysInfo()
+    if len(fields) > 2:
+        sys_info.model = fields[1]
+    if len(fields) > 3:
+        sys_info.firmware = fields[2]
+    if len(fields) > 4:
+        sys_info.serial = fields[3]
+    if len(fields) > 5:
+        sys_info.wifi = fields[4]
+    return sys_info
+
+
+COMMANDS: Dict[str, Command] = {}
+IDEMPOTENT_COMMANDS = set()
+
+for _command in (
+    Command("getstatus", MonoXStatus, idempotent=True),
+    Command("getfile", FileList, idempotent=True),
+    Command("sysinfo", _sys_info, idempotent=True),
+    Command("gethistory", PrintHistory, idempotent=True, end_required=True),
+    Command("getwifi", idempotent=True),
+    Command("getmode", idempotent=True),
+    Command("getname", idempotent=True),
+    Command("getpara", idempotent=True),
+    Command("getPreview1", idempotent=True, end_required=True),
+    Command(
+        "getPreview2",
+        decode_preview,
+        idempotent=True,
+        end_required=True,
+        header_fields=2,
+        payload_size=PREVIEW_SIZE,
+    ),
+    Command("goprint", end_required=True),
+    Command("gostop", end_required=True),
+    Command("gopause", end_required=True),
+    Command("goresume", end_required=True),
+    Command("delfile", end_required=True),
+    Command("delhistory", end_required=True),
+    Command("detect"),
+    Command("stopUV"),
+    Command("setname"),
+    Command("setwifi"),
+    Command("setZero"),
+    Command("setZhome"),
+    Command("setZmove"),
+    Command("setZstop"),
+):
+    register(_command)
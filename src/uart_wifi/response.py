@@ -1,4 +1,36 @@
-"""Mono X Objects."""
+"""Mono X Objects.
+Responses are __slots__ records so large histories of them stay compact.
+Numeric fields are parsed once on construction and missing fields are None.
+Repeated text fields of complete status messages are interned.
+"""
+import os
+from sys import intern
+from typing import Dict, Optional, Tuple
+
+from .preview import PREVIEW_HEIGHT, PREVIEW_WIDTH, rgb888_to_bmp
+
+
+def _int(value) -> Optional[int]:
+    """Parse an integer field, None if it is missing or not a number."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _float(value) -> Optional[float]:
+    """Parse a decimal field, None if it is missing or not a number."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _volume(value) -> Optional[float]:
+    """Parse a resin volume such as ~178mL to millilitres."""
+    if value is None:
+        return None
+    return _float(value.strip().lstrip("~").rstrip("mLl"))
 
 
 # pylint: disable=too-few-public-methods
@@ -6,6 +38,8 @@ class MonoXResponseType:
     """The baseline MonoX Response class.
     Use this to create other MonoX Responses."""
 
+    __slots__ = ()
+    _field_names: Dict[type, Tuple[str, ...]] = {}
     status: str = "error/offline"
 
     def print(self):
@@ -13,18 +47,51 @@ class MonoXResponseType:
         by anything which implements this class."""
         return "Status: " + self.status
 
+    def to_dict(self) -> dict:
+        """Provide the fields of the response as a dictionary."""
+        return {
+            name: _plain(getattr(self, name, None))
+            for name in _fields(type(self))
+        }
+
+
+def _fields(cls: type) -> Tuple[str, ...]:
+    """The slot names of a response class, base classes first."""
+    names = MonoXResponseType._field_names.get(cls)
+    if names is None:
+        names = tuple(
+            dict.fromkeys(
+                name
+                for klass in reversed(cls.__mro__)
+                for name in klass.__dict__.get("__slots__", ())
+            )
+        )
+        MonoXResponseType._field_names[cls] = names
+    return names
+
+
+def _plain(value):
+    """Convert nested responses for to_dict."""
+    if isinstance(value, MonoXResponseType):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    return value
+
 
 class MonoXFileEntry(MonoXResponseType):
     """A file entry consisting of an internal and external listing"""
 
+    __slots__ = ("status", "internal", "external")
+
     def __init__(self, internal_name: str, external_name: str) -> None:
         """Create a MonoXFileEntry
         :internal_name: the name the printer calls the file. eg "1.pwmb"
         :external_name: The name the user calls the file.
         eg "My (Super) Cool.pwmb"
         """
-        self.external = internal_name
-        self.internal = external_name
+        self.internal = internal_name
+        self.external = external_name
         self.status = "file"
 
     def print(self):
@@ -43,20 +110,20 @@ class FileList(MonoXResponseType):
     end
     """
 
-    def __init__(self, data: MonoXFileEntry) -> None:
+    __slots__ = ("status", "files")
+
+    def __init__(self, data) -> None:
         """Create a FileList object.
-        :data: a list of internal/external files.
+        :data: the fields of the response, starting with getfile. Each
+            file is listed as external/internal.
         """
         self.files = []
         self.status = "getfile"
 
-        for field in data:
-            if field in data[0] or data[-1]:
-                continue  # not interested in packet open/close portion.
-            split = field.split("/")
-            self.files.append(MonoXFileEntry(split[0], split[1]))
-
-    files = [MonoXFileEntry]
+        for field in data[1:]:
+            external, _, internal = field.strip().rpartition("/")
+            if internal and external:
+                self.files.append(MonoXFileEntry(internal, external))
 
     def print(self):
         """Provide a human-readable response."""
@@ -64,9 +131,103 @@ class FileList(MonoXResponseType):
             file.print()
 
 
+class HistoryEntry(MonoXResponseType):
+    """One finished print from the printer history.
+    Fields are / separated in the order of the slots after status:
+        12/Widget.pwmb/1660000000/6844/~178mL/2338
+    Firmware which lists only the entry numbers gives None for the rest.
+    """
+
+    __slots__ = (
+        "status",
+        "index",
+        "file",
+        "started",
+        "duration",
+        "volume",
+        "layers",
+        "serial",
+    )
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        index: int = None,
+        file: str = None,
+        started: float = None,
+        duration: int = None,
+        volume: float = None,
+        layers: int = None,
+        serial: str = None,
+    ) -> None:
+        """Create a HistoryEntry.
+        :index: the number of the entry on the printer.
+        :file: the user file name printed.
+        :started: seconds since the epoch when the print started.
+        :duration: seconds the print took.
+        :volume: resin used, in millilitres.
+        :layers: the number of layers printed.
+        :serial: the printer serial, when known.
+        """
+        self.index = index
+        self.file = file
+        self.started = started
+        self.duration = duration
+        self.volume = volume
+        self.layers = layers
+        self.serial = serial
+        self.status = "history"
+
+    @classmethod
+    def parse(cls, entry: str) -> "HistoryEntry":
+        """Parse one entry of a gethistory response."""
+        fields = entry.split("/")
+        fields += [None] * (6 - len(fields))
+        return cls(
+            _int(fields[0]),
+            fields[1] or None,
+            _float(fields[2]),
+            _int(fields[3]),
+            _volume(fields[4]),
+            _int(fields[5]),
+        )
+
+    def print(self):
+        """Provide a human-readable response"""
+        print(f"{self.index}: {self.file}")
+
+
+class PrintHistory(MonoXResponseType):
+    """The printer history, newest first.
+    eg.
+    gethistory,
+    12/Widget.pwmb/1660000000/6844/~178mL/2338,
+    11/Gear.pwmb/1659900000/3600/~20mL/800,
+    end
+    """
+
+    __slots__ = ("status", "entries")
+
+    def __init__(self, data) -> None:
+        """Create a PrintHistory.
+        :data: the fields of the response, starting with gethistory.
+        """
+        self.entries = [
+            HistoryEntry.parse(field) for field in data[1:] if field.strip()
+        ]
+        self.status = "gethistory"
+
+    def print(self):
+        """Provide a human-readable response."""
+        for entry in self.entries:
+            entry.print()
+
+
 class InvalidResponse(MonoXResponseType):
     """Used when no response is provided."""
 
+    __slots__ = ("status",)
+
     def __init__(self, message) -> None:
         """Construct the InvalidResponse type.
         :message: anything goes
@@ -81,6 +242,8 @@ class InvalidResponse(MonoXResponseType):
 class SimpleResponse(MonoXResponseType):
     """Used when no response is provided."""
 
+    __slots__ = ("status",)
+
     def __init__(self, message) -> None:
         """Construct a SimpleResponse.
         :message: anything goes."""
@@ -97,6 +260,8 @@ class MonoXSysInfo(MonoXResponseType):
         sysinfo,Photon Mono X 6K,V0.2.2,0000170300020034,SkyNet,end
     """
 
+    __slots__ = ("status", "model", "firmware", "serial", "wifi")
+
     def __init__(self, model="", firmware="", serial="", wifi="") -> None:
         """Construct the MonoXSysInfo response type"""
         self.model = model
@@ -121,64 +286,142 @@ class MonoXStatus(MonoXResponseType):
        getstatus,print,Widget.pwmb/46.pwmb,2338,88,2062,51744,6844,~178mL,UV,39.38,0.05,0,end
     """
 
+    __slots__ = (
+        "status",
+        "file",
+        "total_layers",
+        "percent_complete",
+        "current_layer",
+        "seconds_elapse",
+        "seconds_remaining",
+        "total_volume",
+        "mode",
+        "unknown1",
+        "layer_height",
+        "unknown2",
+    )
+
     def __init__(self, message) -> None:
         """Construct the Status response.
         :message: a properly formated message of either length 3 or >12."""
-
+        length = len(message)
+        if length > 12:
+            try:
+                self._parse_full(message)
+                return
+            except ValueError:
+                pass  # fall back to parsing field by field.
         self.status = message[1]
-        if len(message) > 2:
-            self.file = message[2]
-        if len(message) > 3:
-            self.total_layers = message[3]
-        if len(message) > 4:
-            self.percent_complete = message[4]
-        if len(message) > 5:
-            self.current_layer = message[5]
-        if len(message) > 6:
-            if str(message[6]).isnumeric():
-                self.seconds_elapse = int(message[6]) * 60
-            else:
-                self.seconds_elapse = message[6]
-        if len(message) > 7:
-            self.seconds_remaining = message[7]
-        if len(message) > 8:
-            self.total_volume = message[8]
-        if len(message) > 9:
-            self.mode = message[9]
-        if len(message) > 10:
-            self.unknown1 = message[10]
-        if len(message) > 11:
-            self.layer_height = message[11]
-        if len(message) > 12:
-            self.unknown2 = message[12]
+        self.file = message[2] if length > 2 else None
+        self.total_layers = _int(message[3]) if length > 3 else None
+        self.percent_complete = _int(message[4]) if length > 4 else None
+        self.current_layer = _int(message[5]) if length > 5 else None
+        elapsed = _int(message[6]) if length > 6 else None
+        self.seconds_elapse = None if elapsed is None else elapsed * 60
+        self.seconds_remaining = _int(message[7]) if length > 7 else None
+        self.total_volume = _volume(message[8]) if length > 8 else None
+        self.mode = message[9] if length > 9 else None
+        self.unknown1 = message[10] if length > 10 else None
+        self.layer_height = _float(message[11]) if length > 11 else None
+        self.unknown2 = message[12] if length > 12 else None
+
+    def _parse_full(self, message) -> None:
+        """Parse a complete, well-formed status message."""
+        self.status = intern(message[1])
+        self.file = intern(message[2])
+        self.total_layers = int(message[3])
+        self.percent_complete = int(message[4])
+        self.current_layer = int(message[5])
+        self.seconds_elapse = int(message[6]) * 60
+        self.seconds_remaining = int(message[7])
+        self.total_volume = float(message[8].strip().lstrip("~").rstrip("mLl"))
+        self.mode = intern(message[9])
+        self.unknown1 = intern(message[10])
+        self.layer_height = float(message[11])
+        self.unknown2 = intern(message[12])
 
     def print(self):
         """Provide a human-readable response."""
         print("status: " + self.status)
-        if hasattr(self, "file"):
+        if self.file is not None:
             print("file: " + self.file)
             print("total_layers: " + str(self.total_layers))
             print("percent_complete: " + str(self.percent_complete))
             print("current_layer: " + str(self.current_layer))
             print("seconds_remaining: " + str(self.seconds_remaining))
             print("total_volume: " + str(self.total_volume))
-            print("mode: " + self.mode)
+            print("mode: " + str(self.mode))
             print("unknown1: " + str(self.unknown1))
             print("layer_height: " + str(self.layer_height))
             print("unknown2: " + str(self.unknown2))
 
 
 class MonoXPreviewImage(MonoXResponseType):
-    """A file entry consisting of an internal and external listing."""
-
-    def __init__(self, file_path: str) -> None:
+    """A preview image of a file, decoded from getPreview2.
+    Pixels are held in memory as packed RGB888."""
+
+    __slots__ = (
+        "status",
+        "file_path",
+        "internal_name",
+        "width",
+        "height",
+        "rgb",
+    )
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        file_path: str = "",
+        internal_name: str = None,
+        width: int = PREVIEW_WIDTH,
+        height: int = PREVIEW_HEIGHT,
+        rgb: bytes = None,
+    ) -> None:
         """Construct the MonoXPreviewImage.
-        :file_path: the path to the preview image.
+        :file_path: the path to the preview image, if it has been saved.
+        :internal_name: the name the printer calls the file. eg "1.pwmb"
+        :width: the width in pixels.
+        :height: the height in pixels.
+        :rgb: the pixels as packed RGB888, top row first.
         """
         super().__init__()
         self.file_path = file_path
+        self.internal_name = internal_name
+        self.width = width
+        self.height = height
+        self.rgb = rgb
         self.status = "preview image"
 
+    def to_bmp(self) -> bytes:
+        """Encode the preview as a BMP file in memory."""
+        return rgb888_to_bmp(self.rgb, self.width, self.height)
+
+    def save(self, file_path: str = None) -> str:
+        """Write the preview as a BMP file.
+        :file_path: where to write. Defaults to <internal name>.bmp in the
+            temporary directory.
+        :returns: the path written.
+        """
+        if file_path is None:
+            import tempfile  # pylint: disable=import-outside-toplevel
+
+            file_path = os.path.join(
+                tempfile.gettempdir(), str(self.internal_name) + ".bmp"
+            )
+        with open(file_path, "wb") as output_file:
+            output_file.write(self.to_bmp())
+        self.file_path = file_path
+        return file_path
+
+    def to_dict(self) -> dict:
+        """Provide the fields of the response, without the pixels."""
+        fields = super().to_dict()
+        del fields["rgb"]
+        return fields
+
     def print(self):
         """Provide a human-readable response."""
+        if not self.file_path and self.rgb is not None:
+            self.save()
         print(f"preview located at {self.file_path}")
@@ -0,0 +1,211 @@
+"""Simulation of a fleet of printers served from one process."""
+import random
+import threading
+import time
+from typing import List, Optional
+
+from uart_wifi.simulate_printer import AnycubicSimulator, SimulatorServer
+from uart_wifi.simulate_profiles import BehaviorProfile
+
+LAYER_SECONDS = 2.5
+FILE_NAMES = (
+    "Widget",
+    "Phone Stand",
+    "Cable Holder",
+    "Print Puller",
+    "Calibration Cube",
+    "Miniature",
+    "Gear",
+    "Bracket",
+)
+
+
+class VirtualPrinter(AnycubicSimulator):
+    """A simulated printer with its own serial, files and print progress.
+    A print advances one layer every layer_seconds and stops by itself
+    after its last layer. A deleted file leaves None in files, so the
+    others keep their internal names.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        the_ip: str,
+        the_port: int,
+        serial: str,
+        files: List[str],
+        layer_seconds: float = LAYER_SECONDS,
+        quiet: bool = True,
+        profile: BehaviorProfile = None,
+    ) -> None:
+        """Construct the VirtualPrinter.
+        :the_ip: The IP address to listen on.
+        :the_port: The port to listen on, or 0 for any.
+        :serial: The serial number reported by sysinfo.
+        :files: The user file names, listed as 0.pwmb, 1.pwmb and so on.
+        :layer_seconds: Time taken by each layer of a print.
+        :quiet: Set to true to skip logging of each request and response.
+        :profile: The latency and faults to inject. Defaults to none.
+        """
+        super().__init__(the_ip, the_port, quiet, profile)
+        self.serial = serial
+        self.files: List[Optional[str]] = files
+        self.layer_seconds = layer_seconds
+        self.total_layers = 0
+        self.print_file = 0
+        self.print_started = 0.0
+        generator = random.Random(serial)
+        started = 1650000000
+        self.history = []
+        for _ in range(generator.randint(0, 20)):
+            name = generator.choice(files)
+            layers = 100 + len(name) * 10
+            seconds = int(layers * generator.uniform(2, 4))
+            started += seconds + generator.randint(60, 86400)
+            self.history.append(
+                (name, started, seconds, round(layers * 0.07, 1), layers)
+            )
+
+    def getfile(self) -> str:
+        """return getfile type"""
+        entries = [
+            f"{name}/{index}.pwmb"
+            for index, name in enumerate(self.files)
+            if name is not None
+        ]
+        return "getfile," + ",".join(entries) + ",end"
+
+    def current_layer(self) -> int:
+        """The layer being printed, stopping the print after the last."""
+        elapsed = time.monotonic() - self.print_started
+        layer = int(elapsed / self.layer_seconds) + 1
+        if layer > self.total_layers:
+            if self.printing:
+                self.history.append(
+                    (
+                        self.files[self.print_file],
+                        int(time.time() - elapsed),
+                        int(self.total_layers * self.layer_seconds),
+                        round(self.total_layers * 0.07, 1),
+                        self.total_layers,
+                    )
+                )
+            self.printing = False
+            return self.total_layers
+        return layer
+
+    def getstatus(self) -> str:
+        """return getstatus type"""
+        layer = self.current_layer() if self.printing else 0
+        if not self.printing:
+            return "getstatus,stop\r\n,end"
+        elapsed = time.monotonic() - self.print_started
+        remaining = (self.total_layers - layer) * self.layer_seconds
+        name = self.files[self.print_file]
+        return (
+            f"getstatus,print,{name}/{self.print_file}.pwmb,"
+            f"{self.total_layers},{layer * 100 // self.total_layers},{layer},"
+            f"{int(elapsed // 60)},{int(remaining)},"
+            f"~{self.total_layers * 0.07:.0f}mL,UV,39.38,0.05,0,end"
+        )
+
+    def file_index(self, internal_name: str = None) -> Optional[int]:
+        """The index in files of an internal name, eg. 1 for "1.pwmb".
+        :returns: the index, None for a file which is not listed.
+        """
+        stem, _, extension = (internal_name or "").strip().partition(".")
+        if extension != "pwmb" or not stem.isdigit():
+            return None
+        index = int(stem)
+        if index >= len(self.files) or self.files[index] is None:
+            return None
+        return index
+
+    def printing_now(self) -> bool:
+        """Whether a print is running, stopping it after the last layer."""
+        return self.printing and self.current_layer() < self.total_layers
+
+    def goprint(self, internal_name: str = None) -> str:
+        """Start printing a file, by its internal name."""
+        if self.printing_now():
+            return "goprint,ERROR1,end"
+        index = self.file_index(internal_name)
+        if index is None:
+            return "goprint,ERROR2,end"
+        self.printing = True
+        self.print_file = index
+        self.total_layers = 100 + len(self.files[index]) * 10
+        self.print_started = time.monotonic()
+        return "goprint,OK,end"
+
+    def delfile(self, internal_name: str = None) -> str:
+        """Delete a file, by its internal name. The file being printed can
+        not be deleted."""
+        index = self.file_index(internal_name)
+        if index is None:
+            return "delfile,ERROR2,end"
+        if index == self.print_file and self.printing_now():
+            return "delfile,ERROR1,end"
+        self.files[index] = None
+        return "delfile,OK,end"
+
+
+class SimulatedFleet:
+    """Serves many VirtualPrinters on a port range from one selectors loop."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        the_ip: str = "127.0.0.1",
+        first_port: int = 0,
+        count: int = 1,
+        seed: int = None,
+        layer_seconds: float = LAYER_SECONDS,
+        profile: BehaviorProfile = None,
+    ) -> None:
+        """Create the fleet.
+        :the_ip: The IP address to listen on.
+        :first_port: The port of the first printer, the others follow it.
+            With 0 every printer gets any free port.
+        :count: The number of printers.
+        :seed: Seed for the generated serials and file lists.
+        :layer_seconds: Time taken by each layer of a print.
+        :profile: The latency and faults every printer injects.
+        """
+        generator = random.Random(seed)
+        self.server = SimulatorServer()
+        self.printers: List[VirtualPrinter] = []
+        for index in range(count):
+            files = generator.sample(FILE_NAMES, generator.randint(1, 5))
+            printer = VirtualPrinter(
+                the_ip,
+                first_port + index if first_port else 0,
+                f"{generator.randrange(10 ** 16):016d}",
+                [f"{name} {index}.pwmb" for name in files],
+                layer_seconds,
+                profile=profile,
+            )
+            self.server.add_printer(printer)
+            self.printers.append(printer)
+        self._thread = None
+
+    @property
+    def addresses(self) -> List[tuple]:
+        """The (ip_address, port) of every printer."""
+        return [(printer.host, printer.port) for printer in self.printers]
+
+    def serve_forever(self) -> None:
+        """Serve in the calling thread until stop() is called."""
+        self.server.serve_forever()
+
+    def start(self) -> None:
+        """Serve from a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop serving and wait for the background thread."""
+        self.server.stop()
+        if self._thread is not None:
+            self._thread.join()
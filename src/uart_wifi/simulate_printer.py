@@ -1,8 +1,33 @@
 """"Class to handle printer simulation"""
+import re
 import select
+import selectors
 import socket
+import sys
 import threading
 import time
+from array import array
+from typing import Iterable, List, Optional, Tuple
+
+from uart_wifi.preview import PREVIEW_HEIGHT, PREVIEW_WIDTH
+from uart_wifi.protocol import COMMANDS
+from uart_wifi.simulate_profiles import (
+    TRICKLE_INTERVAL,
+    BehaviorProfile,
+    reset,
+)
+
+BACKLOG = 1024
+READ_SIZE = 4096
+SELECT_INTERVAL = 0.5  # seconds
+SEPARATORS = re.compile(b"[,\n]")
+TEXT_SEPARATORS = re.compile("[,\n]")
+# Commands which only the simulator understands, for testing clients.
+TEST_COMMANDS = ("incomplete", "multi", "shutdown")
+# Commands whose next field, the internal name of a file, is passed to
+# their responder.
+FILE_COMMANDS = ("goprint", "delfile")
+FILE_COMMAND_BYTES = tuple(verb.encode() for verb in FILE_COMMANDS)
 
 
 class AnycubicSimulator:
@@ -13,16 +38,44 @@ class AnycubicSimulator:
     serial = "0000170300020034"
     shutdown_signal = False
 
-    def __init__(self, the_ip: str, the_port: int) -> None:
+    def __init__(
+        self,
+        the_ip: str,
+        the_port: int,
+        quiet=False,
+        profile: BehaviorProfile = None,
+    ) -> None:
         """Construct the Anycubic Simulator
         :the_ip: The IP address to use internally for opening the port.
             eg. 127.0.0.1, or 0.0.0.0
         :the_port: The port to monitor for responses.
+        :quiet: Set to true to skip logging of each request and response.
+        :profile: The latency and faults to inject. Defaults to none.
         """
         self.host = the_ip
         self.port = the_port
         self.printing = False
         self.serial = "234234234"
+        self.quiet = quiet
+        self.shutdown_signal = False
+        self.profile = profile if profile is not None else BehaviorProfile()
+        # (file, started, seconds, volume, layers) of finished prints.
+        self.history = [
+            ("Widget.pwmb", 1660000000, 6844, 178.0, 2338),
+            ("Gear.pwmb", 1660100000, 3600, 20.5, 800),
+        ]
+        # Names rather than bound methods, so responders replaced on the
+        # instance are used.
+        self.responders = {
+            verb: verb.lower()
+            for verb in tuple(COMMANDS) + TEST_COMMANDS
+            if callable(getattr(self, verb.lower(), None))
+        }
+
+    def log(self, message: str) -> None:
+        """Print a message unless the simulator is quiet."""
+        if not self.quiet:
+            print(message)
 
     def sysinfo(self) -> str:
         """return sysinfo type"""
@@ -41,8 +94,35 @@ class AnycubicSimulator:
             )
         return "getstatus,stop\r\n,end"
 
-    def goprint(self) -> str:
+    def gethistory(self) -> str:
+        """return gethistory type, newest first"""
+        entries = [
+            f"{index}/{file}/{started}/{seconds}/~{volume:.1f}mL/{layers}"
+            for index, (file, started, seconds, volume, layers) in reversed(
+                list(enumerate(self.history, 1))
+            )
+        ]
+        return "gethistory," + "".join(e + "," for e in entries) + "end"
+
+    def getpreview2(self) -> bytes:
+        """return getPreview2 type, a gradient RGB565 image of the file"""
+        pixels = array(
+            "H",
+            (
+                (x * 31 // (PREVIEW_WIDTH - 1)) << 11
+                | (y * 63 // (PREVIEW_HEIGHT - 1)) << 5
+                | 0x1F
+                for y in range(PREVIEW_HEIGHT)
+                for x in range(PREVIEW_WIDTH)
+            ),
+        )
+        if sys.byteorder == "big":
+            pixels.byteswap()
+        return b"getPreview2,0.pwmb," + pixels.tobytes() + b",end"
+
+    def goprint(self, internal_name: str = None) -> str:
         """Do printing"""
+        del internal_name  # any file prints the same Widget.
         if self.printing:
             return "goprint,ERROR1,end"
         self.printing = True
@@ -55,6 +135,23 @@ class AnycubicSimulator:
         self.printing = False
         return "gostop,OK,end"
 
+    def getmode(self) -> str:
+        """return getmode type"""
+        return "getmode,0,end"
+
+    def incomplete(self) -> str:
+        """A frame which is never terminated."""
+        return "getmode,0,"
+
+    def multi(self) -> str:
+        """Several frames in one response."""
+        return self.getstatus() + self.sysinfo() + "getmode,0,end"
+
+    def shutdown(self) -> str:
+        """Stop serving after this response."""
+        self.shutdown_signal = True
+        return "shutdown,end"
+
     def start_server(self):
         """Start the uart_wifi simualtor server"""
         my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -65,48 +162,71 @@ class AnycubicSimulator:
         my_socket.listen(1)
         my_socket.setblocking(False)
         read_list = [my_socket]
-        while not AnycubicSimulator.shutdown_signal:
-            readable, [], [] = select.select(read_list, [], [])
-            for the_socket in readable:
-                if the_socket is my_socket:
-                    try:
-                        conn, addr = the_socket.accept()
-                        thread = threading.Thread(
-                            target=self.response_selector,
-                            args=(conn, addr),
-                        )
-                        thread.daemon = True
-                        thread.start()
-                    except Exception:  # pylint: disable=broad-except
-                        pass
-                    finally:
-                        time.sleep(1)
+        with my_socket:
+            while not self.shutdown_signal:
+                readable, [], [] = select.select(read_list, [], [])
+                for the_socket in readable:
+                    if the_socket is my_socket:
+                        try:
+                            conn, addr = the_socket.accept()
+                            thread = threading.Thread(
+                                target=self.response_selector,
+                                args=(conn, addr),
+                            )
+                            thread.daemon = True
+                            thread.start()
+                        except Exception:  # pylint: disable=broad-except
+                            pass
+                        finally:
+                            time.sleep(1)
+
+    def start_scalable_server(self, backlog: int = BACKLOG) -> None:
+        """Start the uart_wifi simulator on a single selectors loop, for
+        load testing with many concurrent clients. Connections stay open
+        for further requests until the client closes them.
+        :backlog: the listen backlog.
+        """
+        server = SimulatorServer(backlog)
+        server.add_printer(self)
+        print(f"Starting printer on {self.host}:{self.port}")
+        server.serve_forever()
 
     def response_selector(self, conn: socket.socket, addr) -> None:
         """The connection handler
         :conn: The connection to use
         :addr: address tuple for ip and port
         """
-        print(f"Simulator: accepted connection to {addr}")
+        self.log(f"Simulator: accepted connection to {addr}")
+        delay = self.profile.accept_delay()
+        if delay:
+            time.sleep(delay)
         decoded_data = ""
         with conn:
             while (
                 "," not in decoded_data
                 and "\n" not in decoded_data
-                and not AnycubicSimulator.shutdown_signal
+                and not self.shutdown_signal
             ):
                 data = conn.recv(1)
                 decoded_data += data.decode()
                 if "111\n" in decoded_data:
                     decoded_data = ""
                     continue
-            try:
-                print("Hex:")
-                print(" ".join(f"{hex:02x}" for hex in decoded_data.encode()))
-                print("Data:")
-                print(decoded_data)
-            except UnicodeDecodeError:
-                pass
+            while select.select([conn], [], [], 0)[0]:
+                data = conn.recv(READ_SIZE)  # further pipelined commands.
+                if not data:
+                    break
+                decoded_data += data.decode()
+            if not self.quiet:
+                try:
+                    print("Hex:")
+                    print(
+                        " ".join(f"{hex:02x}" for hex in decoded_data.encode())
+                    )
+                    print("Data:")
+                    print(decoded_data)
+                except UnicodeDecodeError:
+                    pass
             self.send_response(conn, decoded_data)
             decoded_data = ""
 
@@ -116,44 +236,266 @@ class AnycubicSimulator:
         :conn: The connection to use
         :addr: address tuple for ip and port
         """
-        split_data = decoded_data.split(",")
-        for split in split_data:
-            if split == "":
-                continue
-            if "getstatus" in split:
-                return_value = self.getstatus()
-                conn.sendall(return_value.encode())
-            if "sysinfo" in split:
-                conn.sendall(self.sysinfo().encode())
-            if "getfile" in split:
-                conn.sendall(self.getfile().encode())
-            if "goprint" in split:
-                conn.sendall(self.goprint().encode())
-                decoded_data = ""
-            if "gostop" in split:
-                value = self.gostop()
-                print("sent:" + value)
-                conn.sendall(value.encode())
-            if "getmode" in split:
-                value = "getmode,0,end"
-                print("sent:" + value)
-                conn.sendall(value.encode())
-                decoded_data = ""
-            if "incomplete" in split:
-                value = "getmode,0,"
-                print("sent:" + value)
-                conn.sendall(value.encode())
-                decoded_data = ""
-            if "timeout" in split:
+        for split, argument in _with_arguments(
+            TEXT_SEPARATORS.split(decoded_data)
+        ):
+            if split.strip() == "timeout":
                 time.sleep(99999)
+            frames = self.respond(split, argument)
+            if not frames:
+                continue
+            delay = self.profile.response_delay()
+            if delay:
+                time.sleep(delay)
+            if self.profile.should_reset():
+                self.log("Simulator: resetting connection")
+                reset(conn)
+                return
+            data = b"".join(frames)
+            cut = self.profile.drop_point(len(data))
+            if cut is not None:
+                self.log(f"Simulator: dropping connection after {cut} bytes")
+                self.profile.send(conn, data[:cut])
+                conn.close()
+                return
+            self.profile.send(conn, data)
+
+    def respond(self, split: str, argument: str = None) -> List[bytes]:
+        """The frames answering one command.
+        :split: a single command, without its separator.
+        :argument: the field after a command of FILE_COMMANDS.
+        :returns: the frames to send, in order.
+        """
+        name = self.responders.get(split.strip())
+        if name is None:
+            return []
+        responder = getattr(self, name)
+        value = responder() if argument is None else responder(argument)
+        if isinstance(value, str):
+            self.log("sent:" + value)
+            value = value.encode()
+        return [value]
+
+
+def _with_arguments(fields: Iterable[str]) -> List[Tuple[str, Optional[str]]]:
+    """Pair each command with its argument, the field after it for
+    FILE_COMMANDS and None for the rest. Empty fields are skipped.
+    """
+    pairs = []
+    fields = iter([field for field in fields if field])
+    for field in fields:
+        argument = None
+        if field.strip() in FILE_COMMANDS:
+            argument = next(fields, None)
+        pairs.append((field, argument))
+    return pairs
+
+
+class _Connection:
+    """State of one client connection to the SimulatorServer."""
+
+    __slots__ = (
+        "simulator",
+        "pending",
+        "outgoing",
+        "ready_at",
+        "sent",
+        "closing",
+    )
+
+    def __init__(self, simulator: AnycubicSimulator) -> None:
+        self.simulator = simulator
+        self.pending = bytearray()
+        self.outgoing = bytearray()
+        self.ready_at = time.monotonic() + simulator.profile.accept_delay()
+        self.sent = 0
+        self.closing = False
+
+
+class SimulatorServer:
+    """Serves simulated printers from one thread with a selectors loop.
+    There is no thread per connection and no pause between accepts, so a
+    single process can serve thousands of concurrent clients. Delayed and
+    trickled responses wait on timers instead of blocking the loop.
+    """
+
+    def __init__(self, backlog: int = BACKLOG) -> None:
+        """Create the SimulatorServer.
+        :backlog: the listen backlog of each printer.
+        """
+        self.backlog = backlog
+        self.selector = selectors.DefaultSelector()
+        self.listeners = {}
+        self.waiting = {}
+        self.stopped = False
+
+    def add_printer(self, simulator: AnycubicSimulator) -> int:
+        """Start listening for a simulated printer.
+        :simulator: the printer to serve. Its port is updated when it was 0.
+        :returns: the port listened on.
+        """
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((simulator.host, int(simulator.port)))
+        listener.listen(self.backlog)
+        listener.setblocking(False)
+        simulator.port = listener.getsockname()[1]
+        self.selector.register(listener, selectors.EVENT_READ, simulator)
+        self.listeners[listener] = simulator
+        return simulator.port
+
+    def serve_forever(self) -> None:
+        """Serve until stop() is called or every printer is shut down."""
+        while not self.stopped and self.listeners:
+            timeout = SELECT_INTERVAL
+            if self.waiting:
+                timeout = min(
+                    timeout,
+                    max(0, min(self.waiting.values()) - time.monotonic()),
+                )
+            for key, events in self.selector.select(timeout):
+                if isinstance(key.data, AnycubicSimulator):
+                    self._accept(key.fileobj, key.data)
+                    continue
+                if events & selectors.EVENT_READ:
+                    self._read(key.fileobj, key.data)
+                if events & selectors.EVENT_WRITE:
+                    self._write(key.fileobj, key.data)
+            self._wake()
+            for listener, simulator in list(self.listeners.items()):
+                if simulator.shutdown_signal:
+                    self._close(listener)
+                    del self.listeners[listener]
+        self.close()
+
+    def stop(self) -> None:
+        """Ask serve_forever to return."""
+        self.stopped = True
+
+    def close(self) -> None:
+        """Close every socket of the server."""
+        for key in list(self.selector.get_map().values()):
+            self.selector.unregister(key.fileobj)
+            key.fileobj.close()
+        self.selector.close()
+
+    def _accept(self, listener: socket.socket, simulator) -> None:
+        """Accept every waiting connection."""
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return  # out of descriptors; retry on the next select.
+            conn.setblocking(False)
+            self.selector.register(
+                conn, selectors.EVENT_READ, _Connection(simulator)
+            )
+
+    def _read(self, conn: socket.socket, state: _Connection) -> None:
+        """Receive requests and queue the responses."""
+        try:
+            data = conn.recv(READ_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._close(conn)
+            return
+        if state.closing:
+            return
+        state.pending += data
+        commands = SEPARATORS.split(bytes(state.pending))
+        state.pending = bytearray(commands.pop())
+        if commands and commands[-1].strip() in FILE_COMMAND_BYTES:
+            # Wait for the file name, which has not arrived yet.
+            state.pending[:0] = commands.pop() + b","
+        profile = state.simulator.profile
+        for command, argument in _with_arguments(
+            command.decode(errors="replace") for command in commands
+        ):
+            if command.strip() == "timeout":
+                continue  # a timeout request is never answered.
+            frames = state.simulator.respond(command, argument)
+            if not frames:
+                continue
+            if not state.outgoing:
+                state.ready_at = max(
+                    state.ready_at, time.monotonic() + profile.response_delay()
+                )
+                state.sent = 0
+            if profile.should_reset():
+                self._reset(conn)
+                return
+            data = b"".join(frames)
+            cut = profile.drop_point(len(data))
+            if cut is not None:
+                state.outgoing += data[:cut]
+                state.closing = True
+                break
+            state.outgoing += data
+        if state.outgoing:
+            self._write(conn, state)
+
+    def _allowance(self, state: _Connection, now: float) -> tuple:
+        """How many bytes may be sent now, and when to retry if none.
+        :returns: (bytes, time to wait until)
+        """
+        if now < state.ready_at:
+            return 0, state.ready_at
+        rate = state.simulator.profile.bytes_per_second
+        if not rate:
+            return len(state.outgoing), now
+        needed = min(len(state.outgoing), max(1, int(rate * TRICKLE_INTERVAL)))
+        budget = int((now - state.ready_at) * rate) - state.sent
+        if budget < needed:
+            return 0, state.ready_at + (state.sent + needed) / rate
+        return min(budget, len(state.outgoing)), now
+
+    def _wake(self) -> None:
+        """Write to the connections whose timers are due."""
+        now = time.monotonic()
+        for conn, due in list(self.waiting.items()):
+            if due <= now and conn in self.waiting:
+                del self.waiting[conn]
+                self._write(conn, self.selector.get_key(conn).data)
+
+    def _write(self, conn: socket.socket, state: _Connection) -> None:
+        """Send as much of the queued responses as the socket and the
+        printer profile allow."""
+        allowed, due = self._allowance(state, time.monotonic())
+        if not allowed:
+            self.waiting[conn] = due
+            self.selector.modify(conn, selectors.EVENT_READ, state)
+            return
+        self.waiting.pop(conn, None)
+        try:
+            sent = conn.send(state.outgoing[:allowed])
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError:
+            self._close(conn)
+            return
+        del state.outgoing[:sent]
+        state.sent += sent
+        if state.closing and not state.outgoing:
+            self._close(conn)
+            return
+        events = selectors.EVENT_READ
+        if state.outgoing:
+            events |= selectors.EVENT_WRITE
+        self.selector.modify(conn, events, state)
+
+    def _close(self, conn: socket.socket) -> None:
+        """Forget a connection."""
+        self.waiting.pop(conn, None)
+        self.selector.unregister(conn)
+        conn.close()
 
-            if "multi" in split:
-                value = self.getstatus() + self.sysinfo() + "getmode,0,end"
-                print("sent:" + value)
-                conn.sendall(value.encode())
-                decoded_data = ""
-            if decoded_data.endswith("shutdown,"):
-                value = "shutdown,end"
-                print("sent:" + value)
-                conn.sendall(value.encode())
-                AnycubicSimulator.shutdown_signal = True
+    def _reset(self, conn: socket.socket) -> None:
+        """Forget a connection, resetting it."""
+        self.waiting.pop(conn, None)
+        self.selector.unregister(conn)
+        reset(conn)
@@ -0,0 +1,115 @@
+"""Latency and fault injection for simulated printers.
+A BehaviorProfile decides, per connection and per response, how long the
+simulator waits, how fast it sends and whether it breaks the connection,
+so clients can be measured against slow and unreliable printers.
+"""
+import random
+import socket
+import struct
+import time
+from typing import Optional
+
+TRICKLE_INTERVAL = 0.01  # seconds between chunks of a throttled send
+
+
+class BehaviorProfile:
+    """How a simulated printer answers. The default answers at once."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        connect_latency: float = 0.0,
+        first_byte_delay: float = 0.0,
+        jitter: float = 0.0,
+        bytes_per_second: float = None,
+        drop_rate: float = 0.0,
+        reset_rate: float = 0.0,
+        seed: int = None,
+    ) -> None:
+        """Create a BehaviorProfile.
+        :connect_latency: seconds after accepting before a connection is
+            served.
+        :first_byte_delay: seconds before the first byte of each response.
+        :jitter: up to this many seconds are randomly added to each delay.
+        :bytes_per_second: trickle responses at this rate, None for no limit.
+        :drop_rate: chance that a response is cut mid-frame and the
+            connection closed.
+        :reset_rate: chance that a request is answered with a connection
+            reset instead of a response.
+        :seed: seed for the random choices, for repeatable runs.
+        """
+        self.connect_latency = connect_latency
+        self.first_byte_delay = first_byte_delay
+        self.jitter = jitter
+        self.bytes_per_second = bytes_per_second
+        self.drop_rate = drop_rate
+        self.reset_rate = reset_rate
+        self.random = random.Random(seed)
+
+    def _jittered(self, delay: float) -> float:
+        """A delay with jitter added."""
+        if self.jitter:
+            delay += self.random.uniform(0, self.jitter)
+        return delay
+
+    def accept_delay(self) -> float:
+        """Seconds to wait before serving a new connection."""
+        return self._jittered(self.connect_latency)
+
+    def response_delay(self) -> float:
+        """Seconds to wait before the first byte of a response."""
+        return self._jittered(self.first_byte_delay)
+
+    def should_reset(self) -> bool:
+        """Whether to reset the connection instead of answering."""
+        return self.random.random() < self.reset_rate
+
+    def drop_point(self, length: int) -> Optional[int]:
+        """Where to cut a response of this length, None to send it whole."""
+        if length < 2 or self.random.random() >= self.drop_rate:
+            return None
+        return self.random.randrange(1, length)
+
+    def send(self, conn: socket.socket, data: bytes) -> None:
+        """Send on a blocking socket at the trickle rate."""
+        if not self.bytes_per_second:
+            conn.sendall(data)
+            return
+        chunk = max(1, int(self.bytes_per_second * TRICKLE_INTERVAL))
+        for start in range(0, len(data), chunk):
+            piece = data[start : start + chunk]
+            conn.sendall(piece)
+            time.sleep(len(piece) / self.bytes_per_second)
+
+
+def reset(conn: socket.socket) -> None:
+    """Close a connection with a TCP reset rather than an orderly close."""
+    try:
+        conn.setsockopt(
+            socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0)
+        )
+    except OSError:
+        pass
+    conn.close()
+
+
+PROFILES = {
+    "default": {},
+    "slow": {"connect_latency": 0.2, "first_byte_delay": 0.5, "jitter": 0.5},
+    "trickle": {"bytes_per_second": 2000},
+    "flaky": {"drop_rate": 0.1, "reset_rate": 0.1, "jitter": 0.2},
+    "congested": {
+        "first_byte_delay": 0.05,
+        "jitter": 2.0,
+        "bytes_per_second": 20000,
+        "reset_rate": 0.02,
+    },
+}
+
+
+def named_profile(name: str, seed: int = None) -> BehaviorProfile:
+    """Create one of the PROFILES by name.
+    :name: a key of PROFILES.
+    :seed: seed for the random choices.
+    """
+    return BehaviorProfile(seed=seed, **PROFILES[name])
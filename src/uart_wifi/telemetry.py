@@ -0,0 +1,327 @@
+"""Recording of print telemetry as compact time series.
+Each printer serial gets a ring buffer of typed arrays, one per column, and
+optionally an append-only file of fixed-size binary records. A sample takes
+30 bytes in memory and on disk instead of a MonoXStatus full of strings.
+"""
+
+import math
+import os
+import struct
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+
+from .response import MonoXStatus
+
+COLUMNS = (
+    "time",
+    "state",
+    "total_layers",
+    "current_layer",
+    "percent_complete",
+    "seconds_elapse",
+    "seconds_remaining",
+    "total_volume",
+)
+TYPECODES = ("d", "b", "i", "i", "b", "i", "i", "f")
+RECORD = struct.Struct("<dbiibiif")
+# The values each integer typecode can hold. Values from a firmware quirk
+# outside them are clamped, rather than failing to be stored.
+LIMITS = {"b": (-(2**7), 2**7 - 1), "i": (-(2**31), 2**31 - 1)}
+STATES = {"stop": 0, "print": 1, "pause": 2}
+STATE_NAMES = {code: name for name, code in STATES.items()}
+OTHER_STATE = 3
+MISSING = -1
+DEFAULT_CAPACITY = 86400  # one day of samples taken every second
+
+
+def _empty() -> Dict[str, array]:
+    """An empty array for each of COLUMNS."""
+    return {
+        name: array(typecode) for name, typecode in zip(COLUMNS, TYPECODES)
+    }
+
+
+def _sample(status: MonoXStatus, timestamp: float) -> tuple:
+    """The column values of a status, clamped to the LIMITS of their
+    typecodes."""
+
+    def number(value) -> int:
+        return MISSING if value is None else value
+
+    values = (
+        timestamp,
+        STATES.get(status.status.strip(), OTHER_STATE),
+        number(status.total_layers),
+        number(status.current_layer),
+        number(status.percent_complete),
+        number(status.seconds_elapse),
+        number(status.seconds_remaining),
+        math.nan if status.total_volume is None else status.total_volume,
+    )
+    return tuple(
+        min(max(value, LIMITS[typecode][0]), LIMITS[typecode][1])
+        if typecode in LIMITS
+        else value
+        for value, typecode in zip(values, TYPECODES)
+    )
+
+
+class TelemetrySeries:
+    """A ring buffer of samples of one printer, oldest first.
+    Samples must be appended in time order.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        """Create a TelemetrySeries.
+        :capacity: the number of samples kept before the oldest are
+            overwritten, at least 1.
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.columns = [
+            array(typecode, [0]) * capacity for typecode in TYPECODES
+        ]
+        self._start = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, sample: tuple) -> None:
+        """Add a sample, overwriting the oldest when full.
+        :sample: a value for each of COLUMNS.
+        """
+        if self._count < self.capacity:
+            index = (self._start + self._count) % self.capacity
+            self._count += 1
+        else:
+            index = self._start
+            self._start = (self._start + 1) % self.capacity
+        for column, value in zip(self.columns, sample):
+            column[index] = value
+
+    def last(self) -> Optional[tuple]:
+        """The newest sample, if any."""
+        if not self._count:
+            return None
+        index = (self._start + self._count - 1) % self.capacity
+        return tuple(column[index] for column in self.columns)
+
+    def _time(self, position: int) -> float:
+        """The time of the sample at a position, oldest first."""
+        return self.columns[0][(self._start + position) % self.capacity]
+
+    def _bisect(self, timestamp: float) -> int:
+        """The position of the first sample at or after a time."""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._time(middle) < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def query(
+        self, start: float = None, end: float = None
+    ) -> Dict[str, array]:
+        """The samples from start up to but not including end.
+        :start: the earliest time, None for the oldest sample.
+        :end: the time to stop at, None for the newest sample.
+        :returns: an array of values for each of COLUMNS.
+        """
+        first = 0 if start is None else self._bisect(start)
+        stop = self._count if end is None else self._bisect(end)
+        result = {}
+        for name, column in zip(COLUMNS, self.columns):
+            begin = (self._start + first) % self.capacity
+            finish = begin + max(stop - first, 0)
+            if finish <= self.capacity:
+                result[name] = column[begin:finish]
+            else:
+                wrapped = finish - self.capacity
+                result[name] = column[begin:] + column[:wrapped]
+        return result
+
+
+def downsample(
+    columns: Dict[str, array], bucket_seconds: float
+) -> Dict[str, array]:
+    """Reduce samples to the last one in each bucket of time. Progress,
+    time and volume only move one way during a print, so the last sample
+    of a bucket stands for the whole bucket.
+    :columns: samples as returned by TelemetrySeries.query.
+    :bucket_seconds: the width of each bucket, more than 0.
+    :returns: the samples kept, in the same form.
+    """
+    if bucket_seconds <= 0:
+        raise ValueError("bucket_seconds must be more than 0")
+    times = columns["time"]
+    keep = [
+        index
+        for index in range(len(times))
+        if index == len(times) - 1
+        or times[index] // bucket_seconds != times[index + 1] // bucket_seconds
+    ]
+    return {
+        name: array(values.typecode, [values[index] for index in keep])
+        for name, values in columns.items()
+    }
+
+
+def read_records(
+    path: str, start: float = None, end: float = None
+) -> Dict[str, array]:
+    """Read the samples of a telemetry file from start up to but not
+    including end. The file is searched by seeking, so only the samples
+    in range are read.
+    :path: the file written by TelemetryRecorder.
+    :returns: an array of values for each of COLUMNS.
+    """
+    with open(path, "rb") as records:
+        count = os.fstat(records.fileno()).st_size // RECORD.size
+
+        def bisect(timestamp: float) -> int:
+            low, high = 0, count
+            while low < high:
+                middle = (low + high) // 2
+                records.seek(middle * RECORD.size)
+                if RECORD.unpack(records.read(RECORD.size))[0] < timestamp:
+                    low = middle + 1
+                else:
+                    high = middle
+            return low
+
+        first = 0 if start is None else bisect(start)
+        stop = count if end is None else bisect(end)
+        records.seek(first * RECORD.size)
+        data = records.read(max(stop - first, 0) * RECORD.size)
+    result = _empty()
+    columns = [result[name] for name in COLUMNS]
+    for sample in RECORD.iter_unpack(data):
+        for column, value in zip(columns, sample):
+            column.append(value)
+    return result
+
+
+class TelemetryRecorder:
+    """Records MonoXStatus snapshots per printer serial.
+    Samples equal to the previous one apart from the time are skipped, so
+    an idle printer polled every second costs almost nothing.
+    """
+
+    def __init__(
+        self, capacity: int = DEFAULT_CAPACITY, directory: str = None
+    ) -> None:
+        """Create a TelemetryRecorder.
+        :capacity: the samples kept in memory for each printer.
+        :directory: where to append <serial>.bin files of fixed-size
+            records. None keeps samples in memory only.
+        """
+        self.capacity = capacity
+        self.directory = directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self._series: Dict[str, TelemetrySeries] = {}
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self, serial: str, status: MonoXStatus, timestamp: float = None
+    ) -> bool:
+        """Add a status snapshot.
+        :serial: the serial of the printer, see MonoXSysInfo.
+        :status: the status to record.
+        :timestamp: seconds since the epoch. Defaults to now.
+        :returns: False if the sample was skipped as unchanged.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        sample = _sample(status, timestamp)
+        with self._lock:
+            series = self._series.get(serial)
+            if series is None:
+                series = self._series[serial] = TelemetrySeries(self.capacity)
+            last = series.last()
+            if last is not None and _same(last[1:], sample[1:]):
+                return False
+            series.append(sample)
+            if self.directory is not None:
+                self._file(serial).write(RECORD.pack(*sample))
+        return True
+
+    def record_result(self, result, timestamp: float = None) -> bool:
+        """Add the status of a fleet.FleetResult polled with sysinfo.
+        :returns: False if the result had no status or serial, or the
+            sample was skipped as unchanged.
+        """
+        if result.status is None or result.sysinfo is None:
+            return False
+        return self.record(result.sysinfo.serial, result.status, timestamp)
+
+    def serials(self) -> List[str]:
+        """The printers recorded."""
+        return list(self._series)
+
+    def query(
+        self, serial: str, start: float = None, end: float = None
+    ) -> Dict[str, array]:
+        """The samples of a printer held in memory. See
+        TelemetrySeries.query."""
+        with self._lock:
+            series = self._series.get(serial)
+            if series is None:
+                return _empty()
+            return series.query(start, end)
+
+    def load(
+        self, serial: str, start: float = None, end: float = None
+    ) -> Dict[str, array]:
+        """The samples of a printer from its file. See read_records.
+        :raises ValueError: if the recorder has no directory.
+        """
+        if self.directory is None:
+            raise ValueError("samples are only kept in memory")
+        with self._lock:
+            if serial in self._files:
+                self._files[serial].flush()
+        return read_records(self._path(serial), start, end)
+
+    def flush(self) -> None:
+        """Write buffered records to their files."""
+        with self._lock:
+            for records in self._files.values():
+                records.flush()
+
+    def close(self) -> None:
+        """Close the record files."""
+        with self._lock:
+            for records in self._files.values():
+                records.close()
+            self._files.clear()
+
+    def _path(self, serial: str) -> str:
+        """The record file of a printer."""
+        safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in serial)
+        return os.path.join(self.directory, safe + ".bin")
+
+    def _file(self, serial: str):
+        """The open record file of a printer."""
+        records = self._files.get(serial)
+        if records is None:
+            records = self._files[serial] = open(  # pylint: disable=R1732
+                self._path(serial), "ab"
+            )
+        return records
+
+
+def _same(first: tuple, second: tuple) -> bool:
+    """Compare sample values. Volumes are stored in single precision and
+    missing volumes are NaN, which is not equal to itself."""
+    return all(
+        math.isclose(a, b, rel_tol=1e-6) or (math.isnan(a) and math.isnan(b))
+        for a, b in zip(first, second)
+    )
@@ -0,0 +1,205 @@
+"""Watching the status of a printer and reporting only what changed."""
+
+import threading
+from typing import Callable, List, Optional
+
+from uart_wifi.errors import AnycubicException
+
+from .communication import UartWifi
+from .response import MonoXStatus
+
+PRINTING_INTERVAL = 2  # seconds
+IDLE_INTERVAL = 30
+OFFLINE_INTERVAL = 5
+MAX_OFFLINE_INTERVAL = 300
+WATCHED_FIELDS = tuple(
+    field for field in MonoXStatus.__slots__ if field != "status"
+)
+
+FIELD_CHANGED = "field_changed"
+STATUS_CHANGED = "status_changed"
+PRINT_STARTED = "print_started"
+LAYER_ADVANCED = "layer_advanced"
+PRINT_FINISHED = "print_finished"
+WENT_OFFLINE = "went_offline"
+CAME_ONLINE = "came_online"
+
+
+class StatusEvent:
+    """A change seen between two polls."""
+
+    __slots__ = ("kind", "field", "old", "new", "status")
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        kind: str,
+        field: str = None,
+        old=None,
+        new=None,
+        status: MonoXStatus = None,
+    ) -> None:
+        """Create a StatusEvent.
+        :kind: one of the event kinds, eg. LAYER_ADVANCED.
+        :field: the changed field of a FIELD_CHANGED event.
+        :old: the previous value.
+        :new: the current value.
+        :status: the status the change was seen in, None when offline.
+        """
+        self.kind = kind
+        self.field = field
+        self.old = old
+        self.new = new
+        self.status = status
+
+    def __repr__(self) -> str:
+        change = f"{self.old!r} -> {self.new!r}"
+        if self.field is not None:
+            change = f"{self.field}: {change}"
+        return f"StatusEvent({self.kind}, {change})"
+
+
+def _state(status: Optional[MonoXStatus]) -> Optional[str]:
+    """The printer state of a status, eg. print or stop."""
+    if status is None:
+        return None
+    return status.status.strip()
+
+
+class StatusWatcher:
+    """Polls getstatus on an adaptive interval and reports changes as
+    events: quickly while printing, slowly while stopped and with an
+    exponential back off while the printer is offline.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        uart: UartWifi,
+        printing_interval: float = PRINTING_INTERVAL,
+        idle_interval: float = IDLE_INTERVAL,
+        offline_interval: float = OFFLINE_INTERVAL,
+        max_offline_interval: float = MAX_OFFLINE_INTERVAL,
+    ) -> None:
+        """Create a StatusWatcher.
+        :uart: the printer to watch.
+        :printing_interval: seconds between polls while printing.
+        :idle_interval: seconds between polls while not printing.
+        :offline_interval: seconds before the first retry once offline,
+            doubled after every further failure.
+        :max_offline_interval: the longest wait between retries.
+        """
+        self.uart = uart
+        self.printing_interval = printing_interval
+        self.idle_interval = idle_interval
+        self.offline_interval = offline_interval
+        self.max_offline_interval = max_offline_interval
+        self.status: Optional[MonoXStatus] = None
+        self.online = False
+        self.failures = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def interval(self) -> float:
+        """Seconds to wait before the next poll."""
+        if self.failures:
+            return min(
+                self.offline_interval * 2 ** (self.failures - 1),
+                self.max_offline_interval,
+            )
+        if _state(self.status) == "print":
+            return self.printing_interval
+        return self.idle_interval
+
+    def poll(self) -> List[StatusEvent]:
+        """Request the status once and compare it with the previous one.
+        :returns: the changes, empty when nothing changed.
+        """
+        try:
+            responses = self.uart.send_request("getstatus,")
+        except (AnycubicException, IndexError):
+            responses = []
+        status = None
+        for response in responses:
+            if isinstance(response, MonoXStatus):
+                status = response
+        if status is None:
+            self.failures += 1
+            if not self.online:
+                return []
+            self.online = False
+            return [StatusEvent(WENT_OFFLINE, old=_state(self.status))]
+        events = []
+        if not self.online:
+            self.online = True
+            events.append(StatusEvent(CAME_ONLINE, status=status))
+        self.failures = 0
+        events += self._changes(self.status, status)
+        self.status = status
+        return events
+
+    @staticmethod
+    def _changes(
+        previous: Optional[MonoXStatus], status: MonoXStatus
+    ) -> List[StatusEvent]:
+        """The typed and field level changes between two statuses."""
+        events = []
+        old_state, new_state = _state(previous), _state(status)
+        if old_state != new_state:
+            events.append(
+                StatusEvent(
+                    STATUS_CHANGED, "status", old_state, new_state, status
+                )
+            )
+            if new_state == "print":
+                events.append(StatusEvent(PRINT_STARTED, status=status))
+            elif old_state == "print":
+                events.append(StatusEvent(PRINT_FINISHED, status=previous))
+        elif (
+            new_state == "print"
+            and previous.file == status.file
+            and (status.current_layer or 0) > (previous.current_layer or 0)
+        ):
+            events.append(
+                StatusEvent(
+                    LAYER_ADVANCED,
+                    "current_layer",
+                    previous.current_layer,
+                    status.current_layer,
+                    status,
+                )
+            )
+        for field in WATCHED_FIELDS:
+            old = getattr(previous, field, None)
+            new = getattr(status, field)
+            if old != new:
+                events.append(
+                    StatusEvent(FIELD_CHANGED, field, old, new, status)
+                )
+        return events
+
+    def watch(self, callback: Callable[[StatusEvent], None]) -> None:
+        """Poll until stop() is called, calling back with every event.
+        :callback: called with each StatusEvent.
+        """
+        self._stop.clear()
+        while not self._stop.is_set():
+            for event in self.poll():
+                callback(event)
+            self._stop.wait(self.interval)
+
+    def start(self, callback: Callable[[StatusEvent], None]) -> None:
+        """Watch from a background thread.
+        :callback: called with each StatusEvent, from that thread.
+        """
+        self._thread = threading.Thread(target=self.watch, args=(callback,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop watching and wait for the background thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
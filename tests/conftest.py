@@ -0,0 +1,51 @@
+"""Fixtures shared by the tests."""
+import threading
+from typing import Callable, List
+
+import pytest
+
+from uart_wifi.simulate_printer import AnycubicSimulator, SimulatorServer
+from uart_wifi.simulate_profiles import BehaviorProfile
+
+
+@pytest.fixture(name="serve")
+def fixture_serve():
+    """Run servers on background threads for one test. When the test ends,
+    even by failing, each server is stopped and its thread joined.
+    :returns: serve(run, stop), which calls run on a new thread and stop
+        at the end of the test.
+    """
+    running = []
+
+    def serve(run: Callable[[], None], stop: Callable[[], None]) -> None:
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+        running.append((thread, stop))
+
+    yield serve
+    for thread, stop in reversed(running):
+        stop()
+        thread.join(5)
+
+
+@pytest.fixture(name="simulate")
+def fixture_simulate(serve):
+    """Serve quiet simulated printers from a SimulatorServer for one test.
+    :returns: simulate(*profiles), which starts a printer for each
+        BehaviorProfile, or None for one answering at once, and returns
+        their ports.
+    """
+
+    def simulate(*profiles: BehaviorProfile) -> List[int]:
+        server = SimulatorServer()
+        ports = [
+            server.add_printer(
+                AnycubicSimulator("127.0.0.1", 0, quiet=True, profile=profile)
+            )
+            for profile in profiles
+        ]
+        serve(server.serve_forever, server.stop)
+        return ports
+
+    return simulate
@@ -0,0 +1,84 @@
+"""Tests for the asyncio client."""
+import asyncio
+import threading
+import time
+import unittest
+
+from uart_wifi.async_communication import AsyncUartWifi
+from uart_wifi.communication import UartWifi
+from uart_wifi.errors import ConnectionException
+from uart_wifi.preview import PREVIEW_SIZE
+from uart_wifi.response import MonoXPreviewImage
+from uart_wifi.simulate_printer import AnycubicSimulator, SimulatorServer
+
+
+class TestAsyncComms(unittest.TestCase):
+    """Tests"""
+
+    port = 0
+    thread = None
+
+    @classmethod
+    def setup_class(cls):
+        """Called when setting up the class to start the fake printer"""
+        fake_printer = AnycubicSimulator("127.0.0.1", 0)
+        cls.thread = threading.Thread(target=fake_printer.start_server)
+        cls.thread.daemon = True
+        cls.thread.start()
+        while fake_printer.port == 0:
+            time.sleep(0.05)
+        cls.port = fake_printer.port
+
+    def test_status(self):
+        """test basic connection"""
+        uart = AsyncUartWifi("127.0.0.1", self.port)
+        response = asyncio.run(uart.send_request("getstatus,"))
+        assert len(response) > 0, "No response from Fake Printer"
+        assert response[0].status == "stop\r\n"
+
+    def test_raw(self):
+        """test raw output"""
+        uart = AsyncUartWifi("127.0.0.1", self.port)
+        uart.set_raw()
+        response = asyncio.run(uart.send_request("sysinfo,"))
+        assert response.startswith("sysinfo,Photon Mono X 6K")
+        assert response.endswith(",end")
+
+    def test_timeout(self):
+        """test per-request timeout returns nothing"""
+        uart = AsyncUartWifi("127.0.0.1", self.port)
+        start = time.monotonic()
+        response = asyncio.run(uart.send_request("timeout,", timeout=1))
+        assert len(response) == 0
+        assert time.monotonic() - start < 3
+
+    def test_connection_refused(self):
+        """failure to connect raises ConnectionException"""
+        uart = AsyncUartWifi("127.0.0.1", 1)
+        with self.assertRaises(ConnectionException):
+            asyncio.run(uart.send_request("getstatus,"))
+
+    @classmethod
+    def teardown_class(cls):
+        """Stop the fake printer"""
+        UartWifi("127.0.0.1", cls.port).send_request("shutdown,")
+        cls.thread.join(5)
+
+
+def test_binary_preview(serve):
+    """a preview whose pixels contain the terminator arrives whole"""
+    pixels = (b",end" * PREVIEW_SIZE)[:PREVIEW_SIZE]
+    simulator = AnycubicSimulator("127.0.0.1", 0, quiet=True)
+    simulator.getpreview2 = lambda: b"getPreview2,0.pwmb," + pixels + b",end"
+    server = SimulatorServer()
+    port = server.add_printer(simulator)
+    serve(server.serve_forever, server.stop)
+    uart = AsyncUartWifi("127.0.0.1", port)
+    response = asyncio.run(uart.send_request("getPreview2,0.pwmb,end"))
+    image = response[0]
+    assert isinstance(image, MonoXPreviewImage)
+    expected = UartWifi("127.0.0.1", port).get_preview("0.pwmb")
+    assert image.rgb == expected.rgb
+    uart.set_raw()
+    raw = asyncio.run(uart.send_request("getPreview2,0.pwmb,end"))
+    assert len(raw) == len("getPreview2,0.pwmb,") + PREVIEW_SIZE + 4
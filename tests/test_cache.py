@@ -0,0 +1,77 @@
+"""Tests for the file list and preview cache."""
+import time
+
+from uart_wifi.cache import CachedUartWifi, DiskPreviewStore, ResponseCache
+from uart_wifi.response import FileList, MonoXPreviewImage, MonoXSysInfo
+
+
+class CountingUart:
+    """Stands in for UartWifi and counts the requests sent."""
+
+    def __init__(self) -> None:
+        self.sent = []
+
+    def send_request(self, message: str):
+        """Answer sysinfo and getfile and record everything."""
+        self.sent.append(message)
+        if message.startswith("sysinfo"):
+            return [MonoXSysInfo(serial="1234")]
+        if message.startswith("getfile"):
+            return [FileList(["getfile", "Widget.pwmb/0.pwmb", ""])]
+        return []
+
+    def get_preview(self, internal_name: str):
+        """Answer with a one pixel preview."""
+        self.sent.append("getPreview2," + internal_name)
+        return MonoXPreviewImage(internal_name=internal_name, rgb=b"\0" * 3)
+
+
+def test_lru_and_ttl():
+    """least recently used and expired entries are dropped"""
+    cache = ResponseCache(ttl=0.2, max_entries=2)
+    cache.put(("s", "a"), 1)
+    cache.put(("s", "b"), 2)
+    assert cache.get(("s", "a")) == 1
+    cache.put(("s", "c"), 3)
+    assert cache.get(("s", "b")) is None
+    time.sleep(0.25)
+    assert cache.get(("s", "a")) is None
+
+
+def test_files_cached_and_invalidated():
+    """the file list is fetched once until a file is deleted"""
+    uart = CountingUart()
+    cached = CachedUartWifi(uart)
+    files = cached.get_files()
+    assert [(f.internal, f.external) for f in files.files] == [
+        ("0.pwmb", "Widget.pwmb")
+    ]
+    assert cached.get_files() is files
+    assert uart.sent.count("getfile,") == 1
+    cached.send_request("delfile,0.pwmb,end")
+    assert cached.get_files() is not files
+    assert uart.sent.count("getfile,") == 2
+
+
+def test_preview_cached_and_invalidated():
+    """previews are fetched once until the file is deleted"""
+    uart = CountingUart()
+    cached = CachedUartWifi(uart)
+    first = cached.get_preview("0.pwmb")
+    assert cached.get_preview("0.pwmb") is first
+    assert uart.sent.count("getPreview2,0.pwmb") == 1
+    cached.send_request("delfile,0.pwmb,end")
+    cached.get_preview("0.pwmb")
+    assert uart.sent.count("getPreview2,0.pwmb") == 2
+    assert uart.sent.count("sysinfo,") == 1
+
+
+def test_disk_store(tmp_path):
+    """previews survive a new client through the disk store"""
+    image = MonoXPreviewImage(internal_name="../0.pwmb", rgb=b"\1" * 120960)
+    DiskPreviewStore(str(tmp_path)).store("1234", image)
+    uart = CountingUart()
+    cached = CachedUartWifi(uart, disk_store=DiskPreviewStore(str(tmp_path)))
+    assert cached.get_preview("../0.pwmb").rgb == image.rgb
+    assert "getPreview2,../0.pwmb" not in uart.sent
+    assert len(list(tmp_path.iterdir())) == 1
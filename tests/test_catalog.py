@@ -0,0 +1,71 @@
+"""Tests for the file catalog sync."""
+from uart_wifi.catalog import ADDED, REMOVED, RENAMED, CatalogSync, FileEvent
+from uart_wifi.communication import UartWifi
+from uart_wifi.fleet import FleetPoller
+from uart_wifi.response import FileList
+from uart_wifi.simulate_fleet import SimulatedFleet
+
+
+def listing(*names: str) -> FileList:
+    """A FileList of user names, numbered as the printer does."""
+    fields = [f"{name}/{index}.pwmb" for index, name in enumerate(names)]
+    return FileList(["getfile"] + fields + [""])
+
+
+def test_file_list():
+    """files are listed as external/internal, with the verb skipped"""
+    files = listing("Widget.pwmb", "Gear.pwmb").files
+    assert [(f.internal, f.external) for f in files] == [
+        ("0.pwmb", "Widget.pwmb"),
+        ("1.pwmb", "Gear.pwmb"),
+    ]
+
+
+def test_diff():
+    """changes are reported by internal name"""
+    sync = CatalogSync()
+    seen = []
+    sync.add_listener(lambda serial, event: seen.append((serial, event)))
+    assert sync.update("A", listing("Widget.pwmb", "Gear.pwmb")) == [
+        FileEvent(ADDED, "0.pwmb", "Widget.pwmb"),
+        FileEvent(ADDED, "1.pwmb", "Gear.pwmb"),
+    ]
+    assert sync.update("A", listing("Widget.pwmb", "Gear.pwmb")) == []
+    assert sync.update("A", listing("Widget v2.pwmb")) == [
+        FileEvent(REMOVED, "1.pwmb", "Gear.pwmb"),
+        FileEvent(RENAMED, "0.pwmb", "Widget v2.pwmb", "Widget.pwmb"),
+    ]
+    assert len(seen) == 4
+    assert seen[-1][0] == "A"
+    catalog = sync.catalog("A")
+    assert len(catalog) == 1
+    assert "Gear.pwmb" not in catalog
+    assert sync.internal_name("A", "Widget v2.pwmb") == "0.pwmb"
+    assert sync.internal_name("A", "0.pwmb") == "0.pwmb"
+    assert sync.internal_name("A", "Widget.pwmb") is None
+    assert sync.internal_name("B", "Widget v2.pwmb") is None
+
+
+def test_sync_from_fleet():
+    """catalogs are fetched from printers and polled results"""
+    fleet = SimulatedFleet(count=3, seed=6)
+    fleet.start()
+    try:
+        sync = CatalogSync()
+        host, port = fleet.addresses[0]
+        printer = fleet.printers[0]
+        events = sync.fetch(UartWifi(host, port))
+        assert len(events) == len(printer.files)
+        printer.files = printer.files + ["New.pwmb"]
+        internal = f"{len(printer.files) - 1}.pwmb"
+        assert sync.fetch(UartWifi(host, port), printer.serial) == [
+            FileEvent(ADDED, internal, "New.pwmb")
+        ]
+        for result in FleetPoller(fleet.addresses).poll_all():
+            sync.record_result(result)
+        assert sorted(sync.serials()) == sorted(
+            p.serial for p in fleet.printers
+        )
+        assert sync.internal_name(printer.serial, "New.pwmb") == internal
+    finally:
+        fleet.stop()
@@ -1,12 +1,22 @@
 """A file where we test things."""
+import socket
 import threading
 import time
 from typing import Iterable
 import unittest
 
+import pytest
 from pytest import fail
 
-from uart_wifi.communication import UartWifi
+from uart_wifi.communication import (
+    FrameReader,
+    ResponseParser,
+    UartWifi,
+    _do_request,
+    current_milli_time,
+    request_serial,
+)
+from uart_wifi.deadline import Deadline, RequestTimeouts
 from uart_wifi.errors import ConnectionException
 from uart_wifi.simulate_printer import AnycubicSimulator
 from uart_wifi.response import MonoXStatus, MonoXResponseType, MonoXSysInfo
@@ -47,6 +57,47 @@ class TestComms(unittest.TestCase):
             "Expected no response from Fake Printer but got " + response[0]
         )
 
+    def test_first_byte_timeout(self):
+        """first byte timeout ends a silent request early"""
+        uart_wifi: UartWifi = get_api()
+        uart_wifi.set_timeouts(first_byte=1)
+        start = time.monotonic()
+        response = uart_wifi.send_request("timeout,")
+        assert len(response) == 0
+        assert time.monotonic() - start < 5
+
+    def test_iter_request(self):
+        """frames of a multi response are yielded one by one"""
+        uart_wifi: UartWifi = get_api()
+        responses = list(uart_wifi.iter_request("multi,"))
+        assert isinstance(responses[0], MonoXStatus)
+        assert isinstance(responses[1], MonoXSysInfo)
+        assert responses[2].status == "0"
+
+    def test_send_requests(self):
+        """several commands share one connection and keep their order"""
+        uart_wifi: UartWifi = get_api()
+        responses = uart_wifi.send_requests(
+            ["sysinfo", "getstatus", "getfile"]
+        )
+        assert isinstance(responses[0], MonoXSysInfo)
+        assert isinstance(responses[1], MonoXStatus)
+        assert responses[2].status == "getfile"
+        assert responses[2].files[0].internal == "0.pwmb"
+        assert responses[2].files[0].external == "Widget.pwmb"
+        uart_wifi.set_raw()
+        responses = uart_wifi.send_requests(["getmode,", "sysinfo,"])
+        assert responses[0] == "getmode,0,end"
+        assert responses[1].startswith("sysinfo,")
+
+    def test_preview(self):
+        """preview images are decoded in memory"""
+        uart_wifi: UartWifi = get_api()
+        image = uart_wifi.get_preview("0.pwmb")
+        assert image.internal_name == "0.pwmb"
+        assert len(image.rgb) == image.width * image.height * 3
+        assert image.rgb[:3] == bytes([0, 0, 255])
+
     def test_print(self):
         """Test Print command"""
         uart_wifi: UartWifi = get_api()
@@ -95,6 +146,23 @@ class TestComms(unittest.TestCase):
         assert response[0].serial == "234234234"
         assert response[0].wifi == ""
 
+    def test_request_serial(self):
+        """the serial is requested with sysinfo"""
+        assert request_serial(get_api()) == "234234234"
+        uart = get_api()
+        uart.set_raw()
+        with pytest.raises(LookupError):
+            request_serial(uart)
+
+    def test_getfile(self):
+        """files are listed with their internal and external names"""
+        uart = get_api()
+        response = uart.send_request("getfile,")
+        assert response[0].status == "getfile"
+        assert len(response[0].files) == 1
+        assert response[0].files[0].internal == "0.pwmb"
+        assert response[0].files[0].external == "Widget.pwmb"
+
     @classmethod
     def teardown_class(cls):
         """Called when setting up the class to start the fake printer"""
@@ -115,4 +183,59 @@ def get_api() -> UartWifi:
     return uart_wifi
 
 
+def test_refused_without_socket():
+    """a refused connection raises ConnectionException when no socket was
+    passed in, as the benchmarks do"""
+    with pytest.raises(ConnectionException):
+        _do_request(None, ("127.0.0.1", 1), b"getstatus,", 1)
+
+
+def test_frame_reader_bulk():
+    """FrameReader reads a multi-chunk frame in few calls"""
+    server, client = socket.socketpair()
+    payload = b"getfile," + b"x.pwmb/0.pwmb," * 1000 + b"end"
+    server.sendall(payload)
+    reader = FrameReader(client)
+    assert reader.read_frame(current_milli_time() + 2000) == payload
+    server.close()
+    client.close()
+
+
+def test_frame_reader_deadline():
+    """FrameReader returns partial data at the deadline"""
+    server, client = socket.socketpair()
+    server.sendall(b"getmode,0,")
+    start = time.monotonic()
+    received = FrameReader(client).read_frame(current_milli_time() + 300)
+    assert received == b"getmode,0,"
+    assert time.monotonic() - start < 2
+    server.close()
+    client.close()
+
+
+def test_frame_reader_idle_timeout():
+    """an idle gap after a partial frame ends the read"""
+    server, client = socket.socketpair()
+    server.sendall(b"getmode,0,")
+    deadline = Deadline(RequestTimeouts(idle=0.2, total=10))
+    start = time.monotonic()
+    assert FrameReader(client).read(deadline) == b"getmode,0,"
+    assert time.monotonic() - start < 2
+    server.close()
+    client.close()
+
+
+def test_response_parser_incremental():
+    """objects are produced as soon as their frame completes"""
+    parser = ResponseParser()
+    data = b"getstatus,stop,endsysinfo,Photon Mono X 6K,V0.2.2,1,SkyNet,end"
+    produced = []
+    for position in range(len(data)):
+        produced.append(parser.feed(data[position : position + 1]))
+    assert isinstance(produced[data.index(b",end") + 3][0], MonoXStatus)
+    assert isinstance(produced[-1][0], MonoXSysInfo)
+    assert sum(len(batch) for batch in produced) == 2
+    assert parser.pending == ""
+
+
 TestComms.port = 62134
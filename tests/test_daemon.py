@@ -0,0 +1,194 @@
+"""Tests for the polling daemon and its HTTP API."""
+import http.client
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+from uart_wifi.daemon import PrinterDaemon
+from uart_wifi.fleet import FleetResult
+from uart_wifi.simulate_fleet import SimulatedFleet
+
+OFFLINE = ("127.0.0.1", 1)
+
+
+@pytest.fixture(name="fleet")
+def fixture_fleet():
+    """Two simulated printers."""
+    fleet = SimulatedFleet(count=2, seed=3)
+    fleet.start()
+    yield fleet
+    fleet.stop()
+
+
+@pytest.fixture(name="api")
+def fixture_api(serve):
+    """Serve the API of a daemon for one test.
+    :returns: api(printers, address), which returns the running server.
+    """
+
+    def api(printers: PrinterDaemon, address):
+        server = printers.serve(address)
+
+        def stop():
+            server.shutdown()
+            server.server_close()
+
+        serve(server.serve_forever, stop)
+        return server
+
+    return api
+
+
+def get(server, path: str):
+    """GET a path from the API over TCP and decode the JSON."""
+    host, port = server.server_address[:2]
+    with urlopen(f"http://{host}:{port}{path}", timeout=5) as response:
+        return json.load(response)
+
+
+def test_snapshots(fleet):
+    """the latest responses of every printer are kept"""
+    printers = PrinterDaemon(fleet.addresses + [OFFLINE])
+    printers.poll_once()
+    snapshots = {s["address"]: s for s in printers.snapshots()}
+    assert len(snapshots) == 3
+    offline = snapshots.pop("127.0.0.1:1")
+    assert not offline["online"]
+    assert offline["status"] is None
+    assert "getstatus" in offline["errors"]
+    files = {f"{p.host}:{p.port}": p.files for p in fleet.printers}
+    for address, snapshot in snapshots.items():
+        assert snapshot["online"]
+        assert snapshot["status"]["status"].strip() == "stop"
+        assert snapshot["errors"] == {}
+        assert snapshot["files"]["files"] == [
+            {"status": "file", "internal": f"{i}.pwmb", "external": name}
+            for i, name in enumerate(files[address])
+        ]
+    serial = printers.snapshots()[0]["sysinfo"]["serial"]
+    assert printers.snapshot(serial) is printers.snapshots()[0]
+    assert printers.snapshot("unknown") is None
+
+
+def test_stale_after_offline(fleet):
+    """a printer which stops answering keeps its last responses"""
+    printers = PrinterDaemon(fleet.addresses[:1])
+    printers.poll_once()
+    fleet.stop()
+    printers.poll_once()
+    snapshot = printers.snapshots()[0]
+    assert not snapshot["online"]
+    assert snapshot["status"] is not None
+    assert snapshot["errors"]
+
+
+def test_partial_failure_offline(fleet):
+    """a printer which leaves a command unanswered is not online"""
+    printers = PrinterDaemon(fleet.addresses[:1])
+    printers.poll_once()
+    result = FleetResult(fleet.addresses[0])
+    result.responses = {"getstatus": []}
+    result.errors = {"getfile": TimeoutError("no answer")}
+    printers.poller.poll = lambda: iter([result])
+    printers.poll_once()
+    snapshot = printers.snapshots()[0]
+    assert not snapshot["online"]
+    assert snapshot["files"] is not None
+    assert snapshot["errors"] == {"getfile": "TimeoutError: no answer"}
+
+
+def test_poll_failure_offline(fleet):
+    """a failed poll marks the printers offline and polling goes on"""
+    printers = PrinterDaemon(fleet.addresses, interval=0.01)
+    printers.poll_once()
+    poll = printers.poller.poll
+    failures = []
+
+    def broken():
+        if not failures:
+            failures.append(1)
+            raise ValueError("parser bug")
+        return poll()
+
+    printers.poller.poll = broken
+    with pytest.raises(ValueError):
+        printers.poll_once()
+    for snapshot in printers.snapshots():
+        assert not snapshot["online"]
+        assert snapshot["status"] is not None
+        assert snapshot["errors"] == {"poll": "ValueError: parser bug"}
+    failures.clear()
+    printers.start()
+    try:
+        for _ in range(100):
+            if failures and all(s["online"] for s in printers.snapshots()):
+                break
+            threading.Event().wait(0.02)
+    finally:
+        printers.stop()
+    assert all(s["online"] for s in printers.snapshots())
+
+
+def test_http_api(fleet, api):
+    """the API serves from memory, so reads do not reach the printers"""
+    printers = PrinterDaemon(fleet.addresses)
+    printers.poll_once()
+    server = api(printers, ("127.0.0.1", 0))
+    fleet.stop()
+    everything = get(server, "/printers")
+    assert [s["online"] for s in everything] == [True, True]
+    serial = everything[1]["sysinfo"]["serial"]
+    assert get(server, f"/printers/{serial}") == everything[1]
+    address = everything[0]["address"]
+    assert get(server, f"/printers/{address}/status") == (
+        everything[0]["status"]
+    )
+    for path in ("/", "/printers/nope", f"/printers/{serial}/nope"):
+        with pytest.raises(HTTPError) as raised:
+            get(server, path)
+        assert raised.value.code == 404
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="no Unix sockets")
+def test_unix_socket(fleet, api):
+    """the API can be served on a Unix socket"""
+    printers = PrinterDaemon(fleet.addresses)
+    printers.poll_once()
+    path = os.path.join(tempfile.mkdtemp(), "monox.sock")
+    api(printers, path)
+    connection = http.client.HTTPConnection("localhost")
+    connection.sock = socket.socket(socket.AF_UNIX)
+    connection.sock.connect(path)
+    connection.request("GET", "/printers")
+    response = connection.getresponse()
+    assert response.status == 200
+    assert len(json.load(response)) == 2
+    connection.close()
+
+
+def test_unix_socket_unsupported(monkeypatch):
+    """a Unix socket path fails clearly where they are not supported"""
+    monkeypatch.delattr(socketserver, "UnixStreamServer", raising=False)
+    with pytest.raises(ValueError):
+        PrinterDaemon([OFFLINE]).serve("monox.sock")
+
+
+def test_scheduled_polling(fleet):
+    """the background thread polls on the interval"""
+    printers = PrinterDaemon(fleet.addresses, interval=0.05)
+    printers.start()
+    try:
+        for _ in range(100):
+            if all(s["online"] for s in printers.snapshots()):
+                break
+            threading.Event().wait(0.02)
+    finally:
+        printers.stop()
+    assert all(s["online"] for s in printers.snapshots())
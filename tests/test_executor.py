@@ -0,0 +1,71 @@
+"""Tests for parsing and decoding on an executor."""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from uart_wifi.async_communication import AsyncUartWifi
+from uart_wifi.communication import UartWifi
+from uart_wifi.errors import ConnectionException
+from uart_wifi.fleet import FleetPoller
+from uart_wifi.response import MonoXPreviewImage, MonoXStatus
+from uart_wifi.simulate_fleet import SimulatedFleet
+
+
+@pytest.fixture(name="fleet")
+def fixture_fleet():
+    """Three simulated printers."""
+    fleet = SimulatedFleet(count=3, seed=4)
+    fleet.start()
+    yield fleet
+    fleet.stop()
+
+
+def test_process_pool(fleet):
+    """previews and statuses decoded in other processes match"""
+    uart = UartWifi(*fleet.addresses[0])
+    expected = uart.get_preview("0.pwmb")
+    with ProcessPoolExecutor(2) as executor:
+        uart.set_executor(executor)
+        preview = uart.submit_preview("0.pwmb")
+        status = uart.submit_request("getstatus,")
+        assert preview.result(10).rgb == expected.rgb
+        assert isinstance(status.result(10)[0], MonoXStatus)
+
+
+def test_without_executor(fleet):
+    """futures are completed at once when there is no executor"""
+    uart = UartWifi(*fleet.addresses[0])
+    future = uart.submit_request("getstatus,")
+    assert future.done()
+    assert isinstance(future.result()[0], MonoXStatus)
+    uart.set_raw()
+    assert uart.submit_request("getmode,").result() == "getmode,0,end"
+    with pytest.raises(ConnectionException):
+        UartWifi("127.0.0.1", 1).submit_request("getstatus,")
+
+
+def test_fleet_previews(fleet):
+    """a fleet refreshes previews with decoding on the executor"""
+    targets = fleet.addresses + [("127.0.0.1", 1)]
+    with ThreadPoolExecutor(2) as executor:
+        poller = FleetPoller(targets, executor=executor)
+        assert sum(result.ok for result in poller.poll_all()) == 3
+        previews = {
+            target: preview
+            for target, _, preview in poller.fetch_previews(
+                (target, "0.pwmb") for target in targets
+            )
+        }
+    assert isinstance(previews.pop(("127.0.0.1", 1)), ConnectionException)
+    assert len(previews) == 3
+    assert all(isinstance(p, MonoXPreviewImage) for p in previews.values())
+
+
+def test_async_executor(fleet):
+    """the event loop hands parsing to the executor"""
+    uart = AsyncUartWifi(*fleet.addresses[0])
+    with ThreadPoolExecutor(1) as executor:
+        uart.set_executor(executor)
+        responses = asyncio.run(uart.send_request("getstatus,"))
+    assert isinstance(responses[0], MonoXStatus)
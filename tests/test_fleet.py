@@ -0,0 +1,93 @@
+"""Tests for the fleet poller."""
+import asyncio
+from unittest import mock
+
+import pytest
+
+from uart_wifi.communication import UartWifi
+from uart_wifi.fleet import FleetPoller
+from uart_wifi.simulate_profiles import BehaviorProfile
+
+
+@pytest.fixture(name="ports")
+def fixture_ports(simulate):
+    """Two simulated printers."""
+    return simulate(None, None)
+
+
+def targets(ports):
+    """The simulated printers plus one which is offline."""
+    return [("127.0.0.1", port) for port in ports] + [("127.0.0.1", 1)]
+
+
+def test_poll(ports):
+    """every printer reports, the offline one with an error"""
+    poller = FleetPoller(
+        targets(ports), ["getstatus,", "sysinfo,", "getfile,"]
+    )
+    seen = []
+    results = list(poller.poll(callback=seen.append))
+    assert len(results) == 3
+    assert seen == results
+    by_port = {result.address[1]: result for result in results}
+    assert not by_port[1].ok
+    assert "getstatus" in by_port[1].errors
+    for port in ports:
+        assert by_port[port].ok
+        assert by_port[port].status.status == "stop\r\n"
+        assert by_port[port].sysinfo.serial == "234234234"
+        files = by_port[port].files.files
+        assert [(f.internal, f.external) for f in files] == [
+            ("0.pwmb", "Widget.pwmb")
+        ]
+
+
+def test_unexpected_errors(ports):
+    """an unexpected error is recorded for its printer and command"""
+    poller = FleetPoller(targets(ports)[:2], ["getstatus,", "getfile,"])
+    submit = UartWifi.submit_request
+
+    def broken_getfile(uart, command):
+        if command.startswith("getfile"):
+            raise ValueError("bad listing")
+        return submit(uart, command)
+
+    client = poller._client
+
+    def broken_client(target):
+        if target[1] == ports[1]:
+            raise UnicodeDecodeError("utf-8", b"", 0, 1, "bad")
+        return client(target)
+
+    with mock.patch.object(UartWifi, "submit_request", broken_getfile):
+        with mock.patch.object(poller, "_client", broken_client):
+            results = poller.poll_all()
+    by_port = {result.address[1]: result for result in results}
+    first, second = by_port[ports[0]], by_port[ports[1]]
+    assert first.status.status == "stop\r\n"
+    assert isinstance(first.errors["getfile"], ValueError)
+    assert set(second.errors) == {"getstatus", "getfile"}
+    assert isinstance(second.errors["getstatus"], UnicodeDecodeError)
+
+
+def test_offline_first(simulate):
+    """results arrive as they finish, so a refused printer is not queued
+    behind slower ones"""
+    slow = BehaviorProfile(first_byte_delay=0.5)
+    poller = FleetPoller(
+        targets(simulate(slow, slow)), ["getstatus,"], max_workers=3
+    )
+    first = next(iter(poller.poll()))
+    assert first.address[1] == 1
+
+
+def test_async_poll(ports):
+    """the asyncio poller returns the same results"""
+    poller = FleetPoller(targets(ports), ["getstatus,"])
+
+    async def collect():
+        return [result async for result in poller.async_poll()]
+
+    results = asyncio.run(collect())
+    assert len(results) == 3
+    assert sum(result.ok for result in results) == 2
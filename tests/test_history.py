@@ -0,0 +1,87 @@
+"""Tests for the print history index."""
+import os
+import tempfile
+
+from uart_wifi.communication import UartWifi
+from uart_wifi.fleet import DEFAULT_COMMANDS, FleetPoller
+from uart_wifi.history import HistoryIndex
+from uart_wifi.response import HistoryEntry, PrintHistory
+from uart_wifi.simulate_fleet import SimulatedFleet
+
+HISTORY = (
+    "gethistory,3/Gear.pwmb/1660200000/600/~5mL/300,"
+    "2/Widget.pwmb/1660100000/6844/~178mL/2338,"
+    "1/Widget.pwmb/1660000000/7000/~180.5mL/2338"
+).split(",")
+
+
+def test_parse_history():
+    """entries are typed, and firmware listing only numbers is accepted"""
+    history = PrintHistory(HISTORY)
+    assert [entry.index for entry in history.entries] == [3, 2, 1]
+    newest = history.entries[0]
+    assert newest.file == "Gear.pwmb"
+    assert newest.started == 1660200000
+    assert newest.duration == 600
+    assert newest.volume == 5.0
+    assert newest.layers == 300
+    numbers = PrintHistory(["gethistory", "4", "5"]).entries
+    assert numbers[0].index == 4
+    assert numbers[0].file is None
+
+
+def test_query():
+    """prints are found by file, date, duration and volume"""
+    index = HistoryIndex()
+    assert index.merge("A", PrintHistory(HISTORY)) == 3
+    assert index.merge("A", PrintHistory(HISTORY)) == 0
+    index.merge("B", PrintHistory(HISTORY[:2]))
+    assert index.serials() == ["A", "B"]
+
+    def found(**conditions):
+        return [(e.serial, e.index) for e in index.query(**conditions)]
+
+    assert found(file="Widget*") == [("A", 2), ("A", 1)]
+    assert found(since=1660100000, serial="A") == [("A", 3), ("A", 2)]
+    assert found(until=1660100000) == [("A", 1)]
+    assert found(min_duration=6900) == [("A", 1)]
+    assert found(max_volume=10) == [("A", 3), ("B", 3)]
+    assert found(min_volume=179, max_duration=8000) == [("A", 1)]
+    assert found(limit=1) == [("A", 3)]
+    assert isinstance(index.query()[0], HistoryEntry)
+
+
+def test_persistent():
+    """the index survives a restart and renumbered entries are kept"""
+    path = os.path.join(tempfile.mkdtemp(), "history.db")
+    index = HistoryIndex(path)
+    index.merge("A", PrintHistory(HISTORY))
+    index.close()
+    index = HistoryIndex(path)
+    renumbered = ["gethistory", "1/Cube.pwmb/1660300000/60/~1mL/10"]
+    assert index.merge("A", PrintHistory(renumbered)) == 1
+    assert len(index.query(serial="A")) == 4
+    index.close()
+
+
+def test_fetch_from_fleet():
+    """histories are fetched from printers and merged incrementally"""
+    fleet = SimulatedFleet(count=3, seed=5)
+    fleet.start()
+    try:
+        index = HistoryIndex()
+        host, port = fleet.addresses[0]
+        printer = fleet.printers[0]
+        expected = len(printer.history)
+        assert index.fetch(UartWifi(host, port)) == expected
+        printer.history.append(("New.pwmb", 1700000000, 60, 1.0, 10))
+        assert index.fetch(UartWifi(host, port), printer.serial) == 1
+        commands = DEFAULT_COMMANDS + ("gethistory,end",)
+        for result in FleetPoller(fleet.addresses, commands).poll_all():
+            index.record_result(result)
+        assert sorted(index.serials()) == sorted(
+            p.serial for p in fleet.printers if p.history
+        )
+        assert index.query(file="New.pwmb")[0].serial == printer.serial
+    finally:
+        fleet.stop()
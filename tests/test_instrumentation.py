@@ -0,0 +1,80 @@
+"""Tests for request instrumentation."""
+import json
+
+import pytest
+
+from uart_wifi.communication import UartWifi
+from uart_wifi.errors import ConnectionException
+from uart_wifi.instrumentation import MetricsAggregator
+from uart_wifi.simulate_profiles import BehaviorProfile
+
+
+@pytest.fixture(name="printers")
+def fixture_printers(simulate):
+    """A fast and a slow simulated printer."""
+    return simulate(None, BehaviorProfile(first_byte_delay=0.1))
+
+
+def test_trace_phases(printers):
+    """each request reports its phases to the listeners"""
+    traces = []
+    uart = UartWifi("127.0.0.1", printers[1])
+    uart.add_listener(traces.append)
+    assert uart.send_request("sysinfo,")[0].serial == "234234234"
+    trace = traces[0]
+    assert trace.command == "sysinfo"
+    assert trace.error is None
+    assert trace.ttfb >= 0.1
+    assert trace.bytes_sent == len("sysinfo,")
+    assert trace.bytes_received > 0
+    for duration in trace.phases().values():
+        assert duration is not None and duration >= 0
+    assert trace.total_time >= trace.connect_time + trace.ttfb
+
+
+def test_errors_and_failing_listeners():
+    """errors are recorded by class and listener failures do not leak"""
+    traces = []
+
+    def broken(_):
+        raise RuntimeError("listener bug")
+
+    uart = UartWifi("127.0.0.1", 1)
+    uart.add_listener(broken)
+    uart.add_listener(traces.append)
+    with pytest.raises(ConnectionException):
+        uart.send_request("getstatus,")
+    assert traces[0].error == "ConnectionRefusedError"
+    assert traces[0].connected is None
+
+
+def test_aggregator_exports(printers):
+    """the aggregator exports Prometheus text and JSON"""
+    metrics = MetricsAggregator()
+    for port in printers:
+        uart = UartWifi("127.0.0.1", port)
+        uart.add_listener(metrics)
+        for _ in range(2):
+            uart.send_request("getstatus,")
+        uart.get_preview("0.pwmb")
+    assert metrics.slowest(1)[0][0] == f"127.0.0.1:{printers[1]}"
+    stats = json.loads(metrics.to_json())
+    fast = stats[f"127.0.0.1:{printers[0]}"]
+    assert fast["getstatus"]["count"] == 2
+    assert fast["getPreview2"]["bytes_received"] > 240 * 168 * 2
+    assert set(fast["getstatus"]["mean"]) == {
+        "connect",
+        "ttfb",
+        "transfer",
+        "parse",
+        "total",
+    }
+    text = metrics.to_prometheus()
+    labels = f'printer="127.0.0.1:{printers[0]}",command="getstatus"'
+    assert f"uart_wifi_requests_total{{{labels}}} 2" in text
+    assert (
+        f'uart_wifi_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2'
+        in text
+    )
+    metrics.reset()
+    assert metrics.to_dict() == {}
@@ -0,0 +1,100 @@
+"""Tests for the monox command line."""
+import subprocess
+import sys
+
+import pytest
+
+from uart_wifi.scripts.monox import main
+
+
+@pytest.fixture(name="ports")
+def fixture_ports(simulate):
+    """Two quiet simulated printers."""
+    return simulate(None, None)
+
+
+def test_several_commands(ports, capsys):
+    """each command is sent in order and printed under its name"""
+    status = main(
+        [
+            "-i",
+            "127.0.0.1",
+            "-p",
+            str(ports[0]),
+            "-c",
+            "getstatus,",
+            "-c",
+            "sysinfo,",
+        ]
+    )
+    out = capsys.readouterr().out.splitlines()
+    assert status == 0
+    assert out[0] == "getstatus,"
+    assert "status: stop" in out[1]
+    assert out.index("sysinfo,") > 1
+    assert "serial: 234234234" in out
+
+
+def test_raw_output(ports, capsys):
+    """raw responses are printed whole"""
+    main(["-r", "-i", "127.0.0.1", "-p", str(ports[0]), "-c", "getmode,"])
+    assert capsys.readouterr().out.splitlines() == [
+        "getmode,",
+        "getmode,0,end",
+    ]
+
+
+def test_offline_host(capsys):
+    """a printer which can not be reached gives a failing status"""
+    assert main(["-i", "127.0.0.1", "-p", "1", "-c", "getstatus,"]) == 1
+    assert "Could not connect" in capsys.readouterr().err
+
+
+def test_missing_command(capsys):
+    """a run without a command fails instead of doing nothing"""
+    assert main(["-i", "127.0.0.1"]) == 1
+    assert "-c" in capsys.readouterr().out
+
+
+def test_old_delay_option(ports, capsys):
+    """-d from older scripts is still accepted"""
+    args = ["-d", "-i", "127.0.0.1", "-p", str(ports[0]), "-c", "getstatus,"]
+    assert main(args) == 0
+    assert "status: stop" in capsys.readouterr().out
+
+
+def test_usage_errors(capsys):
+    """options which can not be understood give a failing status"""
+    assert main(["-x", "-i", "127.0.0.1", "-c", "getstatus,"]) == 2
+    assert main(["-i", "127.0.0.1", "-p", "six", "-c", "getstatus,"]) == 2
+    assert "-p needs a number" in capsys.readouterr().err
+
+
+def test_raw_command_is_light(ports):
+    """a raw command does not import the optional parts of the client"""
+    code = (
+        "import sys\n"
+        "from uart_wifi.scripts.monox import main\n"
+        f"main(['-r', '-i', '127.0.0.1', '-p', '{ports[0]}', "
+        "'-c', 'getmode,'])\n"
+        "heavy = ['concurrent.futures', 'json', 'random', 'tempfile',\n"
+        "    'uart_wifi.instrumentation', 'uart_wifi.pool']\n"
+        "assert not [m for m in heavy if m in sys.modules], heavy\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True
+    )
+    assert b"getmode,0,end" in result.stdout
+
+
+def test_help_is_light():
+    """the help does not import the client"""
+    code = (
+        "import sys\n"
+        "from uart_wifi.scripts.monox import main\n"
+        "main(['-h'])\n"
+        "assert 'uart_wifi.communication' not in sys.modules\n"
+    )
+    subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True
+    )
@@ -0,0 +1,167 @@
+"""Tests for keep-alive connection pooling."""
+import socket
+import threading
+
+import pytest
+
+from uart_wifi.communication import UartWifi
+from uart_wifi.errors import ConnectionException
+from uart_wifi.pool import ConnectionPool
+
+
+class KeepAliveServer:
+    """Answers every getstatus on a connection until the client closes."""
+
+    def __init__(self) -> None:
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(5)
+        self.port = self.listener.getsockname()[1]
+        self.accepted = 0
+        self.close_after_reply = False
+
+    def serve_forever(self) -> None:
+        """Accept connections until stopped."""
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            self.accepted += 1
+            thread = threading.Thread(target=self.handle, args=(conn,))
+            thread.daemon = True
+            thread.start()
+
+    def stop(self) -> None:
+        """Stop accepting, waking a blocked accept."""
+        try:
+            self.listener.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.listener.close()
+
+    def handle(self, conn: socket.socket) -> None:
+        """Reply to each request on the connection."""
+        with conn:
+            while conn.recv(64):
+                conn.sendall(b"getstatus,stop,end")
+                if self.close_after_reply:
+                    return
+
+
+class DroppingServer(KeepAliveServer):
+    """Answers the first request on a connection and closes it on the
+    second, without answering, as a printer dropping a stale connection."""
+
+    def __init__(self) -> None:
+        self.received = []
+        super().__init__()
+
+    def handle(self, conn: socket.socket) -> None:
+        """Reply to the first request only."""
+        with conn:
+            for index in range(2):
+                request = conn.recv(64)
+                if not request:
+                    return
+                self.received.append(request)
+                if index == 0:
+                    conn.sendall(b"getstatus,stop,end")
+
+
+@pytest.fixture(name="start")
+def fixture_start(serve):
+    """Serve a KeepAliveServer, or a subclass, for one test.
+    :returns: start(server_class), which returns the running server.
+    """
+
+    def start(server_class: type = KeepAliveServer) -> KeepAliveServer:
+        server = server_class()
+        serve(server.serve_forever, server.stop)
+        return server
+
+    return start
+
+
+def test_keep_alive_reuses_connection(start):
+    """back-to-back requests share one connection"""
+    server = start()
+    pool = ConnectionPool()
+    uart = UartWifi("127.0.0.1", server.port)
+    uart.set_keep_alive(pool=pool)
+    for _ in range(5):
+        assert uart.send_request("getstatus,")[0].status == "stop"
+    assert server.accepted == 1
+    assert pool.idle_count(uart.server_address) == 1
+    pool.close()
+
+
+def test_keep_alive_reconnects_when_closed(start):
+    """a connection closed by the printer is replaced"""
+    server = start()
+    server.close_after_reply = True
+    pool = ConnectionPool()
+    uart = UartWifi("127.0.0.1", server.port)
+    uart.set_keep_alive(pool=pool)
+    for _ in range(3):
+        assert uart.send_request("getstatus,")[0].status == "stop"
+    assert server.accepted == 3
+    pool.close()
+
+
+def test_evict_idle(start):
+    """idle connections past max_idle_time are closed"""
+    server = start()
+    pool = ConnectionPool(max_idle_time=0)
+    uart = UartWifi("127.0.0.1", server.port)
+    uart.set_keep_alive(pool=pool)
+    uart.send_request("getstatus,")
+    assert pool.evict_idle() == 1
+    assert pool.idle_count(uart.server_address) == 0
+
+
+@pytest.mark.parametrize(
+    "request_", ["delfile,3.pwmb,end", "goprint,0.pwmb,end"]
+)
+def test_stale_connection_not_replayed(start, request_):
+    """a request dropped on a reused connection is not sent again"""
+    server = start(DroppingServer)
+    pool = ConnectionPool()
+    uart = UartWifi("127.0.0.1", server.port)
+    uart.set_keep_alive(pool=pool)
+    uart.send_request("getstatus,")
+    with pytest.raises(ConnectionException):
+        uart.send_request(request_)
+    assert server.received[1:] == [request_.encode()]
+    assert server.accepted == 1
+    pool.close()
+
+
+def test_stale_connection_retried_once(start):
+    """a read dropped on a reused connection is sent again on a new one"""
+    server = start(DroppingServer)
+    pool = ConnectionPool()
+    traces = []
+    uart = UartWifi("127.0.0.1", server.port)
+    uart.set_keep_alive(pool=pool)
+    uart.add_listener(traces.append)
+    uart.send_request("getstatus,")
+    assert uart.send_request("getstatus,")[0].status == "stop"
+    assert server.accepted == 2
+    assert [trace.retries for trace in traces] == [0, 1]
+    pool.close()
+
+
+def test_evict_idle_on_checkout(start):
+    """taking a connection closes those idle too long, for any printer"""
+    first = start()
+    second = start()
+    pool = ConnectionPool(max_idle_time=0)
+    uart = UartWifi("127.0.0.1", first.port)
+    uart.set_keep_alive(pool=pool)
+    uart.send_request("getstatus,")
+    assert pool.idle_count(uart.server_address) == 1
+    other = UartWifi("127.0.0.1", second.port)
+    other.set_keep_alive(pool=pool)
+    other.send_request("getstatus,")
+    assert pool.idle_count(uart.server_address) == 0
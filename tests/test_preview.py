@@ -0,0 +1,46 @@
+"""Tests for preview decoding."""
+import struct
+
+from uart_wifi import preview
+from uart_wifi.preview import rgb565_to_rgb888, rgb888_to_bmp
+from uart_wifi.response import MonoXPreviewImage
+
+
+def test_rgb565_to_rgb888():
+    """pure colours expand to full 8 bit range"""
+    pixels = struct.pack("<4H", 0xF800, 0x07E0, 0x001F, 0x0000)
+    assert rgb565_to_rgb888(pixels) == bytes(
+        [255, 0, 0, 0, 255, 0, 0, 0, 255, 0, 0, 0]
+    )
+
+
+def test_rgb565_to_rgb888_without_numpy():
+    """the lookup table path matches"""
+    pixels = struct.pack("<3H", 0xF800, 0x8410, 0xFFFF)
+    saved, preview.numpy = preview.numpy, None
+    try:
+        assert rgb565_to_rgb888(pixels) == bytes(
+            [255, 0, 0, 132, 130, 132, 255, 255, 255]
+        )
+    finally:
+        preview.numpy = saved
+
+
+def test_bmp_layout():
+    """BMP rows are bottom-up BGR and padded to four bytes"""
+    rgb = bytes([1, 2, 3, 4, 5, 6])  # one row of two pixels over two rows
+    bmp = rgb888_to_bmp(rgb + rgb[::-1], 2, 2)
+    assert bmp[:2] == b"BM"
+    assert struct.unpack_from("<I", bmp, 2)[0] == len(bmp)
+    assert bmp[54:62] == bytes([4, 5, 6, 1, 2, 3, 0, 0])
+
+
+def test_save(tmp_path):
+    """a preview image can be written to disk"""
+    image = MonoXPreviewImage(
+        internal_name="0.pwmb", width=1, height=1, rgb=b"\xff\x00\x00"
+    )
+    path = image.save(str(tmp_path / "preview.bmp"))
+    with open(path, "rb") as saved:
+        assert saved.read() == image.to_bmp()
+    assert "rgb" not in image.to_dict()
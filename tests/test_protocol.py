@@ -0,0 +1,77 @@
+"""Tests for the protocol registry."""
+from uart_wifi.communication import RetryPolicy, _do_handle
+from uart_wifi.protocol import (
+    COMMANDS,
+    ENCODING,
+    IDEMPOTENT_COMMANDS,
+    Command,
+    lookup,
+    parse_buffer,
+    parse_frame,
+    register,
+)
+from uart_wifi.response import InvalidResponse, MonoXStatus, MonoXSysInfo
+from uart_wifi.simulate_printer import AnycubicSimulator
+
+
+def test_encode():
+    """requests are terminated the way each command expects"""
+    assert COMMANDS["getstatus"].encode() == b"getstatus,"
+    assert COMMANDS["goprint"].encode("0.pwmb") == b"goprint,0.pwmb,end"
+    assert COMMANDS["gostop"].encode() == b"gostop,end"
+    assert lookup(" getPreview2,0.pwmb,end").binary
+    assert lookup("foo bar baz") is None
+
+
+def test_parse_frame(capsys):
+    """frames are parsed by the command registered for their verb"""
+    assert isinstance(parse_frame("getstatus,stop\r\n"), MonoXStatus)
+    assert isinstance(parse_frame("sysinfo,X6K,V1,1,wifi"), MonoXSysInfo)
+    assert parse_frame("goprint,OK").status == "OK"
+    assert parse_frame("getstatus") is None
+    unknown = parse_frame("madeup,value")
+    assert isinstance(unknown, InvalidResponse)
+    assert unknown.status == "value"
+    assert capsys.readouterr().err == ""
+
+
+def test_register():
+    """a new verb is added in one place"""
+    command = register(
+        Command("getlight", lambda fields: fields[1:], idempotent=True)
+    )
+    try:
+        assert parse_frame("getlight,1,2") == ["1", "2"]
+        assert RetryPolicy().should_retry(["getlight"], 1)
+    finally:
+        del COMMANDS[command.verb]
+        IDEMPOTENT_COMMANDS.discard(command.verb)
+
+
+def test_simulator_dispatch():
+    """the simulator answers registered verbs and ignores arguments"""
+    simulator = AnycubicSimulator("127.0.0.1", 0, quiet=True)
+    assert set(simulator.responders) - {"incomplete", "multi", "shutdown"} <= (
+        set(COMMANDS)
+    )
+    assert simulator.respond("sysinfo") == [simulator.sysinfo().encode()]
+    assert simulator.respond("getstatus.pwmb") == []
+    assert simulator.respond("0.pwmb") == []
+
+
+def test_parse_buffer():
+    """received bytes parse as the decoded text does"""
+    text = (
+        "getstatus,print,Widget.pwmb/46.pwmb,2338,88,2062,51744,6844,"
+        "~178mL,UV,39.38,0.05,0,endsysinfo,X6K,V1,1,wifi,endgetmode,0,"
+    )
+    expected = [response.to_dict() for response in _do_handle(text)]
+    for data in (text.encode(), bytearray(text.encode())):
+        assert [r.to_dict() for r in parse_buffer(data)] == expected
+
+
+def test_parse_buffer_gbk():
+    """text which is not ASCII is decoded as GBK"""
+    data = "sysinfo,打印机,V1,1,网络,end".encode(ENCODING)
+    assert parse_buffer(data)[0].model == "打印机"
+    assert "\ufffd" in parse_buffer(b"sysinfo,\xff,V1,1,w,end")[0].model
@@ -0,0 +1,48 @@
+"""Tests for the response model."""
+from uart_wifi.response import MonoXStatus, MonoXSysInfo
+
+PRINTING = (
+    "getstatus,print,Widget.pwmb/46.pwmb,2338,88,2062,51744,6844,~178mL,UV,"
+    "39.38,0.05,0"
+).split(",")
+
+
+def test_status_typed_fields():
+    """numeric status fields are parsed"""
+    status = MonoXStatus(PRINTING)
+    assert status.total_layers == 2338
+    assert status.percent_complete == 88
+    assert status.current_layer == 2062
+    assert status.seconds_elapse == 51744 * 60
+    assert status.seconds_remaining == 6844
+    assert status.total_volume == 178.0
+    assert status.layer_height == 0.05
+
+
+def test_status_missing_fields_are_none():
+    """a stopped printer reports no file"""
+    status = MonoXStatus(["getstatus", "stop"])
+    assert status.file is None
+    assert status.total_layers is None
+    assert status.to_dict()["status"] == "stop"
+
+
+def test_status_malformed_number():
+    """an unparseable number becomes None"""
+    message = list(PRINTING)
+    message[3] = "many"
+    status = MonoXStatus(message)
+    assert status.total_layers is None
+    assert status.current_layer == 2062
+
+
+def test_slots():
+    """records carry no instance dictionary"""
+    assert not hasattr(MonoXStatus(PRINTING), "__dict__")
+    assert MonoXSysInfo("Photon Mono X 6K").to_dict() == {
+        "status": "updated",
+        "model": "Photon Mono X 6K",
+        "firmware": "",
+        "serial": "",
+        "wifi": "",
+    }
@@ -0,0 +1,117 @@
+"""Tests for the retry policy and circuit breaker."""
+import time
+
+import pytest
+
+from uart_wifi.communication import CircuitBreaker, RetryPolicy, UartWifi
+from uart_wifi.errors import CircuitOpenException, ConnectionException
+from uart_wifi.fleet import FleetPoller
+from uart_wifi.simulate_profiles import BehaviorProfile
+
+OFFLINE = ("127.0.0.1", 1)
+
+
+@pytest.fixture(name="resetting_printer")
+def fixture_resetting_printer(simulate):
+    """A simulated printer which resets every connection."""
+    return simulate(BehaviorProfile(reset_rate=1))[0]
+
+
+@pytest.fixture(name="silent_printer")
+def fixture_silent_printer(simulate):
+    """A simulated printer which accepts connections and never answers."""
+    return simulate(BehaviorProfile(first_byte_delay=30))[0]
+
+
+def test_retry_policy():
+    """only idempotent commands are retried, with bounded jittered delays"""
+    policy = RetryPolicy(attempts=3, backoff=1, max_backoff=3, jitter=0.5)
+    assert policy.should_retry(["getstatus"], 1)
+    assert not policy.should_retry(["getstatus"], 3)
+    assert not policy.should_retry(["goprint"], 1)
+    assert not policy.should_retry(["getstatus", "delfile"], 1)
+    assert 0.5 <= policy.delay(1) <= 1
+    assert 1 <= policy.delay(2) <= 2
+    assert 1.5 <= policy.delay(5) <= 3
+
+
+def test_retries_idempotent_only(resetting_printer):
+    """reads are retried and prints are sent once"""
+    traces = []
+    uart = UartWifi("127.0.0.1", resetting_printer)
+    uart.set_retry_policy(RetryPolicy(attempts=3, backoff=0.01))
+    uart.add_listener(traces.append)
+    with pytest.raises(ConnectionException):
+        uart.send_request("getstatus,")
+    with pytest.raises(ConnectionException):
+        uart.send_request("goprint,0.pwmb,end")
+    assert [trace.retries for trace in traces] == [2, 0]
+    uart.set_retry_policy(None)
+    with pytest.raises(ConnectionException):
+        uart.send_request("getstatus,")
+    assert traces[-1].retries == 0
+
+
+def test_circuit_breaker():
+    """an offline printer fails fast until a trial request is due"""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+    uart = UartWifi(*OFFLINE)
+    uart.set_circuit_breaker(breaker)
+    for _ in range(2):
+        with pytest.raises(ConnectionException) as raised:
+            uart.send_request("getstatus,")
+        assert not isinstance(raised.value, CircuitOpenException)
+    assert breaker.state(OFFLINE) == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenException):
+        uart.send_request("getstatus,")
+    time.sleep(0.2)
+    with pytest.raises(ConnectionException) as raised:
+        uart.send_request("getstatus,")
+    assert not isinstance(raised.value, CircuitOpenException)
+    assert breaker.state(OFFLINE) == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenException):
+        uart.send_request("getstatus,")
+    breaker.record_success(OFFLINE)
+    assert breaker.state(OFFLINE) == CircuitBreaker.CLOSED
+
+
+def test_silent_printer_opens_circuit(silent_printer):
+    """a printer which connects but never answers counts as a failure"""
+    breaker = CircuitBreaker(failure_threshold=2)
+    address = ("127.0.0.1", silent_printer)
+    uart = UartWifi(*address)
+    uart.set_maximum_request_time(0.2)
+    uart.set_circuit_breaker(breaker)
+    for _ in range(2):
+        uart.send_request("getstatus,")
+    assert breaker.state(address) == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenException):
+        uart.send_request("getstatus,")
+
+
+def test_trial_released_on_unexpected_error(monkeypatch):
+    """a trial which fails unexpectedly does not keep the circuit open"""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure(OFFLINE)
+    uart = UartWifi(*OFFLINE)
+    uart.set_circuit_breaker(breaker)
+
+    def broken(*_):
+        raise ValueError("unexpected")
+
+    monkeypatch.setattr(uart, "_exchange", broken)
+    with pytest.raises(ValueError):
+        uart.send_request("getstatus,")
+    assert breaker.state(OFFLINE) == CircuitBreaker.OPEN
+    breaker.before_request(OFFLINE)
+    assert breaker.state(OFFLINE) == CircuitBreaker.HALF_OPEN
+
+
+def test_fleet_skips_offline_printers():
+    """a fleet poll fails fast for printers known to be offline"""
+    breaker = CircuitBreaker(failure_threshold=1)
+    poller = FleetPoller([OFFLINE], circuit_breaker=breaker)
+    first = poller.poll_all()[0]
+    assert not isinstance(first.errors["getstatus"], CircuitOpenException)
+    second = poller.poll_all()[0]
+    assert isinstance(second.errors["getstatus"], CircuitOpenException)
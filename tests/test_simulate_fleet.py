@@ -0,0 +1,75 @@
+"""Tests for the simulated printer fleet."""
+import time
+
+from uart_wifi.communication import UartWifi
+from uart_wifi.fleet import FleetPoller
+from uart_wifi.response import MonoXStatus
+from uart_wifi.simulate_fleet import SimulatedFleet
+
+
+def test_fleet_of_printers():
+    """many printers are served from one process, each with its own state"""
+    fleet = SimulatedFleet(count=50, seed=1, layer_seconds=0.05)
+    fleet.start()
+    try:
+        results = FleetPoller(fleet.addresses).poll_all()
+        assert len(results) == 50
+        assert all(result.ok for result in results)
+        assert len({result.sysinfo.serial for result in results}) == 50
+        for result in results:
+            assert result.files is not None
+            assert result.status.status.strip() == "stop"
+    finally:
+        fleet.stop()
+
+
+def test_print_progress():
+    """a print advances layer by layer and stops after the last"""
+    fleet = SimulatedFleet(count=2, seed=2, layer_seconds=0.002)
+    fleet.start()
+    try:
+        host, port = fleet.addresses[0]
+        uart = UartWifi(host, port)
+        assert uart.send_request("goprint,0.pwmb,end")[0].status == "OK"
+        first = uart.send_request("getstatus,")[0]
+        assert isinstance(first, MonoXStatus)
+        assert first.status == "print"
+        time.sleep(0.05)
+        second = uart.send_request("getstatus,")[0]
+        assert second.current_layer > first.current_layer
+        assert second.seconds_remaining <= first.seconds_remaining
+        time.sleep(fleet.printers[0].total_layers * 0.002)
+        assert uart.send_request("getstatus,")[0].status.strip() == "stop"
+        other = UartWifi(*fleet.addresses[1]).send_request("getstatus,")[0]
+        assert other.status.strip() == "stop"
+    finally:
+        fleet.stop()
+
+
+def test_files_by_internal_name():
+    """goprint and delfile act on the file named, on that printer only"""
+    fleet = SimulatedFleet(count=2, seed=5, layer_seconds=0.002)
+    fleet.start()
+    try:
+        printer, other = fleet.printers
+        printer.files = ["Widget.pwmb", "Gear.pwmb", "Bracket.pwmb"]
+        uart = UartWifi(*fleet.addresses[0])
+
+        def send(request: str) -> str:
+            return uart.send_request(request)[0].status
+
+        assert send("goprint,7.pwmb,end") == "ERROR2"
+        assert send("goprint,1.pwmb,end") == "OK"
+        assert uart.send_request("getstatus,")[0].file == "Gear.pwmb/1.pwmb"
+        assert send("delfile,1.pwmb,end") == "ERROR1"
+        assert send("delfile,0.pwmb,end") == "OK"
+        assert send("delfile,0.pwmb,end") == "ERROR2"
+        assert send("goprint,0.pwmb,end") == "ERROR1"
+        files = uart.send_request("getfile,")[0].files
+        assert [(f.internal, f.external) for f in files] == [
+            ("1.pwmb", "Gear.pwmb"),
+            ("2.pwmb", "Bracket.pwmb"),
+        ]
+        assert None not in other.files
+    finally:
+        fleet.stop()
@@ -0,0 +1,91 @@
+"""Tests for the scalable simulator."""
+import asyncio
+import threading
+import time
+import unittest
+
+from uart_wifi.async_communication import AsyncUartWifi
+from uart_wifi.communication import UartWifi
+from uart_wifi.pool import ConnectionPool
+from uart_wifi.simulate_printer import AnycubicSimulator, SimulatorServer
+
+
+class TestScalableSimulator(unittest.TestCase):
+    """Tests"""
+
+    server = None
+    thread = None
+    port = 0
+
+    @classmethod
+    def setup_class(cls):
+        """Start a quiet simulator on a selectors loop"""
+        cls.server = SimulatorServer()
+        cls.port = cls.server.add_printer(
+            AnycubicSimulator("127.0.0.1", 0, quiet=True)
+        )
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+
+    def test_many_concurrent_clients(self):
+        """hundreds of clients are answered without per-accept pauses"""
+
+        async def poll():
+            uart = AsyncUartWifi("127.0.0.1", self.port)
+            return await uart.send_request("getstatus,")
+
+        async def poll_all():
+            return await asyncio.gather(*[poll() for _ in range(300)])
+
+        start = time.monotonic()
+        results = asyncio.run(poll_all())
+        assert all(result[0].status == "stop\r\n" for result in results)
+        assert time.monotonic() - start < 10
+
+    def test_keep_alive(self):
+        """one connection serves several requests"""
+        pool = ConnectionPool()
+        uart = UartWifi("127.0.0.1", self.port)
+        uart.set_keep_alive(pool=pool)
+        for _ in range(3):
+            assert uart.send_request("sysinfo,")[0].serial == "234234234"
+        assert pool.idle_count(uart.server_address) == 1
+        pool.close()
+
+    def test_pipelined_keep_alive(self):
+        """batches are matched by verb over a pooled connection"""
+        pool = ConnectionPool()
+        uart = UartWifi("127.0.0.1", self.port)
+        uart.set_keep_alive(pool=pool)
+        uart.set_timeouts(idle=0.3)
+        for _ in range(2):
+            status, sysinfo, missing = uart.send_requests(
+                ["getstatus", "sysinfo", "getwifi"]
+            )
+            assert status.status == "stop\r\n"
+            assert sysinfo.serial == "234234234"
+            assert missing.status == "no response"
+        assert pool.idle_count(uart.server_address) == 0
+        pool.close()
+
+    def test_print_state(self):
+        """commands change the printer state"""
+        uart = UartWifi("127.0.0.1", self.port)
+        assert uart.send_request("goprint,0.pwmb,end")[0].status == "OK"
+        assert uart.send_request("getstatus,")[0].status == "print"
+        assert uart.send_request("gostop,end")[0].status == "OK"
+
+    def test_replaced_responder(self):
+        """a responder replaced on the instance answers its command"""
+        simulator = AnycubicSimulator("127.0.0.1", 0, quiet=True)
+        simulator.getfile = lambda: "getfile,Gear.pwmb/0.pwmb,end"
+        assert simulator.respond("getfile") == [
+            b"getfile,Gear.pwmb/0.pwmb,end"
+        ]
+
+    @classmethod
+    def teardown_class(cls):
+        """Stop the simulator"""
+        cls.server.stop()
+        cls.thread.join(5)
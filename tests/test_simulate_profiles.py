@@ -0,0 +1,97 @@
+"""Tests for latency and fault injection in the simulator."""
+import time
+
+import pytest
+
+from uart_wifi.communication import UartWifi
+from uart_wifi.errors import ConnectionException
+from uart_wifi.simulate_printer import AnycubicSimulator, SimulatorServer
+from uart_wifi.simulate_profiles import BehaviorProfile, named_profile
+
+
+@pytest.fixture(name="start")
+def fixture_start(serve):
+    """Start a quiet simulator with a profile, on a SimulatorServer or on
+    the thread per connection server when not scalable.
+    :returns: start(profile, scalable=True), which returns the port.
+    """
+
+    def start(profile: BehaviorProfile, scalable: bool = True) -> int:
+        simulator = AnycubicSimulator(
+            "127.0.0.1", 0, quiet=True, profile=profile
+        )
+        if scalable:
+            server = SimulatorServer()
+            port = server.add_printer(simulator)
+            serve(server.serve_forever, server.stop)
+            return port
+
+        def stop():
+            # start_server only looks at the signal once a client connects.
+            simulator.shutdown_signal = True
+            try:
+                UartWifi("127.0.0.1", simulator.port).send_request("shutdown,")
+            except ConnectionException:
+                pass  # a reset or dropped answer still stops the server.
+
+        serve(simulator.start_server, stop)
+        while simulator.port == 0:
+            time.sleep(0.01)
+        return simulator.port
+
+    return start
+
+
+@pytest.mark.parametrize("scalable", [True, False])
+def test_first_byte_delay(start, scalable):
+    """responses wait for the first byte delay and jitter"""
+    port = start(
+        BehaviorProfile(first_byte_delay=0.2, jitter=0.1, seed=1), scalable
+    )
+    began = time.monotonic()
+    response = UartWifi("127.0.0.1", port).send_request("sysinfo,")
+    elapsed = time.monotonic() - began
+    assert response[0].serial == "234234234"
+    assert 0.2 <= elapsed < 1
+
+
+def test_trickle(start):
+    """a trickled response arrives whole at the configured rate"""
+    port = start(BehaviorProfile(bytes_per_second=400))
+    began = time.monotonic()
+    response = UartWifi("127.0.0.1", port).send_request("getstatus,")
+    elapsed = time.monotonic() - began
+    assert response[0].status.strip() == "stop"
+    assert elapsed >= len("getstatus,stop\r\n,end") / 400 - 0.02
+
+
+@pytest.mark.parametrize("scalable", [True, False])
+def test_reset(start, scalable):
+    """a reset connection is reported as a connection problem"""
+    port = start(BehaviorProfile(reset_rate=1), scalable)
+    with pytest.raises(ConnectionException):
+        UartWifi("127.0.0.1", port).send_request("sysinfo,")
+
+
+def test_drop_mid_frame(start):
+    """a dropped connection leaves an incomplete frame"""
+    port = start(BehaviorProfile(drop_rate=1, seed=3))
+    uart = UartWifi("127.0.0.1", port)
+    uart.set_raw()
+    received = uart.send_request("sysinfo,")
+    full = AnycubicSimulator("127.0.0.1", 0).sysinfo()
+    assert full.startswith(received)
+    assert received != full
+
+
+def test_seeded_profiles_repeat():
+    """the same seed makes the same choices"""
+    first = named_profile("flaky", seed=5)
+    second = named_profile("flaky", seed=5)
+    assert [first.should_reset() for _ in range(50)] == [
+        second.should_reset() for _ in range(50)
+    ]
+    assert [first.drop_point(100) for _ in range(50)] == [
+        second.drop_point(100) for _ in range(50)
+    ]
+    assert 0 <= first.response_delay() <= 0.2
@@ -0,0 +1,94 @@
+"""Tests for the telemetry recorder."""
+import math
+
+import pytest
+
+from uart_wifi.response import MonoXStatus
+from uart_wifi.telemetry import (
+    RECORD,
+    TelemetryRecorder,
+    TelemetrySeries,
+    downsample,
+)
+
+
+def status(layer: int) -> MonoXStatus:
+    """A printing status at a layer."""
+    return MonoXStatus(
+        f"getstatus,print,Widget.pwmb/46.pwmb,2338,{layer * 100 // 2338},"
+        f"{layer},{layer // 60},{2338 - layer},~178mL,UV,39.38,0.05,0".split(
+            ","
+        )
+    )
+
+
+def test_ring_buffer_range_query():
+    """the oldest samples are overwritten and ranges are found by time"""
+    series = TelemetrySeries(capacity=100)
+    for second in range(250):
+        series.append((float(second), 1, 2338, second, 0, 0, 0, 178.0))
+    assert len(series) == 100
+    columns = series.query(200, 210)
+    assert list(columns["time"]) == [float(s) for s in range(200, 210)]
+    assert list(columns["current_layer"]) == list(range(200, 210))
+    assert list(series.query()["current_layer"]) == list(range(150, 250))
+    assert len(series.query(0, 100)["time"]) == 0
+
+
+def test_recorder_memory_and_disk(tmp_path):
+    """samples are kept per serial in memory and in fixed-size records"""
+    recorder = TelemetryRecorder(capacity=1000, directory=str(tmp_path))
+    for second in range(600):
+        recorder.record("0001", status(second), 1000.0 + second)
+    stopped = MonoXStatus(["getstatus", "stop\r\n", ""])
+    assert recorder.record("0002", stopped, 1000.0)
+    assert not recorder.record("0002", stopped, 1001.0)
+    assert sorted(recorder.serials()) == ["0001", "0002"]
+    in_memory = recorder.query("0001", 1100, 1200)
+    on_disk = recorder.load("0001", 1100, 1200)
+    assert in_memory == on_disk
+    assert list(on_disk["current_layer"]) == list(range(100, 200))
+    assert on_disk["total_volume"][0] == 178
+    assert math.isnan(recorder.query("0002")["total_volume"][0])
+    recorder.close()
+    assert (tmp_path / "0001.bin").stat().st_size == 600 * RECORD.size
+    assert RECORD.size == 30
+
+
+def test_unknown_and_invalid():
+    """unknown printers have no samples and bad arguments are rejected"""
+    recorder = TelemetryRecorder()
+    columns = recorder.query("unknown")
+    assert all(len(values) == 0 for values in columns.values())
+    with pytest.raises(ValueError):
+        recorder.load("unknown")
+    with pytest.raises(ValueError):
+        TelemetrySeries(capacity=0)
+    with pytest.raises(ValueError):
+        downsample(columns, 0)
+
+
+def test_out_of_range_values(tmp_path):
+    """values too large for their column are clamped instead of failing"""
+    recorder = TelemetryRecorder(directory=str(tmp_path))
+    quirky = MonoXStatus(
+        "getstatus,print,Widget.pwmb/46.pwmb,9999999999,255,-300,1,2,"
+        "~178mL,UV,39.38,0.05,0".split(",")
+    )
+    assert recorder.record("0001", quirky, 1000.0)
+    columns = recorder.load("0001")
+    assert columns == recorder.query("0001")
+    assert list(columns["percent_complete"]) == [127]
+    assert list(columns["total_layers"]) == [2**31 - 1]
+    assert list(columns["current_layer"]) == [-300]
+    recorder.close()
+
+
+def test_downsample():
+    """one sample is kept per bucket, the last of it"""
+    series = TelemetrySeries(capacity=1000)
+    for second in range(600):
+        series.append((float(second), 1, 600, second, 0, second, 0, 1.0))
+    minutes = downsample(series.query(), 60)
+    assert list(minutes["time"]) == [float(59 + 60 * m) for m in range(10)]
+    assert list(minutes["current_layer"]) == [59 + 60 * m for m in range(10)]
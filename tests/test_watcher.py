@@ -0,0 +1,76 @@
+"""Tests for the status watcher."""
+import time
+
+from uart_wifi.communication import UartWifi
+from uart_wifi.simulate_fleet import SimulatedFleet
+from uart_wifi.watcher import (
+    CAME_ONLINE,
+    FIELD_CHANGED,
+    LAYER_ADVANCED,
+    PRINT_FINISHED,
+    PRINT_STARTED,
+    WENT_OFFLINE,
+    StatusWatcher,
+)
+
+
+def kinds(events) -> list:
+    """The kinds of a list of events."""
+    return [event.kind for event in events]
+
+
+def test_print_lifecycle():
+    """a print is reported as typed events and unchanged polls are silent"""
+    fleet = SimulatedFleet(count=1, seed=4, layer_seconds=0.004)
+    fleet.start()
+    try:
+        uart = UartWifi(*fleet.addresses[0])
+        watcher = StatusWatcher(uart, printing_interval=1, idle_interval=9)
+        assert kinds(watcher.poll()) == [CAME_ONLINE, "status_changed"]
+        assert watcher.interval == 9
+        assert watcher.poll() == []
+        uart.send_request("goprint,0.pwmb,end")
+        events = watcher.poll()
+        assert PRINT_STARTED in kinds(events)
+        assert watcher.interval == 1
+        time.sleep(0.1)
+        events = watcher.poll()
+        assert LAYER_ADVANCED in kinds(events)
+        changed = {e.field for e in events if e.kind == FIELD_CHANGED}
+        assert "current_layer" in changed
+        assert "file" not in changed
+        time.sleep(fleet.printers[0].total_layers * 0.004)
+        assert PRINT_FINISHED in kinds(watcher.poll())
+    finally:
+        fleet.stop()
+
+
+def test_offline_back_off():
+    """an offline printer is reported once and retried less often"""
+    watcher = StatusWatcher(
+        UartWifi("127.0.0.1", 1), offline_interval=1, max_offline_interval=3
+    )
+    watcher.online = True
+    assert kinds(watcher.poll()) == [WENT_OFFLINE]
+    assert watcher.interval == 1
+    assert watcher.poll() == []
+    assert watcher.interval == 2
+    watcher.poll()
+    assert watcher.interval == 3
+
+
+def test_watch_in_background():
+    """events are delivered from the background thread until stopped"""
+    fleet = SimulatedFleet(count=1, seed=5)
+    fleet.start()
+    try:
+        events = []
+        watcher = StatusWatcher(UartWifi(*fleet.addresses[0]))
+        watcher.start(events.append)
+        deadline = time.monotonic() + 5
+        while not events and time.monotonic() < deadline:
+            time.sleep(0.01)
+        watcher.stop()
+        assert events[0].kind == CAME_ONLINE
+    finally:
+        fleet.stop()